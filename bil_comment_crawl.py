@@ -1,4 +1,5 @@
 import re
+import logging
 import json
 import time
 import csv
@@ -6,19 +7,31 @@ import asyncio
 import random
 import hashlib
 import urllib
-import pandas as pd
+from datetime import datetime, timedelta
 from urllib.parse import quote
 from tqdm import tqdm
 import random_bil_cookie
 import aiohttp
+from fast_json import loads as json_loads, decode_reply_page
+from crawl_metrics import metrics
+from task_tracer import tracer
+from crawl_scheduler import rate_limiter
+
+logger = logging.getLogger(__name__)
+
+# 评论时间戳的起点（与 pd.to_datetime(unit='s') 一致，不做时区转换）
+_EPOCH = datetime(1970, 1, 1)
+
 
 class CommentProcessor:
     """
     B站评论处理器，用于提取和处理评论字段
     """
+    
     def __init__(self, csv_writer):
         self.csv_writer = csv_writer
         self.count = 0
+        self._progress_described = False
     
     def _extract_field(self, data, keys, default=None):
         """
@@ -33,7 +46,10 @@ class CommentProcessor:
             return default
     
     def _extract_rereply_count(self, reply):
-        """提取回复数"""
+        """提取回复数，优先使用数值字段 rcount"""
+        rcount = reply.get("rcount")
+        if isinstance(rcount, int):
+            return rcount
         try:
             rereply_text = self._extract_field(reply, ["reply_control", "sub_reply_entry_text"], "")
             if rereply_text:
@@ -42,89 +58,103 @@ class CommentProcessor:
         except:
             return 0
     
-    def _get_vip_status(self, reply):
-        """获取会员状态"""
-        vip_status = self._extract_field(reply, ["member", "vip", "vipStatus"], 0)
-        return "是" if vip_status != 0 else "否"
-    
-    def _get_ip_location(self, reply):
-        """获取IP属地"""
-        try:
-            location = self._extract_field(reply, ["reply_control", "location"], "")
-            return location[5:] if location else "未知"
-        except:
-            return "未知"
-    
-    def process_reply(self, reply, parent_id=None, pbar=None):
+    def build_row(self, reply, parent_id=None):
         """
-        处理单条评论并写入CSV
-        返回处理后的评论数据
+        将单条评论转换为CSV行（不写入、不更新进度）
         """
-        # 更新计数并进度条
         self.count += 1
-        if pbar:
-            pbar.update(1)
-            pbar.set_description("爬取评论中")
         
-        # 获取评论各字段
-        parent = parent_id if parent_id else reply.get("parent", "")
-        rpid = reply.get("rpid", "")
-        uid = reply.get("mid", "")
+        member = reply.get("member") or {}
+        control = reply.get("reply_control") or {}
+        level_info = member.get("level_info") or {}
+        vip = member.get("vip") or {}
+        content = reply.get("content") or {}
         
-        # 提取用户信息
-        name = self._extract_field(reply, ["member", "uname"], "")
-        level = self._extract_field(reply, ["member", "level_info", "current_level"], 0)
-        sex = self._extract_field(reply, ["member", "sex"], "")
-        avatar = self._extract_field(reply, ["member", "avatar"], "")
-        sign = self._extract_field(reply, ["member", "sign"], "")
+        location = control.get("location", "")
         
-        # 提取评论内容相关信息
-        vip = self._get_vip_status(reply)
-        ip = self._get_ip_location(reply)
-        context = self._extract_field(reply, ["content", "message"], "")
-        reply_time = pd.to_datetime(reply.get("ctime", 0), unit='s')
-        rereply = self._extract_rereply_count(reply)
-        like = reply.get('like', 0)
-        
-        # 构建评论数据
-        comment_data = [
-            self.count, parent, rpid, uid, name, level, sex, 
-            context, reply_time, rereply, like, sign, ip, vip, avatar
+        return [
+            self.count,
+            parent_id if parent_id else reply.get("parent", ""),
+            reply.get("rpid", ""),
+            reply.get("mid", ""),
+            member.get("uname", ""),
+            level_info.get("current_level", 0),
+            member.get("sex", ""),
+            content.get("message", ""),
+            _EPOCH + timedelta(seconds=reply.get("ctime", 0) or 0),
+            self._extract_rereply_count(reply),
+            reply.get('like', 0),
+            member.get("sign", ""),
+            location[5:] if location else "未知",
+            "是" if vip.get("vipStatus", 0) != 0 else "否",
+            member.get("avatar", ""),
         ]
+    
+    def _advance_progress(self, pbar, n):
+        """按页更新进度条，避免每条评论都刷新终端"""
+        if pbar is None:
+            return
+        if not self._progress_described:
+            pbar.set_description("爬取评论中")
+            self._progress_described = True
+        pbar.update(n)
+    
+    def process_replies(self, replies, parent_id=None, pbar=None):
+        """
+        批量处理一页评论并写入CSV
+        返回 [(rpid, 回复数), ...]
+        """
+        if not replies:
+            return []
         
-        # 写入CSV
-        self.csv_writer.writerow(comment_data)
+        rows = [self.build_row(reply, parent_id) for reply in replies]
+        self.csv_writer.writerows(rows)
+        self._advance_progress(pbar, len(rows))
         
-        # 返回处理结果
-        return {
-            "rpid": rpid,
-            "rereply_count": rereply,
-            "data": comment_data
-        }
+        return [(row[2], row[9]) for row in rows]
 
-async def get_response(url, headers, max_retries=3):
-    """异步获取响应+重试机制"""
+def _endpoint_name(url):
+    """评论接口的指标名称"""
+    if "/reply/wbi/main" in url:
+        return "reply_main"
+    if "/reply/reply" in url:
+        return "reply_reply"
+    return "comment_api"
+
+
+async def get_response(url, headers, max_retries=3, decoder=json_loads):
+    """异步获取响应+重试机制，decoder 用于解析响应体"""
+    endpoint = _endpoint_name(url)
     for attempt in range(max_retries):
+        if attempt > 0:
+            metrics.inc("retries_total", endpoint=endpoint)
         try:
+            await rate_limiter.wait()
             async with aiohttp.ClientSession() as session:
-                async with session.get(url, headers=headers, timeout=10) as response:
-                    if response.status == 200:
-                        return await response.json()
-                    else:
-                        print(f"请求返回状态码: {response.status}, URL: {url}")
-                        if attempt < max_retries - 1:
-                            delay = 1 * (attempt + 1)
-                            print(f"将在{delay}秒后重试...")
-                            await asyncio.sleep(delay)
+                start = time.perf_counter()
+                with tracer.span(f"GET {endpoint}", "request"):
+                    async with session.get(url, headers=headers, timeout=10) as response:
+                        if response.status == 200:
+                            body = await response.read()
+                            metrics.record_request(endpoint, response.status, time.perf_counter() - start, len(body))
+                            with metrics.timer("parse_seconds", stage="comments"), tracer.span("parse", "parse"):
+                                return decoder(body)
                         else:
-                            response.raise_for_status()
+                            metrics.record_request(endpoint, response.status, time.perf_counter() - start)
+                            logger.warning("请求返回状态码: %s, URL: %s", response.status, url)
+                            if attempt < max_retries - 1:
+                                delay = 1 * (attempt + 1)
+                                logger.debug("将在%s秒后重试...", delay)
+                                await tracer.sleep(delay, "retry backoff")
+                            else:
+                                response.raise_for_status()
         except Exception as e:
             if attempt < max_retries - 1:
                 delay = 1 * (attempt + 1)
-                print(f"请求失败 ({attempt+1}/{max_retries}): {str(e)}, 将在{delay}秒后重试...")
-                await asyncio.sleep(delay)
+                logger.warning("请求失败 (%d/%d): %s, 将在%s秒后重试...", attempt + 1, max_retries, e, delay)
+                await tracer.sleep(delay, "retry backoff")
             else:
-                print(f"请求最终失败: {str(e)}")
+                logger.error("请求最终失败: %s", e)
                 raise
 
 
@@ -152,7 +182,7 @@ def get_header(cookie):
     }
     return header
 
-async def fetch_second_comments(aid, rpid, rereply, processor, header, parent_pbar=None):
+async def fetch_second_comments(aid, rpid, rereply, processor, header, parent_pbar=None, raise_errors=False):
     """异步爬取二级评论，限制并发"""
     second_pbar = tqdm(total=rereply, desc=f"爬取ID:{rpid}的二级评论", leave=False) if parent_pbar else None
     
@@ -166,32 +196,32 @@ async def fetch_second_comments(aid, rpid, rereply, processor, header, parent_pb
         batch_tasks = []
         for page in range(i + 1, min(i + batch_size + 1, pages + 1)):
             second_url = f"https://api.bilibili.com/x/v2/reply/reply?oid={aid}&type=1&root={rpid}&ps=10&pn={page}&web_location=333.788"
-            batch_tasks.append(fetch_second_page(second_url, header, processor, rpid, second_pbar))
+            batch_tasks.append(fetch_second_page(second_url, header, processor, rpid, second_pbar, raise_errors))
         
         # 执行当前批次的任务
-        await asyncio.gather(*batch_tasks)
+        with tracer.span("second comment batch", "batch", size=len(batch_tasks)):
+            await asyncio.gather(*batch_tasks)
         
         # 批次间短暂暂停
-        await asyncio.sleep(0.5)
+        await tracer.sleep(0.5, "second comment batch delay")
     
     if second_pbar:
         second_pbar.close()
 
-async def fetch_second_page(url, header, processor, parent_id, pbar=None):
+async def fetch_second_page(url, header, processor, parent_id, pbar=None, raise_errors=False):
     """获取单个二级评论页"""
     try:
-        second_comment = await get_response(url, header)
+        second_comment = await get_response(url, header, decoder=decode_reply_page)
         
-        if not second_comment['data']['replies']:
-            return
-            
-        for second in second_comment['data']['replies']:
-            processor.process_reply(second, parent_id=second["parent"], pbar=pbar)
+        processor.process_replies(second_comment['data']['replies'], pbar=pbar)
     except Exception as e:
-        print(f"二级评论获取失败: {e}")
+        if raise_errors:
+            raise
+        logger.warning("二级评论获取失败: %s", e)
 
-async def start_async(bv, aid, pageID, count, csv_writer, is_second, cookie, wts=None, pbar=None, max_page=None, page_counter=0):
-    """异步版本的start函数"""
+async def start_async(bv, aid, pageID, count, csv_writer, is_second, cookie, wts=None, pbar=None, max_page=None, page_counter=0,
+                      raise_errors=False):
+    """异步版本的start函数，raise_errors 为True时请求失败抛出异常（否则记录日志并返回已爬取的条数）"""
     # 初始化
     processor = CommentProcessor(csv_writer)
     processor.count = count
@@ -199,7 +229,7 @@ async def start_async(bv, aid, pageID, count, csv_writer, is_second, cookie, wts
     
     page_counter += 1
     if max_page is not None and page_counter > max_page:
-        print(f"已达到设定的最大页数限制: {max_page}页")
+        logger.info("已达到设定的最大页数限制: %d页", max_page)
         return count
     
     # 获取当下时间戳
@@ -233,26 +263,24 @@ async def start_async(bv, aid, pageID, count, csv_writer, is_second, cookie, wts
     url = f"https://api.bilibili.com/x/v2/reply/wbi/main?oid={aid}&type={type}&mode={mode}&pagination_str={urllib.parse.quote(pagination_str, safe=':')}&plat=1&seek_rpid=&web_location=1315875&w_rid={w_rid}&wts={wts}"
     
     if pbar is None:
-        print(f'正在请求: {url}')
+        logger.debug('正在请求: %s', url)
     
     header = get_header(cookie)
     
     try:
-        comment = await get_response(url, header)
+        comment = await get_response(url, header, decoder=decode_reply_page)
     except Exception as e:
-        print(f"请求或解码失败: {e}")
+        if raise_errors:
+            raise
+        logger.error("请求或解码失败: %s", e)
         return count
     
-    # 处理主评论
-    for reply in comment['data']['replies']:
-        result = processor.process_reply(reply, pbar=pbar)
-        rpid = result["rpid"]
-        rereply = result["rereply_count"]
-
+    # 处理主评论（整页批量转换）
+    for rpid, rereply in processor.process_replies(comment['data']['replies'], pbar=pbar):
         # 如果需要爬取二级评论
         if is_second and rereply != 0:
             # 将二级评论任务添加到任务列表
-            all_tasks.append(fetch_second_comments(aid, rpid, rereply, processor, header, pbar))
+            all_tasks.append(fetch_second_comments(aid, rpid, rereply, processor, header, pbar, raise_errors))
     
     if all_tasks:
         await asyncio.gather(*all_tasks)
@@ -261,13 +289,14 @@ async def start_async(bv, aid, pageID, count, csv_writer, is_second, cookie, wts
     is_end = comment['data']['cursor']['is_end']
 
     if is_end == 'true' or next_pageID == '':
-        print(f"评论爬取完成！总共爬取{processor.count}条。")
+        logger.info("评论爬取完成！总共爬取%d条。", processor.count)
         return processor.count
     else:
-        await asyncio.sleep(random.uniform(0.5, 1.5))
+        await tracer.sleep(random.uniform(0.5, 1.5), "comment page delay")
         if pbar is None:
-            print(f"当前爬取{processor.count}条。")
-        return await start_async(bv, aid, next_pageID, processor.count, csv_writer, is_second, cookie, wts, pbar, max_page, page_counter)
+            logger.debug("当前爬取%d条。", processor.count)
+        return await start_async(bv, aid, next_pageID, processor.count, csv_writer, is_second, cookie, wts, pbar, max_page, page_counter,
+                                 raise_errors)
 
 async def async_crawler(): # 测试用
     """异步爬虫主函数"""
@@ -305,4 +334,5 @@ async def async_crawler(): # 测试用
         print(f"爬取完成！结果已保存至 {title[:12]}_评论_异步.csv")
 
 if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
     asyncio.run(async_crawler())
\ No newline at end of file
@@ -1,4 +1,5 @@
 import requests
+import logging
 from bs4 import BeautifulSoup
 import re
 import pandas as pd
@@ -7,29 +8,51 @@ import time
 import random_bil_cookie
 from datetime import datetime
 
+logger = logging.getLogger(__name__)
+
 
 def decode_html_entities(text):
     # 替换unicode转义字符
     text = text.replace("\\u003Cem class=\\\"keyword\\\"\\u003E", "").replace("\\u003C\\u002Fem\\u003E", "")
     return text
 
+def decode_js_url(text):
+    # 搜索数据中的链接使用 \u002F 转义，且通常省略协议
+    text = text.replace("\\u002F", "/")
+    if text.startswith("//"):
+        text = "https:" + text
+    return text
+
+# 搜索结果字段匹配规则，(?<!\w) 保证只匹配完整字段名（如 review 不会匹配 video_review）
+SEARCH_FIELD_PATTERNS = {
+    "BV号": r'(?<!\w)bvid:"([^"]*)"',
+    "标题": r'(?<!\w)title:"(.*?)",',
+    "作者": r'(?<!\w)author:"(.*?)",',
+    "发布时间": r'(?<!\w)pubdate:(\d+)',
+    "播放量": r'(?<!\w)play:(\d+)',
+    "点赞数": r'(?<!\w)like:(\d+)',
+    "收藏数": r'(?<!\w)favorites:(\d+)',
+    "时长": r'(?<!\w)duration:"([^"]*)"',
+    "视频介绍": r'(?<!\w)description:"([^"]*)"',
+    "标签": r'(?<!\w)tag:"([^"]*)"',
+    "评论数": r'(?<!\w)review:(\d+)',
+    "AV号": r'(?<!\w)aid:(\d+)',
+    "UP主ID": r'(?<!\w)mid:(\d+)',
+    "分区ID": r'(?<!\w)typeid:"?(\d+)"?',
+    "分区": r'(?<!\w)typename:"([^"]*)"',
+    "弹幕数": r'(?<!\w)video_review:(\d+)',
+    "封面": r'(?<!\w)pic:"([^"]*)"',
+    "UP主头像": r'(?<!\w)upic:"([^"]*)"',
+    "视频链接": r'(?<!\w)arcurl:"([^"]*)"',
+}
+
+URL_FIELDS = {"封面", "UP主头像", "视频链接"}
+
 def extract_video_info(html_content):
     videos = []
     
     # 使用正则表达式匹配视频信息
-    patterns = {
-        "BV号": r'bvid:"([^"]*)"',
-        "标题": r'title:"(.*?)",',
-        "作者": r'author:"(.*?)",',
-        "发布时间": r'pubdate:(\d+)',
-        "播放量": r'play:(\d+)',
-        "点赞数": r'like:(\d+)',
-        "收藏数": r'favorites:(\d+)',
-        "时长": r'duration:"([^"]*)"',
-        "视频介绍": r'description:"([^"]*)"',
-        "标签": r'tag:"([^"]*)"',
-        "评论数": r'review:(\d+)'
-    }
+    patterns = SEARCH_FIELD_PATTERNS
     
     video_blocks = re.findall(r'{[^{}]*}', html_content)
     
@@ -48,6 +71,8 @@ def extract_video_info(html_content):
                         value = datetime.fromtimestamp(int(value)).strftime("%Y-%m-%d %H:%M:%S")
                     elif key == "标题":
                         value = decode_html_entities(value)
+                    elif key in URL_FIELDS:
+                        value = decode_js_url(value)
                     video[key] = value
                 else:
                     video[key] = "N/A"
@@ -57,6 +82,15 @@ def extract_video_info(html_content):
             
     return videos
 
+def extract_result_stats(html_content):
+    """提取搜索结果总数(num_results)和总页数(num_pages)，缺失的项不返回"""
+    stats = {}
+    for key, pattern in (("num_results", r'numResults:(\d+)'), ("num_pages", r'numPages:(\d+)')):
+        match = re.search(pattern, html_content)
+        if match:
+            stats[key] = int(match.group(1))
+    return stats
+
 def bil_search_page(url,headers = {}) -> pd.DataFrame:
     if headers == {}:
         headers = {
@@ -92,22 +126,26 @@ def bil_search_page(url,headers = {}) -> pd.DataFrame:
 
         if 'search.bilibili.com/video' in url:
             pattern = r'egg_hit:a\s*,result:\s*(\[.*?\])\s*,show'
-            match = re.search(pattern, soup.prettify())
+            page_text = soup.prettify()
+            match = re.search(pattern, page_text)
             
             if match:
                 data_str = match.group(1)
                 # 解析视频数据
                 video_list = extract_video_info(data_str)
                 video_data = pd.DataFrame(video_list)
+                # 记录搜索结果总数和总页数（用于判断时间段是否达到搜索结果上限），
+                # 并标记为已解析的结果页：风控/验证页面同样返回空表，但没有该标记
+                video_data.attrs.update(extract_result_stats(page_text), results_page=True)
                 return video_data
             else:
-                print("未找到匹配的数据")
+                logger.warning("未找到匹配的数据")
                 return pd.DataFrame()
                 
         else:
             video_list = soup.find('div', class_='video-list row')
             if not video_list:
-                print("未找到视频列表")
+                logger.warning("未找到视频列表")
                 return pd.DataFrame()
             
             results = []
@@ -141,7 +179,7 @@ def bil_search_page(url,headers = {}) -> pd.DataFrame:
                     })
                     
                 except Exception as e:
-                    print(f"解析单个视频时出错: {str(e)}")
+                    logger.warning("解析单个视频时出错: %s", e)
                     continue
 
         results_df = pd.DataFrame(results)
@@ -149,11 +187,12 @@ def bil_search_page(url,headers = {}) -> pd.DataFrame:
         return results_df.reset_index(drop=True)
         
     except Exception as e:
-        print(f"请求出错: {str(e)}")
+        logger.error("请求出错: %s", e)
         return []
 
 # 使用示例
 if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
     search_url = "https://search.bilibili.com/video?keyword=%E9%A3%9F%E7%89%A9%E8%AF%AD&page=1&search_source=3&order=click"
     
     video_data = bil_search_page(search_url)
@@ -1,11 +1,17 @@
 import aiohttp
+import logging
 import asyncio
-import json
 import time
 import re
 from urllib.parse import urlencode, quote
 from bs4 import BeautifulSoup
 from bil_search_page import bil_search_page
+from fast_json import loads as json_loads, decode_video_data
+from crawl_state import JsonStateStore
+from bv_codec import bv2av, bvids_to_aids, is_valid_bvid
+from crawl_metrics import metrics
+from task_tracer import tracer
+from crawl_scheduler import rate_limiter
 from typing import Dict, List, Any, Optional, Union
 import pandas as pd
 import random
@@ -13,17 +19,184 @@ import random_bil_cookie
 from tqdm import tqdm
 from datetime import datetime, timedelta
 
+logger = logging.getLogger(__name__)
+
+
+# 视频详情获取方式: "html" 解析视频页面，"json" 调用 /x/web-interface/view 接口
+DETAIL_BACKENDS = ("html", "json")
+
+# 流式读取视频页面时的标记：读到 __INITIAL_STATE__ 所在脚本结束即可停止
+INITIAL_STATE_MARKER = b"window.__INITIAL_STATE__"
+SCRIPT_END_MARKER = b"</script>"
+STREAM_CHUNK_SIZE = 16384
+
+# 搜索结果少于该数量的页面视为末页（实际整页数量会在翻页过程中学习）
+SEARCH_MIN_FULL_PAGE = 20
+
+# B站单次搜索最多返回的结果数，达到该数量说明结果被截断
+SEARCH_RESULT_CAP = 1000
+
+# 搜索时间段划分方式: "daily" 按天固定划分，"adaptive" 按结果量自适应二分
+SEARCH_PARTITIONS = ("daily", "adaptive")
+
+# 搜索结果排序: "click" 按播放量，"pubdate" 按发布时间从新到旧（监控模式）
+SEARCH_ORDERS = ("click", "pubdate")
+
+# view接口表示视频不存在/不可见的返回码（-404 不存在，62002 稿件不可见，62004 审核中，62012 仅UP主可见）
+DEAD_VIDEO_CODES = (-404, 62002, 62004, 62012)
+
+
+# 按最近N天搜索时每个时间段最多请求的页数
+RECENT_DAYS_MAX_PAGE = 5
+
+
+def build_search_slices(time_begin=None, time_end=None, recent_days=None, partition="daily", now=None) -> List[tuple]:
+    """
+    生成搜索时间段（search_videos 与 crawl_planner 共用）
+    
+    参数:
+        time_begin/time_end: 时间范围字符串，如 "2024-01-01 00:00:00"
+        recent_days: 最近几天；"daily" 时每天一个时间段，"adaptive" 时为一个完整时间段
+        partition: 时间段划分方式
+        now: 当前时间，默认 datetime.now()
+    
+    返回:
+        [(开始时间戳, 结束时间戳, 标签)]，不限时间时为 [(None, None, None)]
+    """
+    time_slices = []
+    if recent_days is not None and partition == "adaptive":
+        # 从完整的最近N天范围开始，由自适应划分决定切分粒度
+        now = now or datetime.now()
+        start_date = (now - timedelta(days=recent_days - 1)).replace(hour=0, minute=0, second=0)
+        end_date = now.replace(hour=23, minute=59, second=59)
+        time_slices.append((
+            int(time.mktime(start_date.timetuple())),
+            int(time.mktime(end_date.timetuple())),
+            None
+        ))
+    elif recent_days is not None:
+        # 生成每天的时间范围
+        now = now or datetime.now()
+        for day in range(recent_days):
+            end_date = now - timedelta(days=day)
+            start_date = end_date.replace(hour=0, minute=0, second=0)
+            end_date = end_date.replace(hour=23, minute=59, second=59)
+            time_slices.append((
+                int(time.mktime(start_date.timetuple())),
+                int(time.mktime(end_date.timetuple())),
+                f"近{day+1}天"
+            ))
+    elif time_begin or time_end:
+        # time_begin 和 time_end 是日期格式，并且必须同时存在
+        if not time_begin or not time_end:
+            raise ValueError("time_begin 和 time_end 必须同时存在")
+        try:
+            time_slices.append((
+                int(time.mktime(time.strptime(time_begin, "%Y-%m-%d %H:%M:%S"))),
+                int(time.mktime(time.strptime(time_end, "%Y-%m-%d %H:%M:%S"))),
+                None
+            ))
+        except ValueError as e:
+            raise ValueError(f"时间格式错误: {e}")
+    else:
+        time_slices.append((None, None, None))
+    return time_slices
+
+
+def search_min_slice_seconds(hours) -> int:
+    """
+    将 search_min_slice_hours 转换为秒
+    
+    最小长度不足1秒时自适应划分会无限二分，因此直接报错。
+    
+    参数:
+        hours: 时间段最小长度(小时)
+    
+    返回:
+        时间段最小长度(秒)
+    """
+    seconds = int(hours * 3600)
+    if seconds < 1:
+        raise ValueError(f"search_min_slice_hours 必须大于0: {hours}")
+    return seconds
+
+
+def _split_slice(time_slice, parts, min_length) -> List[tuple]:
+    """将时间段等分为最多 parts 段，每段不短于 min_length 秒；不限时间的时间段不切分"""
+    begin_ts, end_ts, label = time_slice
+    if begin_ts is None:
+        return [time_slice]
+    parts = min(parts, (end_ts - begin_ts + 1) // max(min_length, 1))
+    if parts <= 1:
+        return [time_slice]
+    bounds = [begin_ts + (end_ts - begin_ts + 1) * i // parts for i in range(parts + 1)]
+    return [(bounds[i], bounds[i + 1] - 1, label) for i in range(parts)]
+
+
+def _is_results_page(result_stats) -> bool:
+    """bil_search_page 的结果是否来自解析成功的搜索结果页（而不是风控/验证页面）"""
+    return bool(result_stats.get("results_page")
+                or "num_results" in result_stats or "num_pages" in result_stats)
+
+
+def search_state_key(keyword, begin_ts, end_ts, order="click") -> Optional[str]:
+    """搜索状态键；只有已结束的时间段结果稳定，才记录末页"""
+    if end_ts is None or end_ts >= time.time():
+        return None
+    return f"{keyword}|{begin_ts}|{end_ts}|{order}"
+
+
+class HTTPStatusError(Exception):
+    """HTTP状态码非200时抛出，保留状态码供调用方区分处理"""
+    
+    def __init__(self, status):
+        super().__init__(f"HTTP Error: {status}")
+        self.status = status
+
 
 class BilibiliAPI:
-    def __init__(self, search_host = "search.bilibili.com"):
+    def __init__(self, search_host = "search.bilibili.com", detail_backend="html", stream_pages=True,
+                 search_state_path=None, search_state_ttl=None,
+                 negative_cache_path=None, negative_cache_ttl=3 * 86400):
+        if detail_backend not in DETAIL_BACKENDS:
+            raise ValueError(f"不支持的详情获取方式: {detail_backend}，可选 {DETAIL_BACKENDS}")
         self.search_host = search_host
         self.api_host = "api.bilibili.com"
         self.main_host = "www.bilibili.com"
         self.api_prefix = "/x"
+        self.detail_backend = detail_backend
+        self.stream_pages = stream_pages
+        # 搜索状态：记录已结束时间段的末页，避免重复请求超出末页的页码
+        self.search_state = JsonStateStore(search_state_path, ttl=search_state_ttl) if search_state_path else None
+        # 失效视频缓存：HTTP 404 或接口返回 DEAD_VIDEO_CODES 的视频，在有效期内不再请求
+        self.negative_cache = JsonStateStore(negative_cache_path, ttl=negative_cache_ttl)
+        # 进行中的详情请求：同一BV号的并发请求共享一次获取
+        self._inflight = {}
+        # 已发出的请求数（搜索页、视频页、接口），用于预算统计
+        self.request_count = 0
         self.cookie = random_bil_cookie.get_random_cookies(scene='search',timestamp=int(time.time()))
+        self._session = None
+    
+    async def _get_session(self) -> aiohttp.ClientSession:
+        """获取共享的HTTP会话（复用连接池）"""
+        if self._session is None or self._session.closed:
+            self._session = aiohttp.ClientSession()
+        return self._session
+    
+    async def close(self):
+        """关闭共享的HTTP会话"""
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+        self._session = None
 
-    async def _get_html(self, url, referer="https://www.bilibili.com",cookie=None) -> str:
-        """获取网页 HTML 内容"""
+    async def _get_html(self, url, referer="https://www.bilibili.com",cookie=None, stop_at_state=False,
+                        endpoint="video_page") -> str:
+        """
+        获取网页 HTML 内容
+        
+        stop_at_state 为 True 时流式读取，读到 __INITIAL_STATE__ 脚本结束后立即停止并断开连接；
+        页面中没有该脚本时会读完整个页面。
+        """
         headers = {
             'User-Agent': f'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/{random.randint(120, 135)}.0.0.0 Safari/537.36 Edg/{random.randint(120, 135)}.0.0.0',
             'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/avif,image/webp,image/apng,*/*;q=0.8,application/signed-exchange;v=b3;q=0.7',
@@ -48,185 +221,480 @@ class BilibiliAPI:
         if cookie is None:
             cookie = self.cookie
         
-        async with aiohttp.ClientSession() as session:
+        session = await self._get_session()
+        await rate_limiter.wait()
+        self.request_count += 1
+        start = time.perf_counter()
+        with tracer.span(f"GET {endpoint}", "request"):
             async with session.get(url, headers=headers, cookies=cookie) as response:
                 if response.status != 200:
-                    raise Exception(f"HTTP Error: {response.status}")
-                return await response.text()
+                    metrics.record_request(endpoint, response.status, time.perf_counter() - start)
+                    raise HTTPStatusError(response.status)
+                if stop_at_state:
+                    html = await self._read_until_state(response)
+                else:
+                    html = await response.text()
+                metrics.record_request(endpoint, response.status, time.perf_counter() - start,
+                                       response.content.total_bytes)
+                return html
     
-    async def search_videos(self, keyword, time_begin=None, time_end=None, pages=None, recent_days=None) -> List[Dict]:
+    async def _read_until_state(self, response) -> str:
+        """分块读取响应体，__INITIAL_STATE__ 所在脚本完整后提前结束"""
+        buffer = bytearray()
+        state_pos = -1
+        scanned = 0
+        
+        async for chunk in response.content.iter_chunked(STREAM_CHUNK_SIZE):
+            buffer.extend(chunk)
+            
+            # 只扫描新读到的部分（向前多留一个标记长度，防止标记跨块）
+            if state_pos < 0:
+                state_pos = buffer.find(INITIAL_STATE_MARKER, max(0, scanned - len(INITIAL_STATE_MARKER)))
+            if state_pos >= 0:
+                end_pos = buffer.find(SCRIPT_END_MARKER, max(state_pos, scanned - len(SCRIPT_END_MARKER)))
+                if end_pos >= 0:
+                    # 剩余内容不再需要，关闭连接而不是继续下载
+                    response.close()
+                    break
+            scanned = len(buffer)
+        
+        return buffer.decode(response.charset or 'utf-8', errors='replace')
+    
+    async def _get_json(self, url, params=None, referer="https://www.bilibili.com", cookie=None,
+                        endpoint="view_api") -> Dict:
+        """调用B站JSON接口"""
+        headers = {
+            'User-Agent': f'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/{random.randint(120, 135)}.0.0.0 Safari/537.36 Edg/{random.randint(120, 135)}.0.0.0',
+            'Accept': 'application/json, text/plain, */*',
+            'Accept-Language': 'zh-CN,zh;q=0.9,en;q=0.8,en-GB;q=0.7,en-US;q=0.6,zh-TW;q=0.5',
+            'Accept-Encoding': 'gzip, deflate, br, zstd',
+            'Origin': 'https://www.bilibili.com',
+            'Referer': referer,
+            'Sec-Fetch-Dest': 'empty',
+            'Sec-Fetch-Mode': 'cors',
+            'Sec-Fetch-Site': 'same-site',
+        }
+        
+        if cookie is None:
+            cookie = self.cookie
+        
+        session = await self._get_session()
+        await rate_limiter.wait()
+        self.request_count += 1
+        start = time.perf_counter()
+        with tracer.span(f"GET {endpoint}", "request"):
+            async with session.get(url, params=params, headers=headers, cookies=cookie) as response:
+                if response.status != 200:
+                    metrics.record_request(endpoint, response.status, time.perf_counter() - start)
+                    raise HTTPStatusError(response.status)
+                body = await response.read()
+                metrics.record_request(endpoint, response.status, time.perf_counter() - start, len(body))
+                return json_loads(body)
+    
+    async def search_videos(self, keyword, time_begin=None, time_end=None, pages=None, recent_days=None,
+                            partition="daily", min_slice_seconds=3600, order="click",
+                            slice_filter=None, root_splits=1, budget=None) -> List[Dict]:
         """
         搜索视频获取基本信息，支持多页同时搜索
         
+        每个时间段按页顺序请求，遇到空页、不足一整页或全部重复的页面即停止该时间段；
+        已知超出末页的页码会记录在搜索状态中，后续运行直接跳过。
+        
         参数:
             keyword: 关键词
             time_begin: 开始时间
             time_end: 结束时间
             pages: 页码列表，默认为[1]
             recent_days: 最近几天，如果设置，将按天搜索
+            partition: 时间段划分方式，"daily" 按天划分(仅recent_days)，
+                       "adaptive" 从整个时间范围开始，结果达到上限时二分
+            min_slice_seconds: 自适应划分时时间段的最小长度(秒)，至少为1
+            order: 结果排序方式，见 SEARCH_ORDERS
+            slice_filter: 时间段过滤函数 (keyword, begin_ts, end_ts) -> bool，在搜索每个时间段前调用，
+                          返回False的时间段跳过（多进程爬取时用于逐个认领时间段）
+            root_splits: 自适应划分时先把每个时间段等分为几段（长度足够时），
+                         使多个进程可以分担同一个关键词
+            budget: crawl_scheduler.CrawlBudget，每个搜索页计入预算，用完后不再请求后续时间段和页面
         
         返回:
             包含基本视频信息的字典列表
         """
+        if partition not in SEARCH_PARTITIONS:
+            raise ValueError(f"不支持的时间段划分方式: {partition}，可选 {SEARCH_PARTITIONS}")
+        if order not in SEARCH_ORDERS:
+            raise ValueError(f"不支持的排序方式: {order}，可选 {SEARCH_ORDERS}")
+        if partition == "adaptive" and min_slice_seconds < 1:
+            raise ValueError(f"时间段最小长度必须至少为1秒: {min_slice_seconds}")
         if pages is None:
             pages = [1]
         elif recent_days:
-            pages = [p for p in pages if p <= 5]  # 限制在5页以内
+            pages = [p for p in pages if p <= RECENT_DAYS_MAX_PAGE]
         elif isinstance(pages, int):
             pages = [pages]
-                        
+        pages = sorted(pages)
+        
+        # 生成时间段: (开始时间戳, 结束时间戳, 标签)
+        time_slices = build_search_slices(time_begin, time_end, recent_days, partition)
+        if partition == "adaptive" and root_splits > 1:
+            time_slices = [part for time_slice in time_slices
+                           for part in _split_slice(time_slice, root_splits, 2 * min_slice_seconds)]
+        
+        # 创建进度条，总数为时间段数*页面数（提前结束的时间段会跳过剩余页数）；
+        # 有 slice_filter 时只计入实际认领的时间段
+        pbar = tqdm(total=0 if slice_filter else len(time_slices) * len(pages), desc=f"搜索关键词: {keyword}")
+        
         all_video_data = []
+        for begin_ts, end_ts, label in time_slices:
+            if budget is not None and budget.exhausted:
+                break
+            if slice_filter is not None:
+                # 在搜索前逐个认领，其他进程可以同时认领后面的时间段
+                if not slice_filter(keyword, begin_ts, end_ts):
+                    continue
+                pbar.total += len(pages)
+                pbar.refresh()
+            if partition == "adaptive" and begin_ts is not None:
+                all_video_data.extend(
+                    await self._search_partitioned(keyword, begin_ts, end_ts, pages, pbar, min_slice_seconds, order,
+                                                   budget)
+                )
+            else:
+                slice_videos, _ = await self._search_slice(keyword, begin_ts, end_ts, pages, label, pbar, order=order,
+                                                           budget=budget)
+                all_video_data.extend(slice_videos)
+        
+        pbar.close()
+        if self.search_state is not None:
+            self.search_state.save()
         
-        # 处理近期日期选项-限制在5页以内
-        if recent_days is not None:
-            # 生成每天的时间范围
-            now = datetime.now()
-            daily_ranges = []
+        # 去重（基于BV号）
+        unique_videos = {}
+        for video in all_video_data:
+            bvid = video["video"]["bvid"]
+            if bvid not in unique_videos:
+                unique_videos[bvid] = video
+        
+        logger.info("搜索完成，找到 %d 个唯一视频", len(unique_videos))
+        return list(unique_videos.values())
+    
+    async def search_slice(self, keyword, begin_ts=None, end_ts=None, pages=None, label=None,
+                           order="click", stop_if_saturated=False):
+        """
+        搜索单个时间段（任务队列的搜索任务使用）
+        
+        与 search_videos 不同，任何一页失败都会抛出异常，由调用方决定是否重试整个时间段。
+        
+        参数:
+            keyword: 关键词
+            begin_ts/end_ts: 发布时间范围时间戳，均为None表示不限时间
+            pages: 升序页码列表，默认为[1]
+            label: 时间段标签
+            order: 结果排序方式，见 SEARCH_ORDERS
+            stop_if_saturated: 首页即可判断结果被截断时不再翻页
+        
+        返回:
+            (基本视频信息列表, 是否饱和)
+        """
+        if order not in SEARCH_ORDERS:
+            raise ValueError(f"不支持的排序方式: {order}，可选 {SEARCH_ORDERS}")
+        videos, saturated = await self._search_slice(
+            keyword, begin_ts, end_ts, sorted(pages or [1]), label, tqdm(disable=True),
+            stop_if_saturated=stop_if_saturated, order=order, strict=True
+        )
+        if self.search_state is not None:
+            self.search_state.save()
+        return videos, saturated
+    
+    async def search_new_videos(self, keyword, known_bvids, max_pages=5) -> List[Dict]:
+        """
+        按发布时间从新到旧搜索关键词，遇到已知BV号即停止翻页（监控模式）
+        
+        参数:
+            keyword: 关键词
+            known_bvids: 该关键词已处理过的BV号集合，为空时请求 max_pages 页
+            max_pages: 最多请求的页数
+        
+        返回:
+            排在第一个已知视频之前的基本信息列表（即上次监控之后的新视频）
+        
+        任何一页失败都会抛出异常而不返回部分结果，避免跳过的页面中的视频被当作已处理。
+        """
+        pbar = tqdm(total=max_pages, desc=f"监控关键词: {keyword}", leave=False)
+        try:
+            videos, _ = await self._search_slice(
+                keyword, None, None, list(range(1, max_pages + 1)), None, pbar,
+                order="pubdate", stop_bvids=set(known_bvids), strict=True
+            )
+        finally:
+            pbar.close()
+        return videos
+    
+    async def _search_partitioned(self, keyword, begin_ts, end_ts, pages, pbar, min_slice_seconds,
+                                  order="click", budget=None) -> List[Dict]:
+        """
+        自适应划分时间段搜索
+        
+        先搜索整个时间段；若结果达到搜索上限（被截断），则二分为前后两段分别递归搜索，
+        直到时间段不再饱和或达到最小长度。结果稀少的时间段因此保持为一个宽时间段。
+        
+        参数:
+            keyword: 关键词
+            begin_ts/end_ts: 时间段起止时间戳
+            pages: 升序页码列表
+            pbar: 进度条（总数随时间段增加而增长）
+            min_slice_seconds: 时间段最小长度(秒)
+            order: 结果排序方式
+            budget: 请求预算，见 search_videos
+        
+        返回:
+            该时间段及其子时间段的基本视频信息列表
+        """
+        can_split = end_ts - begin_ts >= 2 * min_slice_seconds
+        label = f"{datetime.fromtimestamp(begin_ts):%m-%d %H:%M}~{datetime.fromtimestamp(end_ts):%m-%d %H:%M}"
+        
+        videos, saturated = await self._search_slice(
+            keyword, begin_ts, end_ts, pages, label, pbar, stop_if_saturated=can_split, order=order, budget=budget
+        )
+        if not saturated or not can_split or (budget is not None and budget.exhausted):
+            return videos
+        
+        middle = begin_ts + (end_ts - begin_ts) // 2
+        pbar.total += 2 * len(pages)
+        pbar.refresh()
+        videos.extend(await self._search_partitioned(keyword, begin_ts, middle, pages, pbar, min_slice_seconds,
+                                                     order, budget))
+        videos.extend(await self._search_partitioned(keyword, middle + 1, end_ts, pages, pbar, min_slice_seconds,
+                                                     order, budget))
+        return videos
+    
+    async def _search_slice(self, keyword, begin_ts, end_ts, pages, label, pbar, stop_if_saturated=False,
+                            order="click", stop_bvids=None, strict=False, budget=None):
+        """
+        自适应翻页搜索单个时间段
+        
+        参数:
+            keyword: 关键词
+            begin_ts/end_ts: 发布时间范围时间戳，均为None表示不限时间
+            pages: 升序页码列表
+            label: 时间段标签（按天搜索时记录在结果中）
+            pbar: 进度条
+            stop_if_saturated: 首页即可判断结果被截断时，不再翻页（由调用方拆分时间段）
+            order: 结果排序方式
+            stop_bvids: 按发布时间排序时的已知BV号集合，遇到其中任一个即停止（之后都是更早的视频）
+            strict: 为True时搜索页失败直接抛出异常，否则记录日志并跳过该页
+            budget: 请求预算，每页计入1次请求，用完时停止翻页（不记录末页，也不视为饱和）
+        
+        返回:
+            (该时间段的基本视频信息列表, 是否饱和)
+            饱和表示结果达到搜索上限或页码用尽仍未到末页
+        """
+        state_key = search_state_key(keyword, begin_ts, end_ts, order)
+        known_end = None
+        if state_key and self.search_state is not None:
+            known_end = self.search_state.get(state_key)
+        
+        slice_videos = []
+        seen_bvids = set()
+        full_page_size = SEARCH_MIN_FULL_PAGE
+        reached_end = False
+        saturated = False
+        budget_stopped = False
+        
+        for index, page in enumerate(pages):
+            remaining = len(pages) - index
+            if budget is not None and budget.exhausted:
+                pbar.update(remaining)
+                budget_stopped = True
+                break
+            if known_end is not None and page > known_end:
+                # 之前的运行已确认此后没有结果
+                pbar.update(remaining)
+                reached_end = True
+                break
             
-            for day in range(recent_days):
-                end_date = now - timedelta(days=day)
-                start_date = end_date.replace(hour=0, minute=0, second=0)
-                end_date = end_date.replace(hour=23, minute=59, second=59)
-                
-                daily_ranges.append({
-                    "begin": start_date.strftime("%Y-%m-%d %H:%M:%S"),
-                    "end": end_date.strftime("%Y-%m-%d %H:%M:%S"),
-                    "label": f"近{day+1}天"
-                })
+            if label:
+                pbar.set_description(f"搜索关键词: {keyword} - {label} - 第{page}页")
+            else:
+                pbar.set_description(f"搜索关键词: {keyword} - 第{page}页")
             
-            # 创建进度条，总数为关键词*天数*页面数
-            total_iterations = len(daily_ranges) * len(pages)
-            pbar = tqdm(total=total_iterations, desc=f"搜索关键词: {keyword}")
+            # 构建搜索URL
+            encoded_keyword = quote(keyword)
+            search_url = f"https://{self.search_host}/video?keyword={encoded_keyword}&from_source=webtop_search&page={page}&search_source=3&order={order}"
+            if begin_ts is not None:
+                search_url += f"&pubtime_begin_s={begin_ts}&pubtime_end_s={end_ts}"
             
-            for date_range in daily_ranges:
-                day_begin = date_range["begin"]
-                day_end = date_range["end"]
-                day_label = date_range["label"]
-                
-                for page in pages:
-                    pbar.set_description(f"搜索关键词: {keyword} - {day_label} - 第{page}页")
-                    
-                    # 构建搜索URL
-                    encoded_keyword = quote(keyword)
-                    search_url = f"https://{self.search_host}/video?keyword={encoded_keyword}&from_source=webtop_search&page={page}&search_source=3&order=click"
-                    
-                    try:
-                        # 添加时间戳参数
-                        begin_ts = int(time.mktime(time.strptime(day_begin, "%Y-%m-%d %H:%M:%S")))
-                        end_ts = int(time.mktime(time.strptime(day_end, "%Y-%m-%d %H:%M:%S")))
-                        search_url += f"&pubtime_begin_s={begin_ts}&pubtime_end_s={end_ts}"
-                        
-                        # 使用bil_search_page获取搜索结果
+            try:
+                # 使用bil_search_page获取搜索结果
+                await rate_limiter.wait()
+                self.request_count += 1
+                if budget is not None:
+                    budget.spend(1)
+                start = time.perf_counter()
+                try:
+                    with tracer.span("GET search_page", "request"):
                         video_df = bil_search_page(search_url)
-                        video_df = video_df.dropna(subset=['BV号'])
-                        video_df = video_df.drop_duplicates(subset=['BV号'], keep='first')
-                        
-                        if isinstance(video_df, pd.DataFrame) and not video_df.empty:
-                            for _, video in video_df.iterrows():
-                                # 基本信息
-                                basic_info = {
-                                    "video": {
-                                        "bvid": video['BV号'],
-                                        "title": video.get('标题', ''),
-                                        "view_count": self._parse_view_count(video.get('播放量', '0')),
-                                        "pubdate": video.get('发布时间', ''),
-                                        "duration": video.get('时长', ''),
-                                        "description": video.get('视频介绍', ''),
-                                        "aid": 0,  # 初始值，详细信息获取时会更新
-                                        "_from_search": True,
-                                        "_search_keyword": keyword,
-                                        "_search_page": page,
-                                        "_search_day": day_label
-                                    },
-                                    "owner": {
-                                        "name": video.get('作者', video.get('UP主', '')),
-                                        "mid": 0
-                                    }
-                                }
-                                all_video_data.append(basic_info)
-                        
-                        pbar.update(1)
-                        await asyncio.sleep(random.uniform(0.5, 1.5))
-                        
-                    except Exception as e:
-                        print(f"搜索页 {page} - {day_label} 处理失败: {str(e)}")
-                        pbar.update(1)
-                        continue
+                finally:
+                    metrics.observe("request_seconds", time.perf_counter() - start, endpoint="search_page")
+                # bil_search_page 出错时返回空列表而不是DataFrame；没有解析到结果页的记为 blocked
+                if not isinstance(video_df, pd.DataFrame):
+                    metrics.inc("requests_total", endpoint="search_page", status="error")
+                    raise ValueError("搜索页请求失败")
+                result_stats = dict(video_df.attrs)
+                metrics.inc("requests_total", endpoint="search_page",
+                            status="200" if _is_results_page(result_stats) else "blocked")
+                if not _is_results_page(result_stats):
+                    # 风控、验证码或非200页面同样返回空表，不能当作末页记录
+                    raise ValueError("搜索页未解析到结果数据（可能被风控拦截）")
+                if video_df.empty or 'BV号' not in video_df.columns:
+                    # 结果页中没有匹配结果时返回不含任何列的空表，按空页处理（已到末页）
+                    video_df = pd.DataFrame(columns=['BV号'])
+                video_df = video_df.dropna(subset=['BV号'])
+                video_df = video_df.drop_duplicates(subset=['BV号'], keep='first')
+            except Exception as e:
+                if strict:
+                    raise
+                if label:
+                    logger.warning("搜索页 %s - %s 处理失败: %s", page, label, e)
+                else:
+                    logger.warning("搜索页 %s 处理失败: %s", page, e)
+                pbar.update(1)
+                continue
             
-            pbar.close()
+            page_count = len(video_df)
+            new_count = 0
+            reached_known = False
+            # 本地由BV号计算AV号，评论爬取无需再请求视频详情
+            page_aids = bvids_to_aids(video_df['BV号'])
+            for (_, video), aid in zip(video_df.iterrows(), page_aids):
+                if stop_bvids and video['BV号'] in stop_bvids:
+                    reached_known = True
+                    break
+                if video['BV号'] in seen_bvids:
+                    continue
+                seen_bvids.add(video['BV号'])
+                new_count += 1
+                slice_videos.append(self._search_row_to_basic_info(video, keyword, page, label, int(aid)))
             
-        else:
-            # 原有逻辑 - 按照指定的时间范围搜索
-            total_pages = len(pages)
-            pbar = tqdm(total=total_pages, desc=f"搜索关键词: {keyword}")
+            pbar.update(1)
             
-            for page in pages:
-                pbar.set_description(f"搜索关键词: {keyword} - 第{page}页")
-                
-                # 构建搜索URL
-                encoded_keyword = quote(keyword)
-                search_url = f"https://{self.search_host}/video?keyword={encoded_keyword}&from_source=webtop_search&page={page}&search_source=3&order=click"
-                
-                # time_begin 和 time_end 是日期格式，并且必须同时存在
-                if time_begin or time_end:
-                    if not time_begin or not time_end:
-                        raise ValueError("time_begin 和 time_end 必须同时存在")
-                    # 将时间转换为时间戳
-                    try:
-                        time_begin_ts = int(time.mktime(time.strptime(time_begin, "%Y-%m-%d %H:%M:%S")))
-                        time_end_ts = int(time.mktime(time.strptime(time_end, "%Y-%m-%d %H:%M:%S")))
-                        search_url += f"&pubtime_begin_s={time_begin_ts}&pubtime_end_s={time_end_ts}"
-                    except ValueError as e:
-                        raise ValueError(f"时间格式错误: {e}")
-                
-                # 使用bil_search_page获取搜索结果
-                try:
-                    video_df = bil_search_page(search_url)
-                    video_df = video_df.dropna(subset=['BV号'])
-                    video_df = video_df.drop_duplicates(subset=['BV号'], keep='first')
-                    
-                    if isinstance(video_df, pd.DataFrame) and not video_df.empty:
-                        for _, video in video_df.iterrows():
-                            # 基本信息
-                            basic_info = {
-                                "video": {
-                                    "bvid": video['BV号'],
-                                    "title": video.get('标题', ''),
-                                    "view_count": self._parse_view_count(video.get('播放量', '0')),
-                                    "pubdate": video.get('发布时间', ''),
-                                    "duration": video.get('时长', ''),
-                                    "description": video.get('视频介绍', ''),
-                                    "aid": 0,  # 初始值，详细信息获取时会更新
-                                    "_from_search": True,
-                                    "_search_keyword": keyword,
-                                    "_search_page": page
-                                },
-                                "owner": {
-                                    "name": video.get('作者', video.get('UP主', '')),
-                                    "mid": 0
-                                }
-                            }
-                            all_video_data.append(basic_info)
-                    
-                    pbar.update(1)
-                    await asyncio.sleep(random.uniform(0.5, 1.5))
-                    
-                except Exception as e:
-                    print(f"搜索页 {page} 处理失败: {str(e)}")
-                    pbar.update(1)
-                    continue
+            if reached_known:
+                pbar.update(remaining - 1)
+                reached_end = True
+                break
             
-            pbar.close()
+            # 判断结果是否被截断（总数达到上限，或总页数超过可请求的页码）
+            if result_stats.get("num_results", 0) >= SEARCH_RESULT_CAP or \
+                    result_stats.get("num_pages", 0) > pages[-1]:
+                saturated = True
+                if stop_if_saturated:
+                    pbar.update(remaining - 1)
+                    break
+            
+            # 判断是否已到末页
+            end_page = None
+            if page_count == 0 or new_count == 0:
+                end_page = page - 1
+            elif page_count < full_page_size:
+                end_page = page
+            full_page_size = max(full_page_size, page_count)
+            
+            if end_page is not None:
+                if state_key and self.search_state is not None:
+                    self.search_state.set(state_key, end_page)
+                pbar.update(remaining - 1)
+                reached_end = True
+                break
+            
+            if index < len(pages) - 1:
+                await tracer.sleep(random.uniform(0.5, 1.5), "search page delay")
         
-        # 去重（基于BV号）
-        unique_videos = {}
-        for video in all_video_data:
-            bvid = video["video"]["bvid"]
-            if bvid not in unique_videos:
-                unique_videos[bvid] = video
+        # 页码用尽仍未到末页，同样视为饱和
+        if not reached_end and not budget_stopped and slice_videos:
+            saturated = True
         
-        print(f"搜索完成，找到 {len(unique_videos)} 个唯一视频")
-        return list(unique_videos.values())
+        return slice_videos, saturated
+    
+    def _search_row_to_basic_info(self, video, keyword, page, label=None, aid=0) -> Dict:
+        """将搜索结果行转换为基本信息结构，aid 为由BV号计算的AV号（搜索结果中有aid时优先使用）"""
+        owner_mid = self._search_int(video, 'UP主ID')
+        basic_info = {
+            "video": {
+                "bvid": video['BV号'],
+                "title": video.get('标题', ''),
+                "view_count": self._parse_view_count(video.get('播放量', '0')),
+                "pubdate": video.get('发布时间', ''),
+                "duration": video.get('时长', ''),
+                "description": video.get('视频介绍', ''),
+                "aid": self._search_int(video, 'AV号') or aid,  # 详细信息获取时会更新
+                "cover_url": self._search_text(video, '封面'),
+                "tid": self._search_int(video, '分区ID'),
+                "tname": self._search_text(video, '分区'),
+                "keywords": self._search_text(video, '标签'),
+                "danmaku_count": self._search_int(video, '弹幕数'),
+                "reply_count": self._search_int(video, '评论数'),
+                "favorite_count": self._search_int(video, '收藏数'),
+                "like_count": self._search_int(video, '点赞数'),
+                "owner_mid": owner_mid,
+                "_from_search": True,
+                "_search_keyword": keyword,
+                "_search_page": page
+            },
+            "owner": {
+                "name": video.get('作者', video.get('UP主', '')),
+                "mid": owner_mid,
+                "face_url": self._search_text(video, 'UP主头像')
+            }
+        }
+        if label:
+            basic_info["video"]["_search_day"] = label
+        return basic_info
+    
+    @staticmethod
+    def _search_int(video, key) -> int:
+        """读取搜索结果中的整数字段，缺失("N/A"/NaN)时返回0"""
+        value = video.get(key)
+        try:
+            return int(value)
+        except (TypeError, ValueError):
+            return 0
+    
+    @staticmethod
+    def _search_text(video, key) -> str:
+        """读取搜索结果中的文本字段，缺失时返回空字符串"""
+        value = video.get(key)
+        if not isinstance(value, str) or value == "N/A":
+            return ""
+        return value
+    
+    @staticmethod
+    def _parse_duration(text) -> int:
+        """将搜索结果中的时长("MM:SS" 或 "HH:MM:SS")转换为秒数"""
+        if isinstance(text, (int, float)):
+            return int(text)
+        seconds = 0
+        try:
+            for part in str(text).split(':'):
+                seconds = seconds * 60 + int(part)
+        except ValueError:
+            return 0
+        return seconds
+    
+    def complete_search_results(self, videos) -> List[Dict]:
+        """
+        将搜索结果整理为可直接导出/入库的视频数据（仅搜索模式，不访问视频页面）
+        
+        参数:
+            videos: search_videos 返回的基本信息列表
+        
+        返回:
+            原列表（原地更新），时长转换为秒数，缺失的AV号由BV号计算
+        """
+        for video in videos:
+            video_info = video["video"]
+            video_info["duration"] = self._parse_duration(video_info.get("duration", 0))
+            if not video_info.get("aid") and is_valid_bvid(video_info.get("bvid")):
+                video_info["aid"] = bv2av(video_info["bvid"])
+        return videos
 
     
     async def get_videos_detail(self, videos, max_concurrent=3, show_progress=True) -> List[Dict]:
@@ -248,20 +716,17 @@ class BilibiliAPI:
         semaphore = asyncio.Semaphore(max_concurrent)
         
         async def fetch_video_detail(video):
-            async with semaphore:
+            async with tracer.acquire(semaphore, "detail_semaphore"):
                 bv_id = video["video"]["bvid"]
                 try:
-                    # 构建视频页面URL
-                    video_url = f"https://{self.main_host}/video/{bv_id}"
-                    
-                    # 获取视频页面HTML
-                    html_content = await self._get_html(video_url)
-                    
-                    # 解析视频详细信息
-                    video_data = self._parse_video_html(html_content)
+                    # 获取并解析视频详细信息
+                    video_data = await self._fetch_video_detail(bv_id)
                     
                     if video_data:
                         return video_data, None
+                    elif bv_id in self.negative_cache:
+                        # 已知失效的视频不再重试，保留基本信息
+                        return video, None
                     else:
                         return video, "解析失败"
                 except Exception as e:
@@ -270,7 +735,7 @@ class BilibiliAPI:
         # 第一轮：视频详情
         total_videos = len(videos)
         if show_progress:
-            print(f"开始获取 {total_videos} 个视频的详细信息...")
+            logger.info("开始获取 %d 个视频的详细信息...", total_videos)
         
         # 创建任务
         tasks = []
@@ -278,7 +743,7 @@ class BilibiliAPI:
         if show_progress:
             for video in tqdm(videos, desc="创建详情获取任务"):
                 tasks.append(fetch_video_detail(video))
-            print("等待详细信息获取任务完成...")
+            logger.debug("等待详细信息获取任务完成...")
         else:
             for video in videos:
                 tasks.append(fetch_video_detail(video))
@@ -296,61 +761,125 @@ class BilibiliAPI:
         # 第二轮：重试失败的视频
         if failed_videos:
             if show_progress:
-                print(f"第一轮获取后有 {len(failed_videos)} 个视频需要重试...")
+                logger.info("第一轮获取后有 %d 个视频需要重试...", len(failed_videos))
             
             random.shuffle(failed_videos)  # 随机打乱顺序
             
             retry_results = []
+            retry_iter = tqdm(failed_videos, desc="重试获取") if show_progress else failed_videos
             
-            if show_progress:
-                for video, error in tqdm(failed_videos, desc="重试获取"):
-                    # ...重试逻辑...
-                    bv_id = video["video"]["bvid"]
-                    try:
-                        video_url = f"https://{self.main_host}/video/{bv_id}"
-                        html_content = await self._get_html(
-                            video_url, 
-                            cookie=random_bil_cookie.get_random_cookies(scene='search', timestamp=int(time.time()))
-                        )
-                        
-                        video_data = self._parse_video_html(html_content)
-                        if video_data:
-                            retry_results.append(video_data)
-                        else:
-                            retry_results.append(video)
-                    except Exception:
-                        retry_results.append(video)
-                    
-                    await asyncio.sleep(random.uniform(0.8, 1.4))
-            else:
-                for video, error in failed_videos:
-                    # ...重试逻辑...
-                    bv_id = video["video"]["bvid"]
-                    try:
-                        video_url = f"https://{self.main_host}/video/{bv_id}"
-                        html_content = await self._get_html(
-                            video_url, 
-                            cookie=random_bil_cookie.get_random_cookies(scene='search', timestamp=int(time.time()))
-                        )
-                        
-                        video_data = self._parse_video_html(html_content)
-                        if video_data:
-                            retry_results.append(video_data)
-                        else:
-                            retry_results.append(video)
-                    except Exception:
+            for video, error in retry_iter:
+                bv_id = video["video"]["bvid"]
+                if bv_id in self.negative_cache:
+                    retry_results.append(video)
+                    continue
+                metrics.inc("retries_total", endpoint="view_api" if self.detail_backend == "json" else "video_page")
+                try:
+                    video_data = await self._fetch_video_detail(
+                        bv_id,
+                        cookie=random_bil_cookie.get_random_cookies(scene='search', timestamp=int(time.time()))
+                    )
+                    if video_data:
+                        retry_results.append(video_data)
+                    else:
                         retry_results.append(video)
-                    
-                    await asyncio.sleep(random.uniform(0.8, 1.4))
+                except Exception:
+                    retry_results.append(video)
+                
+                await tracer.sleep(random.uniform(0.8, 1.4), "retry delay")
             
             # 添加重试成功的视频
             detailed_videos.extend(retry_results)
         
+        self.negative_cache.save()
         if show_progress:
-            print(f"详细信息获取完成，共 {len(detailed_videos)} 个视频")
+            logger.info("详细信息获取完成，共 %d 个视频", len(detailed_videos))
         
         return detailed_videos
 
+    async def fetch_video_detail(self, bv_id) -> Optional[Dict[str, Any]]:
+        """
+        获取单个视频的详细信息（任务队列的详情任务使用）
+        
+        与 get_videos_detail 不同，不做批量重试，失败时由调用方决定是否重试。
+        
+        参数:
+            bv_id: 视频BV号
+        
+        返回:
+            视频详细信息；解析失败或视频已失效时返回None（失效视频可由 negative_cache 判断）
+        """
+        return await self._fetch_video_detail(bv_id)
+    
+    async def _fetch_video_detail(self, bv_id, cookie=None) -> Optional[Dict[str, Any]]:
+        """
+        获取单个视频的详细信息（合并并发请求，跳过已知失效视频）
+        
+        同一BV号同时只发出一次请求，其余调用等待并共享该请求的结果。
+        
+        参数:
+            bv_id: 视频BV号
+            cookie: 使用的Cookie，默认为实例Cookie
+        
+        返回:
+            与 _parse_video_html 相同结构的字典，无视频数据或视频已失效时返回None
+        """
+        if bv_id in self.negative_cache:
+            return None
+        
+        task = self._inflight.get(bv_id)
+        if task is None:
+            task = asyncio.ensure_future(self._request_video_detail(bv_id, cookie))
+            self._inflight[bv_id] = task
+            task.add_done_callback(lambda _: self._finish_inflight(bv_id))
+            metrics.set_gauge("inflight_requests", len(self._inflight), stage="detail")
+        else:
+            metrics.inc("coalesced_requests_total", stage="detail")
+        # shield: 某个等待方被取消时不影响其他等待方
+        return await asyncio.shield(task)
+    
+    def _finish_inflight(self, bv_id):
+        self._inflight.pop(bv_id, None)
+        metrics.set_gauge("inflight_requests", len(self._inflight), stage="detail")
+    
+    async def _request_video_detail(self, bv_id, cookie=None) -> Optional[Dict[str, Any]]:
+        """按配置的方式请求并解析单个视频的详细信息，确定失效的视频（404或 DEAD_VIDEO_CODES）写入失效缓存"""
+        try:
+            if self.detail_backend == "json":
+                payload = await self._get_json(
+                    f"https://{self.api_host}{self.api_prefix}/web-interface/view",
+                    params={"bvid": bv_id},
+                    referer=f"https://{self.main_host}/video/{bv_id}",
+                    cookie=cookie
+                )
+                if payload and payload.get("code") in DEAD_VIDEO_CODES:
+                    self.negative_cache.set(bv_id, f"code {payload.get('code')}")
+                    metrics.inc("dead_videos_total", reason="api_code")
+                    return None
+                with metrics.timer("parse_seconds", stage="detail"), tracer.span("parse", "parse"):
+                    video_data = self._parse_view_json(payload)
+            else:
+                html_content = await self._get_html(
+                    f"https://{self.main_host}/video/{bv_id}",
+                    cookie=cookie,
+                    stop_at_state=self.stream_pages
+                )
+                with metrics.timer("parse_seconds", stage="detail"), tracer.span("parse", "parse"):
+                    video_data = self._parse_video_html(html_content)
+                if video_data is None:
+                    # 页面中没有 videoData 也可能是风控或验证页面，不能确定视频失效，不写入失效缓存
+                    logger.warning("视频 %s 页面中没有 videoData", bv_id)
+        except HTTPStatusError as e:
+            if e.status == 404:
+                self.negative_cache.set(bv_id, "HTTP 404")
+                metrics.inc("dead_videos_total", reason="http_404")
+                return None
+            raise
+        
+        if video_data:
+            video_data["video"]["_fetched_at"] = int(time.time())
+        return video_data
+
     async def search_and_get_video_info(self, keyword, time_begin=None, time_end=None, page=1, recent_days=None) -> List[Dict]:
         """
         根据关键词搜索视频并获取详细信息
@@ -410,76 +939,93 @@ class BilibiliAPI:
                     # 提取JSON数据
                     json_str = re.search(r'window\.__INITIAL_STATE__\s*=\s*(\{.+?\});', script.string, re.DOTALL)
                     if json_str:
-                        data = json.loads(json_str.group(1))
-                        if 'videoData' in data:
-                            video_data = data['videoData']
+                        # 只解码用到的videoData字段
+                        video_data = decode_video_data(json_str.group(1))
+                        if video_data is not None:
                             break
             
             if not video_data:
                 return None
+            
+            return self._build_video_result(video_data, self._extract_keywords(soup))
+            
+        except Exception as e:
+            logger.warning("解析视频HTML时出错: %s", e)
+            return None
+    
+    def _parse_view_json(self, payload) -> Dict[str, Any]:
+        """
+        解析 /x/web-interface/view 接口返回的数据
+        返回与 _parse_video_html 相同的结构（接口不含页面关键词，keywords 为空）
+        """
+        try:
+            if not payload or payload.get("code") != 0 or not payload.get("data"):
+                return None
+            return self._build_video_result(payload["data"], "")
+        except Exception as e:
+            logger.warning("解析视频接口数据时出错: %s", e)
+            return None
+    
+    def _build_video_result(self, video_data, keywords) -> Dict[str, Any]:
+        """将 videoData 结构转换为符合数据库结构的格式化结果"""
+        # 构建返回数据结构
+        result = {
+            # 视频主表数据
+            "video": {
+                "bvid": video_data.get("bvid", ""),
+                "aid": video_data.get("aid", 0),
+                "title": video_data.get("title", ""),
+                "cover_url": video_data.get("pic", ""),
+                "tid": video_data.get("tid", 0),
+                "tname": video_data.get("tname", ""),
+                "tid_v2": video_data.get("tid_v2", 0),
+                "tname_v2": video_data.get("tname_v2", ""),
+                "description": video_data.get("desc", ""),
+                "pubdate": self._timestamp_to_datetime(video_data.get("pubdate", 0)),
+                "ctime": self._timestamp_to_datetime(video_data.get("ctime", 0)),
+                "duration": video_data.get("duration", 0),
+                "copyright": video_data.get("copyright", 0),
+                "state": video_data.get("state", 0),
+                "mission_id": video_data.get("mission_id", 0),
+                "videos": video_data.get("videos", 0),
+                "dynamic": video_data.get("dynamic", ""),
+                "keywords": keywords,
                 
-            # 构建返回数据结构
-            result = {
-                # 视频主表数据
-                "video": {
-                    "bvid": video_data.get("bvid", ""),
-                    "aid": video_data.get("aid", 0),
-                    "title": video_data.get("title", ""),
-                    "cover_url": video_data.get("pic", ""),
-                    "tid": video_data.get("tid", 0),
-                    "tname": video_data.get("tname", ""),
-                    "tid_v2": video_data.get("tid_v2", 0),
-                    "tname_v2": video_data.get("tname_v2", ""),
-                    "description": video_data.get("desc", ""),
-                    "pubdate": self._timestamp_to_datetime(video_data.get("pubdate", 0)),
-                    "ctime": self._timestamp_to_datetime(video_data.get("ctime", 0)),
-                    "duration": video_data.get("duration", 0),
-                    "copyright": video_data.get("copyright", 0),
-                    "state": video_data.get("state", 0),
-                    "mission_id": video_data.get("mission_id", 0),
-                    "videos": video_data.get("videos", 0),
-                    "dynamic": video_data.get("dynamic", ""),
-                    "keywords": self._extract_keywords(soup),
-                    
-                    # 统计信息
-                    "view_count": video_data.get("stat", {}).get("view", 0),
-                    "danmaku_count": video_data.get("stat", {}).get("danmaku", 0),
-                    "reply_count": video_data.get("stat", {}).get("reply", 0),
-                    "favorite_count": video_data.get("stat", {}).get("favorite", 0),
-                    "coin_count": video_data.get("stat", {}).get("coin", 0),
-                    "share_count": video_data.get("stat", {}).get("share", 0),
-                    "like_count": video_data.get("stat", {}).get("like", 0),
-                    "dislike_count": video_data.get("stat", {}).get("dislike", 0),
-                    
-                    # 权限信息
-                    "is_downloadable": bool(video_data.get("rights", {}).get("download", 0)),
-                    "no_reprint": bool(video_data.get("rights", {}).get("no_reprint", 0)),
-                    "autoplay": bool(video_data.get("rights", {}).get("autoplay", 0)),
-                    
-                    # 关联UP主ID
-                    "owner_mid": video_data.get("owner", {}).get("mid", 0)
-                },
-                
-                # UP主信息
-                "owner": {
-                    "mid": video_data.get("owner", {}).get("mid", 0),
-                    "name": video_data.get("owner", {}).get("name", ""),
-                    "face_url": video_data.get("owner", {}).get("face", "")
-                },
+                # 统计信息
+                "view_count": video_data.get("stat", {}).get("view", 0),
+                "danmaku_count": video_data.get("stat", {}).get("danmaku", 0),
+                "reply_count": video_data.get("stat", {}).get("reply", 0),
+                "favorite_count": video_data.get("stat", {}).get("favorite", 0),
+                "coin_count": video_data.get("stat", {}).get("coin", 0),
+                "share_count": video_data.get("stat", {}).get("share", 0),
+                "like_count": video_data.get("stat", {}).get("like", 0),
+                "dislike_count": video_data.get("stat", {}).get("dislike", 0),
                 
-                # 分P信息
-                "pages": [self._parse_video_page(page, video_data.get("bvid", "")) 
-                         for page in video_data.get("pages", [])],
+                # 权限信息
+                "is_downloadable": bool(video_data.get("rights", {}).get("download", 0)),
+                "no_reprint": bool(video_data.get("rights", {}).get("no_reprint", 0)),
+                "autoplay": bool(video_data.get("rights", {}).get("autoplay", 0)),
                 
-                # 荣誉信息
-                "honors": self._parse_honors(video_data)
-            }
+                # 关联UP主ID
+                "owner_mid": video_data.get("owner", {}).get("mid", 0)
+            },
             
-            return result
+            # UP主信息
+            "owner": {
+                "mid": video_data.get("owner", {}).get("mid", 0),
+                "name": video_data.get("owner", {}).get("name", ""),
+                "face_url": video_data.get("owner", {}).get("face", "")
+            },
             
-        except Exception as e:
-            print(f"解析视频HTML时出错: {str(e)}")
-            return None
+            # 分P信息
+            "pages": [self._parse_video_page(page, video_data.get("bvid", "")) 
+                     for page in video_data.get("pages", [])],
+            
+            # 荣誉信息
+            "honors": self._parse_honors(video_data)
+        }
+        
+        return result
     
     def _extract_keywords(self, soup) -> str:
         """提取关键词"""
@@ -546,7 +1092,7 @@ class BilibiliAPI:
             return {
                 "video": {
                     "bvid": bv_id,
-                    "aid": 0,
+                    "aid": bv2av(bv_id) if is_valid_bvid(bv_id) else 0,
                     "title": video.get('标题', '获取失败'),
                     "description": video.get('视频介绍', ''),
                     "pubdate": video.get('发布时间', ''),
@@ -572,7 +1118,7 @@ class BilibiliAPI:
             }
         except Exception as e:
             # 若处理失败，则返回最小化信息
-            print(f"创建基本信息失败: {str(e)}")
+            logger.warning("创建基本信息失败: %s", e)
             return {
                 "video": {
                     "bvid": bv_id,
@@ -589,6 +1135,7 @@ class BilibiliAPI:
 
 # 使用示例
 if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
     api = BilibiliAPI()
     keyword = "翁法罗斯"
     results = asyncio.run(api.search_and_get_video_info(keyword=keyword, page=1))
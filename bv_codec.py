@@ -0,0 +1,147 @@
+from typing import Iterable, List
+
+import numpy as np
+
+# BV号与AV号(aid)互转算法参数（对应当前 "BV1" 开头的12位BV号）
+XOR_CODE = 23442827791579
+MASK_CODE = 2251799813685247
+MAX_AID = 1 << 51
+BASE = 58
+ALPHABET = "FcwAPNKTMug3GV5Lj7EJnHpWsx4tb8haYeviqBz6rkCy12mUSDQX9RdoZf"
+BV_PREFIX = "BV1"
+BV_LENGTH = 12
+
+# BV号中需要两两交换的字符位置
+_SWAPS = ((3, 9), (4, 7))
+
+_ALPHABET_INDEX = {char: index for index, char in enumerate(ALPHABET)}
+
+# 按ASCII码查表的字符下标，非法字符为-1
+_ASCII_TABLE = np.full(128, -1, dtype=np.int64)
+for _index, _char in enumerate(ALPHABET):
+    _ASCII_TABLE[ord(_char)] = _index
+
+# 交换后第3~11位字符对应的原始位置，以及每一位的权重 58^(8-i)
+_DIGIT_POSITIONS = list(range(3, BV_LENGTH))
+for _a, _b in _SWAPS:
+    _i, _j = _DIGIT_POSITIONS.index(_a), _DIGIT_POSITIONS.index(_b)
+    _DIGIT_POSITIONS[_i], _DIGIT_POSITIONS[_j] = _DIGIT_POSITIONS[_j], _DIGIT_POSITIONS[_i]
+_WEIGHTS = BASE ** np.arange(len(_DIGIT_POSITIONS) - 1, -1, -1, dtype=np.int64)
+
+
+def is_valid_bvid(bvid) -> bool:
+    """判断是否为可转换的BV号"""
+    return (
+        isinstance(bvid, str)
+        and len(bvid) == BV_LENGTH
+        and bvid[:3].upper() == BV_PREFIX
+        and all(char in _ALPHABET_INDEX for char in bvid[3:])
+    )
+
+
+def av2bv(aid) -> str:
+    """
+    AV号转BV号
+
+    Args:
+        aid: 视频AV号(aid)
+
+    Returns:
+        BV号字符串
+    """
+    aid = int(aid)
+    if not 0 < aid < MAX_AID:
+        raise ValueError(f"AV号超出范围: {aid}")
+
+    chars = list(BV_PREFIX + "0" * (BV_LENGTH - len(BV_PREFIX)))
+    tmp = (MAX_AID | aid) ^ XOR_CODE
+    position = BV_LENGTH - 1
+    while tmp > 0:
+        chars[position] = ALPHABET[tmp % BASE]
+        tmp //= BASE
+        position -= 1
+    for a, b in _SWAPS:
+        chars[a], chars[b] = chars[b], chars[a]
+    return "".join(chars)
+
+
+def bv2av(bvid) -> int:
+    """
+    BV号转AV号
+
+    Args:
+        bvid: BV号，如 "BV1xx411c7mD"
+
+    Returns:
+        AV号(aid)
+    """
+    if not is_valid_bvid(bvid):
+        raise ValueError(f"无效的BV号: {bvid}")
+
+    chars = list(bvid)
+    for a, b in _SWAPS:
+        chars[a], chars[b] = chars[b], chars[a]
+    tmp = 0
+    for char in chars[3:]:
+        tmp = tmp * BASE + _ALPHABET_INDEX[char]
+    return (tmp & MASK_CODE) ^ XOR_CODE
+
+
+def bvids_to_aids(bvids: Iterable[str]) -> np.ndarray:
+    """
+    批量BV号转AV号（numpy向量化计算）
+
+    Args:
+        bvids: BV号序列
+
+    Returns:
+        int64数组，无效BV号对应的位置为0
+    """
+    bvids = list(bvids)
+    aids = np.zeros(len(bvids), dtype=np.int64)
+    valid = [i for i, bvid in enumerate(bvids) if isinstance(bvid, str) and len(bvid) == BV_LENGTH and bvid.isascii()]
+    if not valid:
+        return aids
+
+    raw = "".join(bvids[i] for i in valid).encode("ascii")
+    codes = np.frombuffer(raw, dtype=np.uint8).reshape(len(valid), BV_LENGTH)
+    digits = _ASCII_TABLE[codes[:, _DIGIT_POSITIONS]]
+
+    # 前缀 "BV1"，大小写不敏感
+    prefix_ok = np.isin(codes[:, 0], (ord("B"), ord("b"))) & np.isin(codes[:, 1], (ord("V"), ord("v"))) & (codes[:, 2] == ord("1"))
+    ok = prefix_ok & (digits >= 0).all(axis=1)
+
+    values = (digits * _WEIGHTS).sum(axis=1)
+    aids[np.asarray(valid)[ok]] = (values[ok] & MASK_CODE) ^ XOR_CODE
+    return aids
+
+
+def aids_to_bvids(aids: Iterable[int]) -> List[str]:
+    """
+    批量AV号转BV号
+
+    Args:
+        aids: AV号序列
+
+    Returns:
+        BV号列表，无效AV号对应的位置为空字符串
+    """
+    values = np.asarray(list(aids), dtype=np.int64)
+    result = [""] * len(values)
+    ok = (values > 0) & (values < MAX_AID)
+    if not ok.any():
+        return result
+
+    tmp = (values[ok] | MAX_AID) ^ XOR_CODE
+    digits = np.empty((len(tmp), len(_DIGIT_POSITIONS)), dtype=np.int64)
+    for column in range(len(_DIGIT_POSITIONS) - 1, -1, -1):
+        digits[:, column] = tmp % BASE
+        tmp //= BASE
+
+    alphabet = np.array(list(ALPHABET))
+    chars = np.empty((len(digits), BV_LENGTH), dtype="<U1")
+    chars[:, :3] = list(BV_PREFIX)
+    chars[:, _DIGIT_POSITIONS] = alphabet[digits]
+    for index, row in zip(np.flatnonzero(ok), chars):
+        result[index] = "".join(row)
+    return result
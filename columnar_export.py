@@ -0,0 +1,306 @@
+import csv
+from contextlib import contextmanager
+from datetime import datetime
+from typing import List, Dict, Any
+
+import pandas as pd
+
+try:
+    import pyarrow as pa
+    import pyarrow.feather as feather
+    import pyarrow.ipc as ipc
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = None
+
+# 支持的列式输出格式及对应的文件扩展名
+COLUMNAR_FORMATS = {
+    "parquet": ".parquet",
+    "feather": ".feather",
+    "arrow": ".arrow",
+}
+
+# 每个行组(record batch)的行数
+DEFAULT_ROW_GROUP_SIZE = 50000
+
+# 视频数据列类型（同时覆盖 full 与 simple 两种输出模式的列名）
+VIDEO_INT_COLUMNS = [
+    "aid", "tid", "tid_v2", "duration", "videos", "copyright",
+    "view_count", "danmaku_count", "reply_count", "favorite_count", "coin_count",
+    "share_count", "like_count", "dislike_count", "owner_mid", "page_count",
+    "owner_level", "owner_follower_count", "owner_video_count",
+    "state", "mission_id",
+    "播放量", "弹幕数", "收藏", "硬币", "分享", "点赞", "AV号",
+]
+VIDEO_BOOL_COLUMNS = ["no_reprint", "is_downloadable", "autoplay"]
+VIDEO_TIMESTAMP_COLUMNS = ["pubdate", "ctime", "发布时间"]
+VIDEO_DICT_COLUMNS = ["tname", "tname_v2", "owner_name", "分区", "UP主"]
+
+# 评论数据列（与评论CSV表头一致）
+COMMENT_COLUMNS = [
+    '序号', '上级评论ID', '评论ID', '用户ID', '用户名', '用户等级',
+    '性别', '评论内容', '评论时间', '回复数', '点赞数',
+    '个性签名', 'IP属地', '是否是大会员', '头像'
+]
+COMMENT_INT_COLUMNS = {'序号', '上级评论ID', '评论ID', '用户ID', '用户等级', '回复数', '点赞数'}
+COMMENT_DICT_COLUMNS = {'性别', 'IP属地', '是否是大会员'}
+COMMENT_TIMESTAMP_COLUMNS = {'评论时间'}
+
+DATETIME_FORMAT = '%Y-%m-%d %H:%M:%S'
+
+
+def _require_pyarrow():
+    if pa is None:
+        raise ImportError("列式输出需要安装pyarrow库: pip install pyarrow")
+
+
+def _comment_schema():
+    fields = []
+    for column in COMMENT_COLUMNS:
+        if column in ('用户等级',):
+            field_type = pa.int16()
+        elif column in ('回复数', '点赞数'):
+            field_type = pa.int32()
+        elif column in COMMENT_INT_COLUMNS:
+            field_type = pa.int64()
+        elif column in COMMENT_TIMESTAMP_COLUMNS:
+            field_type = pa.timestamp('s')
+        elif column in COMMENT_DICT_COLUMNS:
+            field_type = pa.dictionary(pa.int32(), pa.string())
+        else:
+            field_type = pa.string()
+        fields.append(pa.field(column, field_type))
+    return pa.schema(fields)
+
+
+def _to_int(value):
+    """将CSV风格的值转换为整数，空值返回None"""
+    if value is None or value == '':
+        return None
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        try:
+            return int(float(value))
+        except (TypeError, ValueError):
+            return None
+
+
+def _to_datetime(value):
+    """将评论时间转换为datetime，空值返回None"""
+    if value is None or value == '':
+        return None
+    if isinstance(value, datetime):
+        return value
+    try:
+        return datetime.strptime(str(value), DATETIME_FORMAT)
+    except ValueError:
+        return None
+
+
+def _coerce_video_frame(df) -> pd.DataFrame:
+    """按列类型整理视频DataFrame，无法整体转换的列保持原样"""
+    df = df.copy()
+    for column in VIDEO_INT_COLUMNS:
+        if column not in df:
+            continue
+        numeric = pd.to_numeric(df[column], errors='coerce')
+        invalid = numeric.isna() & df[column].notna() & (df[column].astype(str) != '')
+        # 例如搜索结果中的时长为 "12:34"，此时保留字符串
+        if not invalid.any():
+            df[column] = numeric.round().astype('Int64')
+    for column in VIDEO_BOOL_COLUMNS:
+        if column in df:
+            df[column] = df[column].astype('boolean')
+    for column in VIDEO_TIMESTAMP_COLUMNS:
+        if column in df:
+            df[column] = pd.to_datetime(df[column], format=DATETIME_FORMAT, errors='coerce').astype('datetime64[s]')
+    for column in VIDEO_DICT_COLUMNS:
+        if column in df:
+            df[column] = df[column].astype('category')
+    return df
+
+
+def write_video_table(df, output_path, output_format, row_group_size=DEFAULT_ROW_GROUP_SIZE):
+    """
+    以列式格式保存视频数据
+
+    Args:
+        df: prepare_full_video_data / prepare_simple_video_data 结果构成的DataFrame
+        output_path: 输出文件路径
+        output_format: "parquet"、"feather" 或 "arrow"
+        row_group_size: 每个行组的行数
+    """
+    _require_pyarrow()
+    if output_format not in COLUMNAR_FORMATS:
+        raise ValueError(f"不支持的列式格式: {output_format}")
+
+    table = pa.Table.from_pandas(_coerce_video_frame(df), preserve_index=False)
+    if output_format == "parquet":
+        pq.write_table(table, output_path, row_group_size=row_group_size)
+    else:
+        feather.write_feather(table, output_path, chunksize=row_group_size)
+
+
+def read_video_table(path) -> pd.DataFrame:
+    """
+    读取 write_video_table 写出的视频数据文件
+
+    Args:
+        path: .parquet/.feather/.arrow 文件路径
+
+    Returns:
+        视频DataFrame
+    """
+    _require_pyarrow()
+    if path.endswith(COLUMNAR_FORMATS["parquet"]):
+        return pq.read_table(path).to_pandas()
+    return feather.read_table(path).to_pandas()
+
+
+class _DictionaryEncoder:
+    """跨批次保持一致的字典编码器，保证后续批次的字典只追加不替换"""
+
+    def __init__(self):
+        self.index = {}
+        self.values = []
+
+    def encode(self, values):
+        indices = []
+        for value in values:
+            if value is None:
+                indices.append(None)
+                continue
+            value = str(value)
+            position = self.index.get(value)
+            if position is None:
+                position = len(self.values)
+                self.index[value] = position
+                self.values.append(value)
+            indices.append(position)
+        return pa.DictionaryArray.from_arrays(
+            pa.array(indices, type=pa.int32()), pa.array(self.values, type=pa.string())
+        )
+
+
+class ColumnarCommentWriter:
+    """
+    评论列式写入器，接口与 csv.writer 兼容(writerow/writerows)
+
+    评论按行组缓冲，满 row_group_size 行后写出一个行组，
+    因此大规模评论导出时内存占用与行组大小相关而非总评论数。
+    """
+
+    def __init__(self, path, output_format="parquet", row_group_size=DEFAULT_ROW_GROUP_SIZE):
+        _require_pyarrow()
+        if output_format not in COLUMNAR_FORMATS:
+            raise ValueError(f"不支持的列式格式: {output_format}")
+
+        self.path = path
+        self.output_format = output_format
+        self.row_group_size = row_group_size
+        self.schema = _comment_schema()
+        self.rows = []
+        self.row_count = 0
+        self._encoders = {column: _DictionaryEncoder() for column in COMMENT_DICT_COLUMNS}
+
+        if output_format == "parquet":
+            self._writer = pq.ParquetWriter(path, self.schema)
+        else:
+            self._sink = pa.OSFile(path, 'wb')
+            options = ipc.IpcWriteOptions(emit_dictionary_deltas=True)
+            self._writer = ipc.new_file(self._sink, self.schema, options=options)
+
+    def writerow(self, row):
+        self.rows.append(row)
+        if len(self.rows) >= self.row_group_size:
+            self.flush()
+
+    def writerows(self, rows):
+        for row in rows:
+            self.writerow(row)
+
+    def flush(self):
+        """将缓冲的评论写出为一个行组"""
+        if not self.rows:
+            return
+
+        arrays = []
+        for position, field in enumerate(self.schema):
+            values = [row[position] if position < len(row) else None for row in self.rows]
+            if field.name in COMMENT_DICT_COLUMNS:
+                arrays.append(self._encoders[field.name].encode(values))
+            elif field.name in COMMENT_INT_COLUMNS:
+                arrays.append(pa.array([_to_int(v) for v in values], type=field.type))
+            elif field.name in COMMENT_TIMESTAMP_COLUMNS:
+                arrays.append(pa.array([_to_datetime(v) for v in values], type=field.type))
+            else:
+                arrays.append(pa.array([None if v is None else str(v) for v in values], type=field.type))
+
+        self._writer.write_batch(pa.RecordBatch.from_arrays(arrays, schema=self.schema))
+        self.row_count += len(self.rows)
+        self.rows = []
+
+    def close(self):
+        self.flush()
+        self._writer.close()
+        if self.output_format != "parquet":
+            self._sink.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
+@contextmanager
+def open_comment_writer(path_base, output_format):
+    """
+    按输出格式打开评论写入器
+
+    列式格式使用 ColumnarCommentWriter，其余格式(csv/xlsx)写入带表头的CSV文件。
+
+    Args:
+        path_base: 不含扩展名的文件路径
+        output_format: 输出格式
+
+    Yields:
+        (文件路径, 写入器)
+    """
+    if output_format in COLUMNAR_FORMATS:
+        path = f"{path_base}{COLUMNAR_FORMATS[output_format]}"
+        with ColumnarCommentWriter(path, output_format) as writer:
+            yield path, writer
+    else:
+        path = f"{path_base}.csv"
+        with open(path, mode='w', newline='', encoding='utf-8-sig') as file:
+            writer = csv.writer(file)
+            writer.writerow(COMMENT_COLUMNS)
+            yield path, writer
+
+
+def read_comment_rows(path) -> List[List[Any]]:
+    """
+    读取列式评论文件，返回与评论CSV相同格式的字符串行
+
+    Args:
+        path: .parquet/.feather/.arrow 文件路径
+
+    Returns:
+        评论数据列表（不含表头）
+    """
+    _require_pyarrow()
+    if path.endswith(COLUMNAR_FORMATS["parquet"]):
+        table = pq.read_table(path)
+    else:
+        table = feather.read_table(path)
+
+    columns = []
+    for column in COMMENT_COLUMNS:
+        values = table.column(column).to_pylist()
+        if column in COMMENT_TIMESTAMP_COLUMNS:
+            columns.append(['' if v is None else v.strftime(DATETIME_FORMAT) for v in values])
+        else:
+            columns.append(['' if v is None else str(v) for v in values])
+    return [list(row) for row in zip(*columns)]
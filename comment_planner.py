@@ -0,0 +1,108 @@
+import math
+from typing import Dict, List
+
+from bv_codec import bvids_to_aids
+
+# 主评论接口每页返回的评论数
+COMMENTS_PER_PAGE = 20
+
+
+def _page_yields(reply_count, max_page):
+    """各页预计获得的评论数（评论数未知时按整页估计）"""
+    if reply_count is None:
+        return [COMMENTS_PER_PAGE] * max_page
+    pages = min(max_page, math.ceil(reply_count / COMMENTS_PER_PAGE))
+    return [min(COMMENTS_PER_PAGE, reply_count - COMMENTS_PER_PAGE * page) for page in range(pages)]
+
+
+def _reply_count_unverified(video_info) -> bool:
+    """评论数是否可能只是缺失值：搜索结果缺少该字段或详情获取失败时也记为0"""
+    return bool(video_info.get("_from_search") or video_info.get("_error"))
+
+
+def plan_comment_crawl(videos, max_page, request_budget=None, skip_empty=True, keep_order=False) -> List[Dict]:
+    """
+    根据视频详情中的评论数规划评论爬取
+
+    评论数为0的视频直接跳过（评论数来自搜索结果或详情获取失败时不能确定没有评论，
+    仍规划首页，其预计收获为0，有预算限制时最后分配）；每个视频的页数按评论数确定（不超过 max_page）；
+    设置了请求总数时，按每页的预计收获从高到低分配页数（同等收获时优先分配靠前的页，
+    即先保证各视频的首页），最后按预计收获从高到低排列任务。
+    keep_order 为 True 时视频已按调度优先级排好序：按顺序依次分配页数并保持该顺序。
+
+    说明: 视频的 reply_count 包含楼中楼回复，因此按它估计的主评论页数是上限，
+    实际请求数可能更少；二级评论的请求不计入 request_budget。
+
+    Args:
+        videos: 视频数据列表（get_videos_detail 或 search_videos 的结果）
+        max_page: 每个视频的最大页数
+        request_budget: 主评论请求总数上限，None表示不限制
+        skip_empty: 是否跳过评论数为0的视频
+        keep_order: 是否保持输入顺序（按优先级分配预算）
+
+    Returns:
+        任务列表，每项包含 bvid、aid、title、reply_count（未知时为None）、pages、expected_comments
+    """
+    candidates = []
+    for video in videos:
+        video_info = video["video"]
+        reply_count = video_info.get("reply_count")
+        if reply_count is not None:
+            reply_count = int(reply_count or 0)
+        if reply_count == 0 and _reply_count_unverified(video_info):
+            # 评论数未知，只请求首页确认
+            candidates.append((video_info, None, [0]))
+            continue
+        if skip_empty and reply_count == 0:
+            continue
+        candidates.append((video_info, reply_count, _page_yields(reply_count, max_page)))
+
+    # 未获取详情的视频没有AV号，由BV号批量计算
+    local_aids = bvids_to_aids(info.get("bvid", "") for info, _, _ in candidates)
+
+    # 分配页数
+    if request_budget is None:
+        page_counts = [len(yields) for _, _, yields in candidates]
+    elif keep_order:
+        page_counts = []
+        remaining = max(0, request_budget)
+        for _, _, yields in candidates:
+            pages = min(len(yields), remaining)
+            page_counts.append(pages)
+            remaining -= pages
+    else:
+        slots = [
+            (-page_yield, page, position)
+            for position, (_, _, yields) in enumerate(candidates)
+            for page, page_yield in enumerate(yields)
+        ]
+        slots.sort()
+        page_counts = [0] * len(candidates)
+        for _, _, position in slots[:max(0, request_budget)]:
+            page_counts[position] += 1
+
+    tasks = []
+    for position, (video_info, reply_count, yields) in enumerate(candidates):
+        pages = page_counts[position]
+        if pages == 0:
+            continue
+        tasks.append({
+            "bvid": video_info.get("bvid", ""),
+            "aid": video_info.get("aid") or int(local_aids[position]),
+            "title": video_info.get("title", ""),
+            "reply_count": reply_count,
+            "pages": pages,
+            "expected_comments": sum(yields[:pages]) if reply_count is not None else 0,
+        })
+
+    if not keep_order:
+        tasks.sort(key=lambda task: task["expected_comments"], reverse=True)
+    return tasks
+
+
+def summarize_plan(tasks, total_videos) -> str:
+    """生成评论爬取计划的摘要文字"""
+    requests = sum(task["pages"] for task in tasks)
+    expected = sum(task["expected_comments"] for task in tasks)
+    return (f"评论计划: {len(tasks)}/{total_videos} 个视频，"
+            f"主评论请求 {requests} 次，预计获取约 {expected} 条评论")
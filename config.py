@@ -6,6 +6,11 @@ config = {
     "is_union": True,         # True表示OR逻辑(并集)，False表示AND逻辑(交集)
     "file_path": "./bilibili_search.csv",  # 搜索结果保存路径
     "page": 30,               # 每关键词搜索页数
+    "search_state_path": "./cache/search_state.json",  # 搜索翻页状态(记录已结束时间段的末页)，None表示不记录
+    "search_state_ttl": 7 * 86400,  # 搜索翻页状态有效期(秒)
+    "search_partition": "daily",  # 时间段划分: "daily"按天划分，"adaptive"结果达到上限(约1000条)时自动二分时间段
+    "search_min_slice_hours": 1,  # 自适应划分时时间段的最小长度(小时)，必须大于0
+    "search_order": "click",  # 搜索结果排序: "click"按播放量，"pubdate"按发布时间从新到旧
     
     # 时间范围筛选
     "time_begin": None,       # 起始时间，如 "2024-01-01 00:00:00"
@@ -17,8 +22,51 @@ config = {
     "comments_dir": "./comments",  # 评论保存目录
     "is_second_comments": False,  # 是否采集二级评论
     "comments_max_page": 5,   # 评论最大爬取页数
+    "comments_request_budget": None,  # 评论阶段主评论请求总数上限，None表示不限制(按评论数优先分配)
+    "comments_skip_empty": True,  # 跳过评论数为0的视频
     "estimated_comments": 5000,  # 评论数量估计(用于进度条)
     
+    # 视频详情配置
+    "detail_backend": "html",  # 详情获取方式: "html"解析视频页面，"json"调用/x/web-interface/view接口(无页面关键词)
+    "stream_video_pages": True,  # html方式下流式读取页面，读到所需数据后立即停止下载
+    "negative_cache_path": "./cache/dead_videos.json",  # 失效视频缓存(HTTP 404或接口返回已删除/不可见)，None表示仅在本次运行内记录
+    "negative_cache_ttl": 3 * 86400,  # 失效视频缓存有效期(秒)，过期后会重新尝试获取
+    
+    # 调度与预算配置
+    "crawl_priority": "search",  # 详情与评论的处理顺序: "search"搜索顺序，"views"播放量，"recency"发布时间，"replies"评论数
+    "crawl_max_requests": None,  # 全局请求次数上限，None表示不限制
+    "crawl_max_minutes": None,  # 全局运行时长上限(分钟)，None表示不限制
+    "workers": 1,  # 工作进程数，大于1时按关键词分片并行爬取(--workers)
+    "request_interval": None,  # 全局相邻请求的最小间隔(秒)，多进程时所有进程共享，None表示不限制
+    "queue_url": None,  # 分布式任务队列地址(--queue)，如 sqlite:///crawl_queue.db、redis://host:6379/0、memory://
+    "queue_lease_seconds": 300,  # 任务租约时长(秒)，处理期间自动续约，进程退出后超时的任务由其他进程重新领取
+    "queue_max_attempts": 3,  # 每个任务的最大尝试次数(含租约超时)，超过后标记为失败
+    "queue_retry_delay": 30,  # 任务失败后重新排队的延迟(秒)
+    "queue_idle_exit_seconds": 60,  # 队列中连续这么久没有可领取的任务时工作进程退出
+    "daemon_host": "127.0.0.1",  # 常驻服务(--daemon)的监听地址
+    "daemon_port": 8765,  # 常驻服务的HTTP端口
+    "daemon_socket": None,  # 常驻服务的Unix socket路径，设置后代替HTTP端口
+    "daemon_output_dir": "./daemon_jobs",  # 未指定 file_path 的作业输出目录，每个作业一个子目录
+    "daemon_max_jobs": 200,  # 保留的作业记录数
+    "monitor_interval_minutes": 30,  # 关键词监控(--monitor)的轮询间隔(分钟)
+    "monitor_keyword_intervals": {},  # 单个关键词的轮询间隔(分钟)，如 {"原神": 5}，优先于 monitor_interval_minutes
+    "monitor_max_page": 5,  # 每轮每个关键词最多请求的页数（首次监控或新视频很多时）
+    "monitor_index_path": "./cache/monitor_index.json",  # 各关键词已处理BV号的索引文件
+    "monitor_index_size": 200,  # 每个关键词在索引中保留的BV号数量
+    
+    # 运行指标配置
+    "metrics_port": None,  # Prometheus指标接口端口(/metrics)，None表示不启动
+    "metrics_snapshot_path": None,  # 定期写入JSON指标快照的文件路径，None表示不写入
+    "metrics_snapshot_interval": 30,  # JSON指标快照写入间隔(秒)
+    "profile_dir": None,  # --profile 分析结果目录，None表示在输出文件旁按时间创建
+    "trace_path": None,  # 异步任务时间线(Chrome trace JSON)输出路径，None表示不记录
+    
+    # 日志配置
+    "log_level": "INFO",  # 日志级别: DEBUG/INFO/WARNING/ERROR，DEBUG时输出每个请求的URL和进度
+    "log_format": "text",  # 日志格式: text 或 json(每行一个JSON对象)
+    "log_file": "bilibili_crawler.log",  # 日志文件路径，None表示只输出到终端
+    "log_rate_limit": 10,  # 相同警告/错误日志的最小输出间隔(秒)，0表示不限流
+    
     # 异步爬取配置
     "max_concurrency": 10,    # 最大并发请求数
     "batch_size": 5,          # 批处理大小(每批次请求数)
@@ -39,12 +87,22 @@ config = {
     # 输出与日志设置
     "show_progress": True,    # 是否显示进度条
     "verbose": True,          # 是否显示详细信息
-    "output_format": "csv",   # 输出格式，支持 "csv", "xlsx"
+    "output_format": "csv",   # 输出格式，支持 "csv", "xlsx", "parquet", "feather", "arrow"
     "output_mode": "full",  # 输出模式，"simple"简洁版或"full"全字段版
     
     # 高级选项
     "raw_data_dir": "./raw_data",  # 原始数据保存目录
     
+    # UP主资料采集
+    "fetch_owner_profiles": False,  # 是否获取UP主资料(粉丝数、投稿数、等级)
+    "owner_cache_path": "./cache/owner_profiles.json",  # UP主资料磁盘缓存
+    "owner_cache_ttl": 86400,       # UP主资料缓存有效期(秒)，期内不重复请求
+    "owner_cache_size": 2048,       # UP主资料内存LRU容量
+    
+    # 视频统计快照(时间序列)
+    "record_video_stats": True,    # 详情阶段是否追加保存统计快照
+    "stats_dir": "./video_stats",  # 本地Parquet快照数据集目录
+    
     # 数据库配置
     "use_database": True,    # 是否使用数据库存储
     "db_config": {
@@ -58,6 +116,7 @@ config = {
     "db_tables": {
         "videos": "bili_videos",      # 视频信息表名
         "owners": "bili_owners",      # UP主信息表名
-        "comments": "bili_comments"   # 评论信息表名
+        "comments": "bili_comments",  # 评论信息表名
+        "video_stats": "bili_video_stats"  # 视频统计快照表名
     }
 }
\ No newline at end of file
@@ -0,0 +1,332 @@
+import asyncio
+import logging
+import os
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+
+from aiohttp import web
+
+from config import config
+from bilibili_api import BilibiliAPI
+from crawl_metrics import metrics
+from crawl_utils import setup_logging
+
+try:
+    from db_handler import DatabaseHandler
+except ImportError:
+    DatabaseHandler = None
+
+logger = logging.getLogger(__name__)
+
+# 作业参数: 写入配置的参数（作业结束后恢复）
+CONFIG_PARAMS = {
+    "keyword": str,
+    "keywords": list,
+    "is_union": bool,
+    "time_begin": str,
+    "time_end": str,
+    "file_path": str,
+    "keywords_blacklist": list,
+}
+# 作业参数: 传给 main 的参数
+MAIN_PARAMS = {
+    "max_page": int,
+    "fetch_details": bool,
+    "fetch_comments": bool,
+    "comments_max_page": int,
+    "output_format": str,
+    "output_mode": str,
+    "use_database": bool,
+    "recent_days": int,
+    "fetch_owners": bool,
+    "detail_backend": str,
+    "partition": str,
+    "search_only": bool,
+    "max_requests": int,
+    "max_minutes": (int, float),
+    "priority": str,
+}
+
+
+def _now() -> str:
+    return time.strftime("%Y-%m-%d %H:%M:%S")
+
+
+def validate_job_params(params) -> Dict[str, Any]:
+    """
+    检查作业参数
+
+    Args:
+        params: POST /jobs 的JSON对象
+
+    Returns:
+        参数字典
+
+    Raises:
+        ValueError: 参数不是对象、包含未知参数或类型错误
+    """
+    if not isinstance(params, dict):
+        raise ValueError("作业参数必须是JSON对象")
+    allowed = {**CONFIG_PARAMS, **MAIN_PARAMS}
+    for key, value in params.items():
+        if key not in allowed:
+            raise ValueError(f"未知参数: {key}")
+        if value is not None and not isinstance(value, allowed[key]):
+            raise ValueError(f"参数 {key} 类型错误")
+    return params
+
+
+class CrawlDaemon:
+    """
+    常驻爬取服务（--daemon）
+
+    进程启动后保持 BilibiliAPI（HTTP会话、Cookie、搜索状态、失效视频缓存）和数据库连接，
+    通过本地HTTP接口或Unix socket接收作业，每个作业以 main 的流程运行并复用这些对象，
+    省去每次启动解释器、导入依赖、生成Cookie和连接数据库的开销。
+    main 使用全局配置，因此作业按提交顺序逐个运行，作业参数只在该作业运行期间生效。
+    作业在单独线程的事件循环中运行：搜索页请求、文件和数据库写入是阻塞调用，
+    放在接口的事件循环中会使 /health、/jobs 在作业运行期间无法响应。
+    """
+
+    def __init__(self, main_func, output_dir="./daemon_jobs", max_jobs=200):
+        """
+        Args:
+            main_func: main 协程函数
+            output_dir: 未指定 file_path 的作业输出目录（每个作业一个子目录）
+            max_jobs: 保留的作业记录数，超出时删除最早的已结束作业
+        """
+        self.main_func = main_func
+        self.output_dir = output_dir
+        self.max_jobs = max_jobs
+        self.jobs: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self.api: Optional[BilibiliAPI] = None
+        self.db_handler = None
+        self.started_at = time.time()
+        self._pending: Optional[asyncio.Queue] = None
+        self._runner: Optional[asyncio.Task] = None
+        self._job_loop: Optional[asyncio.AbstractEventLoop] = None
+        self._job_thread: Optional[threading.Thread] = None
+
+    async def start(self):
+        """创建常驻对象并启动作业循环（需在事件循环中调用）"""
+        self._job_loop = asyncio.new_event_loop()
+        self._job_thread = threading.Thread(target=self._job_loop.run_forever, name="crawl-jobs", daemon=True)
+        self._job_thread.start()
+        # HTTP会话在首次请求时创建，属于作业线程的事件循环
+        self.api = BilibiliAPI(
+            detail_backend=config.get("detail_backend", "html"),
+            stream_pages=config.get("stream_video_pages", True),
+            search_state_path=config.get("search_state_path"),
+            search_state_ttl=config.get("search_state_ttl"),
+            negative_cache_path=config.get("negative_cache_path"),
+            negative_cache_ttl=config.get("negative_cache_ttl", 3 * 86400)
+        )
+        self._pending = asyncio.Queue()
+        self._runner = asyncio.ensure_future(self._run_jobs())
+
+    async def close(self):
+        if self._runner is not None:
+            self._runner.cancel()
+            try:
+                await self._runner
+            except asyncio.CancelledError:
+                pass
+        if self.api is not None:
+            if self.api.search_state is not None:
+                self.api.search_state.save()
+            self.api.negative_cache.save()
+            await self._in_job_loop(self.api.close())
+        if self.db_handler is not None:
+            self.db_handler.close()
+        if self._job_loop is not None:
+            self._job_loop.call_soon_threadsafe(self._job_loop.stop)
+            self._job_thread.join()
+            self._job_loop.close()
+
+    async def _in_job_loop(self, coro):
+        """在作业线程的事件循环中运行协程并等待结果，不阻塞接口的事件循环"""
+        return await asyncio.wrap_future(asyncio.run_coroutine_threadsafe(coro, self._job_loop))
+
+    def submit(self, params) -> Dict[str, Any]:
+        """添加作业，返回作业记录"""
+        params = validate_job_params(params)
+        job_id = uuid.uuid4().hex[:12]
+        job = {
+            "id": job_id,
+            "status": "queued",
+            "params": params,
+            "submitted_at": _now(),
+            "started_at": None,
+            "finished_at": None,
+            "seconds": None,
+            "result": None,
+            "error": None,
+        }
+        self.jobs[job_id] = job
+        self._trim_jobs()
+        self._pending.put_nowait(job_id)
+        metrics.inc("daemon_jobs_total", status="queued")
+        return job
+
+    def _trim_jobs(self):
+        finished = [job_id for job_id, job in self.jobs.items() if job["status"] in ("done", "failed")]
+        for job_id in finished[:max(len(self.jobs) - self.max_jobs, 0)]:
+            del self.jobs[job_id]
+
+    def _database_handler(self):
+        """首个需要数据库的作业建立连接并初始化表结构，之后的作业复用（断线时由 DatabaseHandler 自动重连）"""
+        if self.db_handler is None and DatabaseHandler and config.get("db_config"):
+            handler = DatabaseHandler(config)
+            if handler.connect() and handler.init_database():
+                self.db_handler = handler
+            else:
+                logger.error("数据库初始化失败，作业将各自尝试连接")
+        return self.db_handler
+
+    async def _run_jobs(self):
+        while True:
+            job_id = await self._pending.get()
+            job = self.jobs.get(job_id)
+            if job is not None:
+                await self._run_job(job)
+
+    def _job_kwargs(self, job) -> Dict[str, Any]:
+        """按 main.py 命令行的默认值组装 main 的参数，并将配置类参数写入配置"""
+        params = job["params"]
+        for key in CONFIG_PARAMS:
+            if params.get(key) is not None:
+                config[key] = params[key]
+        if params.get("keyword"):
+            config["keywords"] = [params["keyword"]]
+        if not params.get("file_path"):
+            config["file_path"] = os.path.join(self.output_dir, job["id"], os.path.basename(config["file_path"]))
+        os.makedirs(os.path.dirname(config["file_path"]) or ".", exist_ok=True)
+        # 指标由常驻进程的 /metrics 提供
+        config["metrics_port"] = None
+
+        kwargs = {
+            "max_page": config.get("page", 5),
+            "fetch_comments": config.get("fetch_comments", False),
+            "comments_max_page": config.get("comments_max_page", 5),
+            "use_database": config.get("use_database", False),
+        }
+        kwargs.update({key: params[key] for key in MAIN_PARAMS if params.get(key) is not None})
+        return kwargs
+
+    async def _run_job(self, job):
+        base_config = dict(config)
+        job.update(status="running", started_at=_now())
+        started = time.perf_counter()
+        logger.info("开始作业 %s: %s", job["id"], job["params"])
+        try:
+            kwargs = self._job_kwargs(job)
+            loop = asyncio.get_running_loop()
+            db_handler = await loop.run_in_executor(None, self._database_handler) if kwargs["use_database"] else None
+            result = await self._in_job_loop(self.main_func(**kwargs, api=self.api, db_handler=db_handler))
+            job["result"] = result
+            if result.get("error"):
+                raise RuntimeError(result["error"])
+            job["status"] = "done"
+        except Exception as e:
+            logger.exception("作业 %s 失败: %s", job["id"], e)
+            job.update(status="failed", error=str(e))
+        finally:
+            config.clear()
+            config.update(base_config)
+            # main 会按作业配置重新设置日志，结束后恢复常驻进程的设置
+            setup_logging(config)
+            job.update(finished_at=_now(), seconds=round(time.perf_counter() - started, 3))
+            metrics.inc("daemon_jobs_total", status=job["status"])
+            metrics.observe("daemon_job_seconds", job["seconds"])
+
+    def status(self) -> Dict[str, Any]:
+        running = [job_id for job_id, job in self.jobs.items() if job["status"] == "running"]
+        return {
+            "status": "ok",
+            "uptime_seconds": round(time.time() - self.started_at, 1),
+            "running": running[0] if running else None,
+            "queued": sum(1 for job in self.jobs.values() if job["status"] == "queued"),
+            "jobs": len(self.jobs),
+            "requests": self.api.request_count if self.api else 0,
+        }
+
+
+def create_app(daemon: CrawlDaemon) -> web.Application:
+    """
+    作业接口:
+    - POST /jobs: 提交作业（JSON参数见 CONFIG_PARAMS/MAIN_PARAMS），返回 202 和作业记录
+    - GET /jobs: 所有作业记录
+    - GET /jobs/{id}: 作业状态与结果
+    - GET /health: 服务状态
+    - GET /metrics: Prometheus指标
+    """
+    async def submit_job(request):
+        try:
+            params = await request.json()
+        except ValueError:
+            return web.json_response({"error": "请求体不是有效的JSON"}, status=400)
+        try:
+            job = daemon.submit(params)
+        except ValueError as e:
+            return web.json_response({"error": str(e)}, status=400)
+        return web.json_response(job, status=202)
+
+    async def list_jobs(request):
+        return web.json_response(list(daemon.jobs.values()))
+
+    async def get_job(request):
+        job = daemon.jobs.get(request.match_info["job_id"])
+        if job is None:
+            return web.json_response({"error": "作业不存在"}, status=404)
+        return web.json_response(job)
+
+    async def health(request):
+        return web.json_response(daemon.status())
+
+    async def prometheus(request):
+        return web.Response(text=metrics.to_prometheus(), content_type="text/plain", charset="utf-8")
+
+    async def on_startup(app):
+        await daemon.start()
+
+    async def on_cleanup(app):
+        await daemon.close()
+
+    app = web.Application()
+    app.add_routes([
+        web.post("/jobs", submit_job),
+        web.get("/jobs", list_jobs),
+        web.get("/jobs/{job_id}", get_job),
+        web.get("/health", health),
+        web.get("/metrics", prometheus),
+    ])
+    app.on_startup.append(on_startup)
+    app.on_cleanup.append(on_cleanup)
+    return app
+
+
+def run_daemon(main_func, host="127.0.0.1", port=8765, socket_path=None):
+    """
+    启动常驻服务，阻塞直到进程收到中断信号
+
+    Args:
+        main_func: main 协程函数
+        host/port: HTTP监听地址（socket_path 为空时使用）
+        socket_path: Unix socket 路径
+    """
+    setup_logging(config)
+    daemon = CrawlDaemon(
+        main_func,
+        output_dir=config.get("daemon_output_dir", "./daemon_jobs"),
+        max_jobs=config.get("daemon_max_jobs", 200)
+    )
+    app = create_app(daemon)
+    if socket_path:
+        print(f"常驻服务已启动: unix:{socket_path}")
+        web.run_app(app, path=socket_path, print=None)
+    else:
+        print(f"常驻服务已启动: http://{host}:{port}")
+        web.run_app(app, host=host, port=port, print=None)
@@ -0,0 +1,285 @@
+import json
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Tuple
+
+logger = logging.getLogger(__name__)
+
+# 延迟直方图的桶上界(秒)
+DEFAULT_BUCKETS = (0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+# 指标名前缀（Prometheus格式输出时使用）
+METRIC_PREFIX = "bili_crawler_"
+
+
+def _label_key(labels) -> Tuple[Tuple[str, str], ...]:
+    return tuple(sorted((key, str(value)) for key, value in labels.items()))
+
+
+def _format_labels(label_key, extra=None) -> str:
+    items = list(label_key) + (list(extra) if extra else [])
+    if not items:
+        return ""
+    return "{" + ",".join(f'{key}="{value}"' for key, value in items) + "}"
+
+
+class _Histogram:
+    __slots__ = ("buckets", "counts", "total", "count")
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.total = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.total += value
+        self.count += 1
+        for index, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[index] += 1
+                break
+
+    def quantile(self, q) -> float:
+        """按桶估计分位数（返回所在桶的上界）"""
+        if self.count == 0:
+            return 0.0
+        target = q * self.count
+        cumulative = 0
+        for bound, count in zip(self.buckets, self.counts):
+            cumulative += count
+            if cumulative >= target:
+                return bound
+        return float("inf")
+
+
+class MetricsRegistry:
+    """
+    爬虫运行指标：计数器、直方图、仪表
+
+    指标按名称和标签(如 endpoint、stage、status)区分，线程安全，
+    可输出为Prometheus文本格式、JSON快照或运行结束时的摘要。
+    """
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = tuple(buckets)
+        self.counters: Dict[Tuple[str, tuple], float] = {}
+        self.histograms: Dict[Tuple[str, tuple], _Histogram] = {}
+        self.gauges: Dict[Tuple[str, tuple], float] = {}
+        self.started = time.time()
+        self._lock = threading.Lock()
+
+    def inc(self, name, value=1, **labels):
+        """计数器增加"""
+        key = (name, _label_key(labels))
+        with self._lock:
+            self.counters[key] = self.counters.get(key, 0) + value
+
+    def observe(self, name, value, **labels):
+        """记录一次观测值（如耗时）"""
+        key = (name, _label_key(labels))
+        with self._lock:
+            histogram = self.histograms.get(key)
+            if histogram is None:
+                histogram = self.histograms[key] = _Histogram(self.buckets)
+            histogram.observe(value)
+
+    def set_gauge(self, name, value, **labels):
+        """设置仪表当前值（如队列长度）"""
+        with self._lock:
+            self.gauges[(name, _label_key(labels))] = value
+
+    @contextmanager
+    def timer(self, name, **labels):
+        """记录代码块耗时，可用于 async 函数中包裹 await"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - start, **labels)
+
+    def record_request(self, endpoint, status, seconds, size=0):
+        """记录一次HTTP请求的次数、状态码、耗时和字节数"""
+        self.inc("requests_total", endpoint=endpoint, status=status)
+        self.observe("request_seconds", seconds, endpoint=endpoint)
+        if size:
+            self.inc("response_bytes_total", size, endpoint=endpoint)
+
+    def reset(self):
+        with self._lock:
+            self.counters.clear()
+            self.histograms.clear()
+            self.gauges.clear()
+            self.started = time.time()
+
+    def to_prometheus(self) -> str:
+        """Prometheus文本格式"""
+        lines = []
+        with self._lock:
+            for name in sorted({name for name, _ in self.counters}):
+                lines.append(f"# TYPE {METRIC_PREFIX}{name} counter")
+                for (metric, labels), value in sorted(self.counters.items()):
+                    if metric == name:
+                        lines.append(f"{METRIC_PREFIX}{name}{_format_labels(labels)} {value}")
+            for name in sorted({name for name, _ in self.gauges}):
+                lines.append(f"# TYPE {METRIC_PREFIX}{name} gauge")
+                for (metric, labels), value in sorted(self.gauges.items()):
+                    if metric == name:
+                        lines.append(f"{METRIC_PREFIX}{name}{_format_labels(labels)} {value}")
+            for name in sorted({name for name, _ in self.histograms}):
+                lines.append(f"# TYPE {METRIC_PREFIX}{name} histogram")
+                for (metric, labels), histogram in sorted(self.histograms.items(), key=lambda item: item[0]):
+                    if metric != name:
+                        continue
+                    cumulative = 0
+                    for bound, count in zip(histogram.buckets, histogram.counts):
+                        cumulative += count
+                        lines.append(f"{METRIC_PREFIX}{name}_bucket{_format_labels(labels, [('le', bound)])} {cumulative}")
+                    lines.append(f"{METRIC_PREFIX}{name}_bucket{_format_labels(labels, [('le', '+Inf')])} {histogram.count}")
+                    lines.append(f"{METRIC_PREFIX}{name}_sum{_format_labels(labels)} {histogram.total}")
+                    lines.append(f"{METRIC_PREFIX}{name}_count{_format_labels(labels)} {histogram.count}")
+        return "\n".join(lines) + "\n"
+
+    def snapshot(self) -> Dict:
+        """JSON可序列化的指标快照"""
+        def render(labels):
+            return ",".join(f"{key}={value}" for key, value in labels) or "all"
+
+        with self._lock:
+            return {
+                "timestamp": int(time.time()),
+                "uptime_seconds": round(time.time() - self.started, 3),
+                "counters": {
+                    f"{name}[{render(labels)}]": value for (name, labels), value in sorted(self.counters.items())
+                },
+                "gauges": {
+                    f"{name}[{render(labels)}]": value for (name, labels), value in sorted(self.gauges.items())
+                },
+                "histograms": {
+                    f"{name}[{render(labels)}]": {
+                        "count": histogram.count,
+                        "sum": round(histogram.total, 6),
+                        "p50": histogram.quantile(0.5),
+                        "p95": histogram.quantile(0.95),
+                    }
+                    for (name, labels), histogram in sorted(self.histograms.items(), key=lambda item: item[0])
+                },
+            }
+
+    def write_snapshot(self, path):
+        """写入JSON快照文件（先写临时文件再替换）"""
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as file:
+            json.dump(self.snapshot(), file, ensure_ascii=False, indent=2)
+        os.replace(tmp_path, path)
+
+    def summary(self) -> str:
+        """运行结束时的摘要：各接口请求数/状态码/耗时/流量，各阶段耗时"""
+        with self._lock:
+            endpoints = {}
+            for (name, labels), value in self.counters.items():
+                label_dict = dict(labels)
+                endpoint = label_dict.get("endpoint")
+                if endpoint is None:
+                    continue
+                entry = endpoints.setdefault(endpoint, {"requests": 0, "errors": 0, "bytes": 0, "retries": 0})
+                if name == "requests_total":
+                    entry["requests"] += value
+                    if label_dict.get("status") != "200":
+                        entry["errors"] += value
+                elif name == "response_bytes_total":
+                    entry["bytes"] += value
+                elif name == "retries_total":
+                    entry["retries"] += value
+
+            lines = [f"运行指标摘要 (总耗时 {time.time() - self.started:.1f} 秒)"]
+            for endpoint, entry in sorted(endpoints.items()):
+                histogram = self.histograms.get(("request_seconds", (("endpoint", endpoint),)))
+                latency = ""
+                if histogram and histogram.count:
+                    latency = (f"，平均 {histogram.total / histogram.count * 1000:.0f}ms"
+                               f"，p95≤{histogram.quantile(0.95) * 1000:.0f}ms")
+                lines.append(
+                    f"- {endpoint}: 请求 {entry['requests']:.0f} 次，非200 {entry['errors']:.0f} 次，"
+                    f"重试 {entry['retries']:.0f} 次，{entry['bytes'] / 1024 / 1024:.2f} MB{latency}"
+                )
+            for (name, labels), histogram in sorted(self.histograms.items(), key=lambda item: item[0]):
+                if name == "request_seconds" or not histogram.count:
+                    continue
+                label_text = ",".join(f"{key}={value}" for key, value in labels)
+                lines.append(
+                    f"- {name}[{label_text}]: {histogram.count} 次，合计 {histogram.total:.2f} 秒，"
+                    f"平均 {histogram.total / histogram.count * 1000:.1f}ms"
+                )
+        return "\n".join(lines)
+
+
+def start_http_server(registry, port, host="127.0.0.1") -> ThreadingHTTPServer:
+    """
+    在后台线程中启动Prometheus指标接口 (GET /metrics)
+
+    Args:
+        registry: MetricsRegistry
+        port: 监听端口
+        host: 监听地址
+
+    Returns:
+        HTTP服务器对象，调用 shutdown() 停止
+    """
+    class MetricsHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split("?")[0] not in ("/metrics", "/"):
+                self.send_error(404)
+                return
+            body = registry.to_prometheus().encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer((host, port), MetricsHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+class SnapshotWriter:
+    """后台线程定期写入JSON指标快照"""
+
+    def __init__(self, registry, path, interval=30):
+        self.registry = registry
+        self.path = path
+        self.interval = interval
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            try:
+                self.registry.write_snapshot(self.path)
+            except OSError as e:
+                logger.warning("写入指标快照失败: %s", e)
+
+    def stop(self):
+        """停止并写入最后一次快照"""
+        self._stop.set()
+        self._thread.join(timeout=self.interval)
+        self.registry.write_snapshot(self.path)
+
+
+# 全局指标注册表，各模块直接导入使用
+metrics = MetricsRegistry()
@@ -0,0 +1,308 @@
+import json
+import math
+import os
+import re
+from typing import Dict, Optional
+
+from bilibili_api import RECENT_DAYS_MAX_PAGE, build_search_slices, search_min_slice_seconds, search_state_key
+from crawl_state import JsonStateStore
+from crawl_utils import count_keywords, iter_keywords
+
+# 每个搜索结果页的视频数（用于估计视频数量）
+SEARCH_PAGE_SIZE = 30
+
+# 没有历史指标时各接口单次请求的响应大小(字节)与耗时(秒)
+DEFAULT_RESPONSE_BYTES = {
+    "search_page": 400_000,
+    "video_page": 150_000,
+    "view_api": 8_000,
+    "owner_card": 4_000,
+    "reply_main": 30_000,
+}
+DEFAULT_REQUEST_SECONDS = {
+    "search_page": 1.0,
+    "video_page": 0.6,
+    "view_api": 0.2,
+    "owner_card": 0.2,
+    "reply_main": 0.4,
+}
+
+# 各阶段的并发与平均等待时间(秒)，与各阶段代码中的 random.uniform 区间一致
+SEARCH_PAGE_DELAY = 1.0       # 搜索翻页间隔 0.5~1.5
+DETAIL_BATCH_SIZE = 20        # main 中详情批次大小
+DETAIL_CONCURRENCY = 3        # get_videos_detail 默认并发数
+DETAIL_BATCH_DELAY = 0.8      # 详情批次间隔 0.4~1.2
+OWNER_CONCURRENCY = 3         # OwnerProfileFetcher 默认并发数
+OWNER_DELAY = 0.55            # UP主资料请求后等待 0.3~0.8
+COMMENT_PAGE_DELAY = 1.0      # 评论翻页间隔 0.5~1.5
+COMMENT_VIDEO_DELAY = 1.0     # 视频之间间隔 0.5~1.5
+
+_METRIC_KEY_PATTERN = re.compile(r"^(\w+)\[(.*)\]$")
+
+
+def _parse_metric_key(key):
+    """解析快照中的 "name[label=value,...]" 键"""
+    match = _METRIC_KEY_PATTERN.match(key)
+    if not match:
+        return key, {}
+    name, label_text = match.groups()
+    labels = dict(item.split("=", 1) for item in label_text.split(",") if "=" in item)
+    return name, labels
+
+
+def load_request_history(snapshot_path) -> Dict[str, Dict[str, float]]:
+    """
+    从JSON指标快照读取各接口的平均响应大小和耗时
+
+    Args:
+        snapshot_path: crawl_metrics 写出的快照文件路径
+
+    Returns:
+        {endpoint: {"bytes": 平均字节数, "seconds": 平均耗时}}，文件不存在时为空
+    """
+    if not snapshot_path or not os.path.exists(snapshot_path):
+        return {}
+    try:
+        with open(snapshot_path, "r", encoding="utf-8") as file:
+            snapshot = json.load(file)
+    except (OSError, ValueError):
+        return {}
+
+    requests, sizes, history = {}, {}, {}
+    for key, value in snapshot.get("counters", {}).items():
+        name, labels = _parse_metric_key(key)
+        endpoint = labels.get("endpoint")
+        if endpoint is None:
+            continue
+        if name == "requests_total" and labels.get("status") == "200":
+            requests[endpoint] = requests.get(endpoint, 0) + value
+        elif name == "response_bytes_total":
+            sizes[endpoint] = sizes.get(endpoint, 0) + value
+    for endpoint, count in requests.items():
+        if count and sizes.get(endpoint):
+            history.setdefault(endpoint, {})["bytes"] = sizes[endpoint] / count
+    for key, histogram in snapshot.get("histograms", {}).items():
+        name, labels = _parse_metric_key(key)
+        if name == "request_seconds" and labels.get("endpoint") and histogram.get("count"):
+            history.setdefault(labels["endpoint"], {})["seconds"] = histogram["sum"] / histogram["count"]
+    return history
+
+
+def resolve_time_range(config, recent_days=None):
+    """
+    确定搜索时间范围（main、--plan 与任务队列共用）
+
+    优先级: 参数 recent_days > 配置 recent_hot_days > 配置 recent_days > 配置 time_begin/time_end。
+    按最近N天搜索时每天一个时间段（每段最多 RECENT_DAYS_MAX_PAGE 页）。
+
+    Returns:
+        (time_begin, time_end, 按天搜索的天数)，按天搜索时前两项为None
+    """
+    if recent_days is None:
+        recent_days = config.get("recent_hot_days") or config.get("recent_days")
+    if recent_days:
+        return None, None, recent_days
+    return config.get("time_begin"), config.get("time_end"), None
+
+
+def _historical_pages(search_state, max_pages) -> Optional[float]:
+    """历史记录中已结束时间段的平均页数"""
+    if search_state is None or not len(search_state):
+        return None
+    ends = [min(int(search_state.get(key) or 0), max_pages) for key in list(search_state.entries)
+            if key in search_state]
+    return sum(ends) / len(ends) if ends else None
+
+
+def _adaptive_pages(search_state, keyword, begin_ts, end_ts, max_pages):
+    """
+    自适应划分的历史估计：之前运行中落在该时间段内的已结束子时间段页数之和，
+    加上被拆分的上层时间段各1次首页请求。没有历史时返回None
+    """
+    if search_state is None:
+        return None
+    prefix = f"{keyword}|"
+    leaves = []
+    for key in search_state.entries:
+        if not key.startswith(prefix) or key not in search_state:
+            continue
+        parts = key.split("|")
+        try:
+            leaf_begin, leaf_end = int(parts[-3]), int(parts[-2])
+        except (ValueError, IndexError):
+            continue
+        if begin_ts <= leaf_begin and leaf_end <= end_ts:
+            leaves.append(min(int(search_state.get(key) or 0), max_pages))
+    if not leaves:
+        return None
+    return sum(leaves) + len(leaves) - 1, len(leaves)
+
+
+def _phase(name, requests, endpoint, seconds, history, note=""):
+    profile = history.get(endpoint, {})
+    request_bytes = profile.get("bytes", DEFAULT_RESPONSE_BYTES[endpoint])
+    return {
+        "phase": name,
+        "endpoint": endpoint,
+        "requests": int(math.ceil(requests)),
+        "bytes": int(requests * request_bytes),
+        "seconds": seconds,
+        "from_history": "bytes" in profile,
+        "note": note,
+    }
+
+
+def estimate_crawl(config, max_page=None, fetch_details=True, fetch_comments=False, comments_max_page=None,
+                   recent_days=None, fetch_owners=None, search_only=False) -> Dict:
+    """
+    估计一次爬取的请求数、流量和耗时（不发出任何网络请求）
+
+    展开关键词组合与时间段；已结束的时间段若在搜索状态中记录了末页则按实际页数计算，
+    其余时间段按历史平均页数（无历史时按最大页数）估计。各接口的响应大小与耗时优先取
+    指标快照(metrics_snapshot_path)中的历史均值。耗时按各阶段的并发数和请求间隔估算。
+
+    Args:
+        config: 配置字典
+        max_page / fetch_details / fetch_comments / comments_max_page / recent_days /
+        fetch_owners / search_only: 与 main() 的同名参数相同
+
+    Returns:
+        计划字典，包含 keywords、slices、phases、total_requests、total_bytes、total_seconds 等
+    """
+    max_page = config.get("page", 1) if max_page is None else max_page
+    pages = min(config.get("page", 1), max_page)
+    partition = config.get("search_partition", "daily")
+    min_slice_seconds = search_min_slice_seconds(config.get("search_min_slice_hours", 1))
+    if fetch_owners is None:
+        fetch_owners = config.get("fetch_owner_profiles", False)
+    if search_only:
+        fetch_details = False
+
+    keyword_total = count_keywords(config["keywords"], config["is_union"])
+    time_begin, time_end, days = resolve_time_range(config, recent_days)
+    if days:
+        pages = min(pages, RECENT_DAYS_MAX_PAGE)
+    slices = build_search_slices(time_begin, time_end, days, partition)
+
+    search_state = None
+    if config.get("search_state_path"):
+        search_state = JsonStateStore(config["search_state_path"], ttl=config.get("search_state_ttl"))
+    history = load_request_history(config.get("metrics_snapshot_path"))
+    average_pages = _historical_pages(search_state, pages)
+    default_pages = average_pages if average_pages is not None else pages
+
+    # 搜索阶段：关键词 × 时间段
+    search_requests = 0.0
+    max_search_requests = 0
+    cached_slices = 0
+    for keyword in iter_keywords(config["keywords"], config["is_union"]):
+        for begin_ts, end_ts, _ in slices:
+            if partition == "adaptive" and begin_ts is not None:
+                estimate = _adaptive_pages(search_state, keyword, begin_ts, end_ts, pages)
+                if estimate is not None:
+                    search_requests += estimate[0]
+                    cached_slices += estimate[1]
+                else:
+                    search_requests += default_pages
+                # 上限：二分到最小长度的所有时间段都请求满页
+                leaf_count = max(1, (end_ts - begin_ts) // max(min_slice_seconds, 1))
+                max_search_requests += leaf_count * pages + leaf_count - 1
+                continue
+            key = search_state_key(keyword, begin_ts, end_ts)
+            known_end = search_state.get(key) if key and search_state is not None else None
+            if known_end is not None:
+                search_requests += min(int(known_end), pages)
+                cached_slices += 1
+            else:
+                search_requests += default_pages
+            max_search_requests += pages
+
+    search_latency = history.get("search_page", {}).get("seconds", DEFAULT_REQUEST_SECONDS["search_page"])
+    phases = [_phase(
+        "search", search_requests, "search_page",
+        search_requests * (search_latency + SEARCH_PAGE_DELAY), history,
+        note=f"{keyword_total} 个关键词 × {len(slices)} 个时间段，上限 {max_search_requests} 次请求"
+    )]
+
+    # 视频数量：搜索结果数（不同关键词之间的重复无法预知，按上限估计）
+    videos = int(search_requests * SEARCH_PAGE_SIZE)
+
+    if fetch_details and videos:
+        endpoint = "view_api" if config.get("detail_backend", "html") == "json" else "video_page"
+        latency = history.get(endpoint, {}).get("seconds", DEFAULT_REQUEST_SECONDS[endpoint])
+        batches = math.ceil(videos / DETAIL_BATCH_SIZE)
+        seconds = batches * (math.ceil(DETAIL_BATCH_SIZE / DETAIL_CONCURRENCY) * latency + DETAIL_BATCH_DELAY)
+        phases.append(_phase("detail", videos, endpoint, seconds, history))
+
+    if fetch_owners and videos:
+        latency = history.get("owner_card", {}).get("seconds", DEFAULT_REQUEST_SECONDS["owner_card"])
+        seconds = videos / OWNER_CONCURRENCY * (latency + OWNER_DELAY)
+        phases.append(_phase("owners", videos, "owner_card", seconds, history,
+                             note="上限，命中缓存或UP主重复时更少"))
+
+    if fetch_comments and videos:
+        comment_pages = videos * (comments_max_page or config.get("comments_max_page", 5))
+        if config.get("comments_request_budget") is not None:
+            comment_pages = min(comment_pages, config["comments_request_budget"])
+        latency = history.get("reply_main", {}).get("seconds", DEFAULT_REQUEST_SECONDS["reply_main"])
+        seconds = comment_pages * (latency + COMMENT_PAGE_DELAY) + videos * COMMENT_VIDEO_DELAY
+        phases.append(_phase("comments", comment_pages, "reply_main", seconds, history,
+                             note="上限，评论数少或为0的视频页数更少，不含二级评论"))
+
+    plan = {
+        "keywords": keyword_total,
+        "slices": len(slices),
+        "slices_total": keyword_total * len(slices),
+        "pages_per_slice": pages,
+        "partition": partition,
+        "cached_slices": cached_slices,
+        "average_pages": average_pages,
+        "videos": videos,
+        "phases": phases,
+        "total_requests": sum(phase["requests"] for phase in phases),
+        "total_bytes": sum(phase["bytes"] for phase in phases),
+        "total_seconds": sum(phase["seconds"] for phase in phases),
+        "max_requests": config.get("crawl_max_requests"),
+        "max_minutes": config.get("crawl_max_minutes"),
+    }
+    return plan
+
+
+def _format_duration(seconds) -> str:
+    if seconds < 60:
+        return f"{seconds:.0f} 秒"
+    if seconds < 3600:
+        return f"{seconds / 60:.1f} 分钟"
+    if seconds < 86400:
+        return f"{seconds / 3600:.1f} 小时"
+    return f"{seconds / 86400:.1f} 天"
+
+
+def format_plan(plan) -> str:
+    """生成爬取计划的文字报告"""
+    lines = [
+        "=== 爬取计划（估算，未发出网络请求） ===",
+        f"关键词组合: {plan['keywords']} 个，每个关键词 {plan['slices']} 个时间段({plan['partition']})，"
+        f"共 {plan['slices_total']} 个时间段，每段最多 {plan['pages_per_slice']} 页",
+    ]
+    if plan["cached_slices"]:
+        lines.append(f"搜索状态中已记录末页的时间段: {plan['cached_slices']} 个")
+    if plan["average_pages"] is not None:
+        lines.append(f"历史平均每个时间段 {plan['average_pages']:.1f} 页")
+    lines.append(f"预计视频数: 约 {plan['videos']} 个（未计关键词之间的重复）")
+    lines.append("")
+    for phase in plan["phases"]:
+        source = "历史" if phase["from_history"] else "默认"
+        line = (f"- {phase['phase']:<8} {phase['endpoint']:<12} 请求 {phase['requests']} 次，"
+                f"约 {phase['bytes'] / 1024 / 1024:.1f} MB({source})，约 {_format_duration(phase['seconds'])}")
+        if phase["note"]:
+            line += f"  [{phase['note']}]"
+        lines.append(line)
+    lines.append("")
+    lines.append(f"合计: 请求 {plan['total_requests']} 次，约 {plan['total_bytes'] / 1024 / 1024:.1f} MB，"
+                 f"约 {_format_duration(plan['total_seconds'])}")
+    if plan["max_requests"] is not None and plan["total_requests"] > plan["max_requests"]:
+        lines.append(f"注意: 超过请求上限 {plan['max_requests']}，运行将在预算用完时停止")
+    if plan["max_minutes"] is not None and plan["total_seconds"] > plan["max_minutes"] * 60:
+        lines.append(f"注意: 超过运行时长上限 {plan['max_minutes']} 分钟，运行将在预算用完时停止")
+    return "\n".join(lines)
@@ -0,0 +1,115 @@
+import cProfile
+import io
+import logging
+import os
+import pstats
+import time
+import tracemalloc
+from typing import Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+# 文本报告中列出的函数/内存分配位置数量
+REPORT_LIMIT = 40
+
+
+class StageProfiler:
+    """
+    按流水线阶段记录CPU与内存分析结果
+
+    每个阶段(search/detail/comments/db_export)调用 start()/stop()，结束时写出:
+    - <阶段>.prof: cProfile原始数据，可用 snakeviz / python -m pstats 查看
+    - <阶段>.txt: 按累计耗时排序的函数列表
+    - <阶段>.mem.txt: 阶段内 tracemalloc 内存增长最多的代码位置及峰值
+    同名阶段多次出现时文件名追加序号。未启用时所有方法都不做任何事。
+    """
+
+    def __init__(self, output_dir=None, enabled=True):
+        """
+        Args:
+            output_dir: 分析结果目录
+            enabled: 是否启用
+        """
+        self.enabled = enabled and bool(output_dir)
+        self.output_dir = output_dir
+        self.written = []
+        self._active: Optional[str] = None
+        self._profile: Optional[cProfile.Profile] = None
+        self._memory_start = None
+        self._wall_start = 0.0
+        self._counts: Dict[str, int] = {}
+        self._started_tracemalloc = False
+
+    def start(self, stage):
+        """开始记录阶段（同一时间只能有一个阶段）"""
+        if not self.enabled:
+            return
+        if self._active is not None:
+            self.stop(self._active)
+
+        if not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._started_tracemalloc = True
+        tracemalloc.reset_peak()
+        self._memory_start = tracemalloc.take_snapshot()
+
+        self._active = stage
+        self._wall_start = time.perf_counter()
+        self._profile = cProfile.Profile()
+        self._profile.enable()
+
+    def stop(self, stage=None):
+        """结束当前阶段并写出分析文件"""
+        if not self.enabled or self._active is None:
+            return
+        if stage is not None and stage != self._active:
+            return
+        self._profile.disable()
+        wall = time.perf_counter() - self._wall_start
+        _, peak = tracemalloc.get_traced_memory()
+        memory_end = tracemalloc.take_snapshot()
+
+        stage = self._active
+        self._counts[stage] = self._counts.get(stage, 0) + 1
+        name = stage if self._counts[stage] == 1 else f"{stage}_{self._counts[stage]}"
+        os.makedirs(self.output_dir, exist_ok=True)
+        base = os.path.join(self.output_dir, name)
+
+        self._profile.dump_stats(f"{base}.prof")
+
+        stream = io.StringIO()
+        stats = pstats.Stats(self._profile, stream=stream)
+        stats.sort_stats("cumulative").print_stats(REPORT_LIMIT)
+        with open(f"{base}.txt", "w", encoding="utf-8") as file:
+            file.write(f"阶段: {stage}\n耗时: {wall:.2f} 秒\n\n")
+            file.write(stream.getvalue())
+
+        memory_filter = [
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+            tracemalloc.Filter(False, "<frozen importlib._bootstrap_external>"),
+        ]
+        differences = memory_end.filter_traces(memory_filter).compare_to(
+            self._memory_start.filter_traces(memory_filter), "lineno"
+        )
+        with open(f"{base}.mem.txt", "w", encoding="utf-8") as file:
+            file.write(f"阶段: {stage}\n内存峰值: {peak / 1024 / 1024:.2f} MB\n\n")
+            for difference in differences[:REPORT_LIMIT]:
+                file.write(f"{difference}\n")
+
+        self.written.append(base)
+        self._active = None
+        self._profile = None
+        self._memory_start = None
+
+    def close(self):
+        """结束未完成的阶段并停止内存跟踪"""
+        if not self.enabled:
+            return
+        if self._active is not None:
+            self.stop(self._active)
+        if self._started_tracemalloc:
+            tracemalloc.stop()
+            self._started_tracemalloc = False
+        if self.written:
+            logger.info("性能分析结果已保存到: %s (%d 个阶段)", self.output_dir, len(self.written))
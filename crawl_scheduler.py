@@ -0,0 +1,185 @@
+import asyncio
+import multiprocessing
+import time
+from datetime import datetime
+from typing import Callable, Dict, List, Optional
+
+DATETIME_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+
+def _to_number(value) -> float:
+    try:
+        return float(value or 0)
+    except (TypeError, ValueError):
+        return 0.0
+
+
+def _pubdate_timestamp(video) -> float:
+    """发布时间转时间戳，无法解析时返回0（排在最后）"""
+    pubdate = video["video"].get("pubdate", "")
+    if isinstance(pubdate, datetime):
+        return pubdate.timestamp()
+    if isinstance(pubdate, (int, float)):
+        return float(pubdate)
+    try:
+        return datetime.strptime(str(pubdate), DATETIME_FORMAT).timestamp()
+    except ValueError:
+        return 0.0
+
+
+# 优先级函数：值越大越先处理；"search" 保持搜索结果的原始顺序
+PRIORITY_FUNCTIONS: Dict[str, Optional[Callable[[Dict], float]]] = {
+    "search": None,
+    "views": lambda video: _to_number(video["video"].get("view_count")),
+    "recency": _pubdate_timestamp,
+    "replies": lambda video: _to_number(video["video"].get("reply_count")),
+}
+
+
+def prioritize(videos, priority="search") -> List[Dict]:
+    """
+    按优先级排序视频（稳定排序，同优先级保持原顺序）
+
+    Args:
+        videos: 视频数据列表
+        priority: PRIORITY_FUNCTIONS 中的名称
+
+    Returns:
+        排序后的新列表
+    """
+    if priority not in PRIORITY_FUNCTIONS:
+        raise ValueError(f"不支持的优先级: {priority}，可选 {list(PRIORITY_FUNCTIONS)}")
+    key = PRIORITY_FUNCTIONS[priority]
+    if key is None:
+        return list(videos)
+    return sorted(videos, key=key, reverse=True)
+
+
+class CrawlBudget:
+    """
+    全局爬取预算：请求次数上限与运行时长上限
+
+    各阶段在开始一批工作前调用 remaining_requests()/exhausted 检查预算，
+    完成后调用 spend() 记录实际请求数；预算用完后停止后续工作并输出已获取的结果。
+    """
+
+    def __init__(self, max_requests=None, max_seconds=None):
+        """
+        Args:
+            max_requests: 请求次数上限，None表示不限制
+            max_seconds: 运行时长上限(秒)，None表示不限制
+        """
+        self.max_requests = max_requests
+        self.max_seconds = max_seconds
+        self.used_requests = 0
+        self.started = time.monotonic()
+
+    @property
+    def limited(self) -> bool:
+        return self.max_requests is not None or self.max_seconds is not None
+
+    def elapsed(self) -> float:
+        return time.monotonic() - self.started
+
+    def spend(self, requests=1):
+        self.used_requests += requests
+
+    def remaining_requests(self) -> Optional[int]:
+        """剩余请求次数，不限制时返回None"""
+        if self.max_requests is None:
+            return None
+        return max(0, self.max_requests - self.used_requests)
+
+    @property
+    def exhausted(self) -> bool:
+        if self.max_requests is not None and self.used_requests >= self.max_requests:
+            return True
+        if self.max_seconds is not None and self.elapsed() >= self.max_seconds:
+            return True
+        return False
+
+    def cap(self, count) -> int:
+        """将一批工作的数量限制在剩余请求次数内"""
+        remaining = self.remaining_requests()
+        return count if remaining is None else min(count, remaining)
+
+    def describe(self) -> str:
+        parts = [f"已用请求 {self.used_requests}"]
+        if self.max_requests is not None:
+            parts[0] += f"/{self.max_requests}"
+        parts.append(f"已用时间 {self.elapsed() / 60:.1f}")
+        if self.max_seconds is not None:
+            parts[-1] += f"/{self.max_seconds / 60:.1f}"
+        parts[-1] += " 分钟"
+        return "，".join(parts)
+
+
+class SharedCrawlBudget(CrawlBudget):
+    """
+    多进程共享的爬取预算（--workers）
+
+    已用请求数保存在 multiprocessing.Value 中，各进程的 spend() 累加到同一个计数器；
+    运行时长从父进程记录的开始时间计算（time.monotonic 在同一台机器的进程间一致）。
+    """
+
+    def __init__(self, counter, max_requests=None, max_seconds=None, started=None):
+        """
+        Args:
+            counter: multiprocessing.Value("q")，已用请求数
+            max_requests: 请求次数上限，None表示不限制
+            max_seconds: 运行时长上限(秒)，None表示不限制
+            started: 开始时间(time.monotonic)，默认为当前时间
+        """
+        self._counter = counter
+        self.max_requests = max_requests
+        self.max_seconds = max_seconds
+        self.started = started if started is not None else time.monotonic()
+
+    @property
+    def used_requests(self) -> int:
+        return self._counter.value
+
+    def spend(self, requests=1):
+        with self._counter.get_lock():
+            self._counter.value += requests
+
+
+class RequestRateLimiter:
+    """
+    全局请求速率限制：相邻两次请求之间的最小间隔
+
+    每次请求前 await wait() 预约下一个时间点并等待；间隔为0时不做任何事。
+    预约时间保存在 multiprocessing.Value 中，传入父进程创建的 Value 即可在多个进程之间共享。
+    """
+
+    def __init__(self):
+        self.interval = 0.0
+        self._next_slot = None
+
+    def configure(self, interval, next_slot=None):
+        """
+        Args:
+            interval: 最小间隔(秒)，None或0表示不限制
+            next_slot: 共享的 multiprocessing.Value("d")，None表示仅在本进程内限制
+        """
+        self.interval = float(interval or 0)
+        self._next_slot = next_slot if next_slot is not None else multiprocessing.Value("d", 0.0)
+
+    def reserve(self) -> float:
+        """预约下一个请求时间点，返回需要等待的秒数"""
+        now = time.time()
+        with self._next_slot.get_lock():
+            slot = max(now, self._next_slot.value)
+            self._next_slot.value = slot + self.interval
+        return slot - now
+
+    async def wait(self):
+        if self.interval <= 0:
+            return
+        delay = self.reserve()
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+
+# 全局速率限制器，各模块在发出请求前调用 await rate_limiter.wait()
+rate_limiter = RequestRateLimiter()
@@ -0,0 +1,117 @@
+import json
+import logging
+import os
+import time
+from typing import Any, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class JsonStateStore:
+    """
+    基于JSON文件的键值状态存储
+
+    每条记录保存写入时间，可选TTL过期；用于在多次运行之间保留缓存和爬取状态。
+    写入只修改内存，调用 save() 时以原子替换的方式落盘。
+    """
+
+    def __init__(self, path, ttl=None):
+        """
+        Args:
+            path: JSON文件路径，为空时仅在内存中保存
+            ttl: 记录有效期(秒)，None表示永不过期
+        """
+        self.path = path
+        self.ttl = ttl
+        self.entries = {}
+        self.dirty = False
+        self._load()
+
+    def _load(self):
+        if not self.path or not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, 'r', encoding='utf-8') as file:
+                self.entries = json.load(file)
+        except (OSError, ValueError) as e:
+            logger.warning("读取状态文件失败，将重新创建: %s (%s)", self.path, e)
+            self.entries = {}
+
+    def _is_expired(self, entry, now=None) -> bool:
+        if self.ttl is None:
+            return False
+        now = now if now is not None else time.time()
+        return now - entry.get("updated", 0) > self.ttl
+
+    def get(self, key, default=None) -> Any:
+        """读取未过期的记录"""
+        entry = self.entries.get(str(key))
+        if entry is None or self._is_expired(entry):
+            return default
+        return entry.get("value")
+
+    def get_updated(self, key) -> Optional[float]:
+        """读取记录的写入时间，记录不存在或已过期时返回None"""
+        entry = self.entries.get(str(key))
+        if entry is None or self._is_expired(entry):
+            return None
+        return entry.get("updated")
+
+    def set(self, key, value):
+        self.entries[str(key)] = {"value": value, "updated": time.time()}
+        self.dirty = True
+
+    def delete(self, key):
+        if self.entries.pop(str(key), None) is not None:
+            self.dirty = True
+
+    def __contains__(self, key) -> bool:
+        entry = self.entries.get(str(key))
+        return entry is not None and not self._is_expired(entry)
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def purge_expired(self):
+        """删除所有过期记录"""
+        now = time.time()
+        expired = [key for key, entry in self.entries.items() if self._is_expired(entry, now)]
+        for key in expired:
+            del self.entries[key]
+        if expired:
+            self.dirty = True
+
+    def merge_file(self, path) -> int:
+        """
+        合并另一个状态文件的记录，同一键保留写入时间较新的记录
+
+        Args:
+            path: JSON状态文件路径
+
+        Returns:
+            更新的记录数
+        """
+        other = JsonStateStore(path)
+        merged = 0
+        for key, entry in other.entries.items():
+            current = self.entries.get(key)
+            if current is None or entry.get("updated", 0) > current.get("updated", 0):
+                self.entries[key] = entry
+                merged += 1
+        if merged:
+            self.dirty = True
+        return merged
+
+    def save(self):
+        """将状态写入磁盘（先写临时文件再替换，避免中断时损坏）"""
+        if not self.path or not self.dirty:
+            return
+        self.purge_expired()
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as file:
+            json.dump(self.entries, file, ensure_ascii=False)
+        os.replace(tmp_path, self.path)
+        self.dirty = False
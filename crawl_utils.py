@@ -1,14 +1,133 @@
 import csv
+import itertools
 import json
+import logging
+import os
+import re
+import unicodedata
+import zlib
+from datetime import datetime
 import pandas as pd
 import numpy as np
 from typing import List, Dict, Any
+from tqdm import tqdm
+from columnar_export import COLUMNAR_FORMATS, read_comment_rows, write_video_table
+
+logger = logging.getLogger(__name__)
 
 def generate_combinations(arra, arrb):
     """生成关键词笛卡尔积"""
     return [a + b for a in arra for b in arrb]
 
 
+def normalize_keyword(keyword):
+    """规范化关键词：全角转半角(NFKC)、去除首尾空白并合并连续空白"""
+    return " ".join(unicodedata.normalize("NFKC", keyword).split())
+
+
+def keyword_shard(keyword, shard_count):
+    """关键词所属的分片编号（基于crc32，与进程和运行无关）"""
+    return zlib.crc32(normalize_keyword(keyword).casefold().encode("utf-8")) % shard_count
+
+
+def _keyword_factors(keywords, is_union):
+    """
+    关键词的组成部分，每项为一个去重后的候选列表
+    
+    OR 逻辑下只有一项（所有关键词扁平化）；AND 逻辑下每个关键词一项，嵌套列表先按 AND 逻辑展开。
+    """
+    if is_union:
+        flat = []
+        for keyword in keywords:
+            if isinstance(keyword, str):
+                flat.append(keyword)
+            else:
+                flat.extend(_iter_combined(keyword, is_union))
+        return [_dedup(flat)]
+    return [_dedup([keyword] if isinstance(keyword, str) else _iter_combined(keyword, is_union))
+            for keyword in keywords]
+
+
+def _dedup(keywords):
+    """规范化并去重（保持首次出现的顺序，忽略大小写）"""
+    seen = set()
+    result = []
+    for keyword in keywords:
+        keyword = normalize_keyword(keyword)
+        key = keyword.casefold()
+        if keyword and key not in seen:
+            seen.add(key)
+            result.append(keyword)
+    return result
+
+
+def _iter_combined(keywords, is_union):
+    factors = _keyword_factors(keywords, is_union)
+    if is_union:
+        yield from factors[0]
+        return
+    for combination in itertools.product(*factors):
+        yield "".join(combination)
+
+
+def _may_repeat(keywords, is_union):
+    """
+    AND 组合是否可能重复
+    
+    两个不同的组合拼出相同关键词时，第一个不同的组成部分中必有一个候选是另一个的前缀
+    （如 "ab"+"c" 与 "a"+"bc"），因此只需检查末尾以外的组成部分。
+    """
+    if is_union:
+        return False
+    for factor in _keyword_factors(keywords, is_union)[:-1]:
+        keys = sorted(keyword.casefold() for keyword in factor)
+        if any(longer.startswith(shorter) for shorter, longer in zip(keys, keys[1:])):
+            return True
+    return False
+
+
+def iter_keywords(keywords, is_union=True, shard_index=0, shard_count=1):
+    """
+    按稳定顺序逐个生成搜索关键词（生成器，不保存完整的组合列表）
+    
+    OR 逻辑按首次出现的顺序扁平化并去重；AND 逻辑按笛卡尔积顺序生成组合，
+    各组成部分先规范化去重；不同组合可能拼出相同关键词时（见 _may_repeat）
+    再按生成的关键词去重（忽略大小写），只有这种情况需要记录已生成的关键词。
+    多个进程可按 shard_index/shard_count 取各自的分片，同一关键词在每次运行中都落在同一分片。
+    
+    Args:
+        keywords: 关键词列表（可嵌套）
+        is_union: True表示OR逻辑(并集)，False表示AND逻辑(交集)
+        shard_index: 当前分片编号
+        shard_count: 分片总数
+        
+    Yields:
+        规范化后的关键词
+    """
+    seen = set() if _may_repeat(keywords, is_union) else None
+    for keyword in _iter_combined(keywords, is_union):
+        if not keyword:
+            continue
+        if seen is not None:
+            key = keyword.casefold()
+            if key in seen:
+                continue
+            seen.add(key)
+        if shard_count > 1 and keyword_shard(keyword, shard_count) != shard_index:
+            continue
+        yield keyword
+
+
+def count_keywords(keywords, is_union=True, shard_index=0, shard_count=1):
+    """关键词数量；不分片且组合不会重复时由各组成部分的数量直接计算，无需展开组合"""
+    if shard_count > 1 or _may_repeat(keywords, is_union):
+        return sum(1 for _ in iter_keywords(keywords, is_union, shard_index, shard_count))
+    count = 1
+    for factor in _keyword_factors(keywords, is_union):
+        count *= len(factor)
+    return count
+
+
 def mix_keywords(keywords, is_union=True):
     """
     混合关键词逻辑（AND/OR）
@@ -18,25 +137,75 @@ def mix_keywords(keywords, is_union=True):
         is_union: True表示OR逻辑(并集)，False表示AND逻辑(交集)
         
     Returns:
-        处理后的关键词列表
+        处理后的关键词列表（顺序稳定，已去重）；关键词较多时请使用 iter_keywords
     """
-    if not is_union:  # AND 逻辑（笛卡尔积）
-        result = [""]
-        for keyword in keywords:
-            if isinstance(keyword, str):
-                sub = [keyword]
-            else:
-                sub = mix_keywords(keyword, is_union)
-            result = generate_combinations(result, sub)
-        return result
-    else:  # OR 逻辑（扁平化）
-        result = []
-        for keyword in keywords:
-            if isinstance(keyword, str):
-                result.append(keyword)
-            else:
-                result.extend(mix_keywords(keyword, is_union))
-        return list(set(result))  # 去重
+    return list(iter_keywords(keywords, is_union))
+
+
+def filter_search_results(videos, blacklist) -> List[Dict]:
+    """
+    清洗搜索结果：去掉标题中的高亮标签，过滤标题包含黑名单词的视频
+    
+    Args:
+        videos: 搜索得到的基本信息列表（标题原地更新）
+        blacklist: 黑名单词列表
+        
+    Returns:
+        未被过滤的视频列表
+    """
+    filtered = []
+    for video in videos:
+        title = re.sub(r"<.*?>", "", video["video"]["title"])
+        video["video"]["title"] = title
+        if not any(black in title for black in blacklist):
+            filtered.append(video)
+    return filtered
+
+
+def save_video_output(df, file_path, output_format):
+    """
+    按输出格式保存视频数据
+    
+    Args:
+        df: prepare_full_video_frame / prepare_simple_video_frame 的结果
+        file_path: 配置中的输出路径（扩展名按格式替换）
+        output_format: csv、xlsx 或列式格式(parquet/feather/arrow)
+        
+    Returns:
+        实际写入的文件路径（xlsx保存失败时为备选的CSV路径）
+    """
+    file_base, file_ext = os.path.splitext(file_path)
+    
+    if output_format == "xlsx":
+        output_path = f"{file_base}.xlsx" if file_ext != ".xlsx" else file_path
+        try:
+            df.to_excel(output_path, index=False)
+            logger.info("数据已保存到Excel文件: %s", output_path)
+        except Exception as e:
+            logger.error("保存Excel失败: %s", e)
+            try:
+                output_path = f"{file_base}.csv"
+                df.to_csv(output_path, index=False, encoding='utf-8-sig')
+                logger.info("已备选保存为CSV文件: %s", output_path)
+            except Exception as csv_e:
+                logger.error("保存CSV失败: %s", csv_e)
+    elif output_format in COLUMNAR_FORMATS:
+        # 列式格式(parquet/feather/arrow)
+        output_path = f"{file_base}{COLUMNAR_FORMATS[output_format]}"
+        try:
+            write_video_table(df, output_path, output_format)
+            logger.info("数据已保存到%s文件: %s", output_format, output_path)
+        except Exception as e:
+            logger.error("保存%s失败: %s", output_format, e)
+    else:
+        # 默认CSV格式
+        output_path = f"{file_base}.csv" if file_ext != ".csv" else file_path
+        try:
+            df.to_csv(output_path, index=False, encoding='utf-8-sig')
+            logger.info("数据已保存到CSV文件: %s", output_path)
+        except Exception as e:
+            logger.error("保存CSV失败: %s", e)
+    return output_path
 
 
 def extract_comment_data(csv_path):
@@ -44,13 +213,17 @@ def extract_comment_data(csv_path):
     从CSV文件中提取评论数据
     
     Args:
-        csv_path: 评论CSV文件路径
+        csv_path: 评论CSV文件路径（也支持列式评论文件）
         
     Returns:
         评论数据列表
     """
     comments_data = []
     try:
+        # 列式评论文件(parquet/feather/arrow)
+        if os.path.splitext(csv_path)[1] in COLUMNAR_FORMATS.values():
+            return read_comment_rows(csv_path)
+        
         with open(csv_path, mode='r', encoding='utf-8-sig') as file:
             csv_reader = csv.reader(file)
             next(csv_reader)  # 跳过表头
@@ -58,7 +231,7 @@ def extract_comment_data(csv_path):
                 comments_data.append(row)
         return comments_data
     except Exception as e:
-        print(f"读取评论文件失败: {e}")
+        logger.error("读取评论文件失败: %s", e)
         return []
 
 
@@ -123,6 +296,9 @@ def prepare_full_video_data(video):
         "owner_mid": video_info.get("owner_mid", 0),
         "owner_name": owner_info.get("name", ""),
         "owner_face": owner_info.get("face_url", ""),
+        "owner_level": owner_info.get("level", 0),
+        "owner_follower_count": owner_info.get("follower_count", 0),
+        "owner_video_count": owner_info.get("video_count", 0),
         
         # 分P信息
         "page_count": len(pages_info),
@@ -174,24 +350,225 @@ def prepare_simple_video_data(video):
     }
 
 
+# 全字段输出的列定义: (输出列名, 来源, 字段名, 默认值)
+# 来源为 "video"/"owner" 时直接取对应字典字段，"pages"/"honors" 为派生列
+FULL_VIDEO_COLUMNS = [
+    ("bvid", "video", "bvid", ""),
+    ("aid", "video", "aid", 0),
+    ("title", "video", "title", ""),
+    ("cover_url", "video", "cover_url", ""),
+    ("tid", "video", "tid", 0),
+    ("tname", "video", "tname", ""),
+    ("tid_v2", "video", "tid_v2", 0),
+    ("tname_v2", "video", "tname_v2", ""),
+    ("description", "video", "description", ""),
+    ("keywords", "video", "keywords", ""),
+    ("dynamic", "video", "dynamic", ""),
+    ("pubdate", "video", "pubdate", ""),
+    ("ctime", "video", "ctime", ""),
+    ("duration", "video", "duration", 0),
+    ("videos", "video", "videos", 0),
+    ("copyright", "video", "copyright", 0),
+    ("no_reprint", "video", "no_reprint", False),
+    ("is_downloadable", "video", "is_downloadable", False),
+    ("autoplay", "video", "autoplay", False),
+    ("view_count", "video", "view_count", 0),
+    ("danmaku_count", "video", "danmaku_count", 0),
+    ("reply_count", "video", "reply_count", 0),
+    ("favorite_count", "video", "favorite_count", 0),
+    ("coin_count", "video", "coin_count", 0),
+    ("share_count", "video", "share_count", 0),
+    ("like_count", "video", "like_count", 0),
+    ("dislike_count", "video", "dislike_count", 0),
+    ("owner_mid", "video", "owner_mid", 0),
+    ("owner_name", "owner", "name", ""),
+    ("owner_face", "owner", "face_url", ""),
+    ("owner_level", "owner", "level", 0),
+    ("owner_follower_count", "owner", "follower_count", 0),
+    ("owner_video_count", "owner", "video_count", 0),
+    ("page_count", "pages", None, None),
+    ("page_info", "pages", None, None),
+    ("honors", "honors", None, None),
+    ("state", "video", "state", 0),
+    ("mission_id", "video", "mission_id", 0),
+]
+
+# 简洁输出的列定义，"分区" 为派生列
+SIMPLE_VIDEO_COLUMNS = [
+    ("BV号", "video", "bvid", ""),
+    ("标题", "video", "title", ""),
+    ("UP主", "owner", "name", ""),
+    ("分区", "partition", None, None),
+    ("播放量", "video", "view_count", 0),
+    ("弹幕数", "video", "danmaku_count", 0),
+    ("收藏", "video", "favorite_count", 0),
+    ("硬币", "video", "coin_count", 0),
+    ("分享", "video", "share_count", 0),
+    ("点赞", "video", "like_count", 0),
+    ("发布时间", "video", "pubdate", ""),
+    ("简介", "video", "description", ""),
+    ("AV号", "video", "aid", 0),
+]
+
+
+def _dump_json_list(items):
+    """与逐行版本一致：空列表输出 "[]" """
+    return json.dumps(items, ensure_ascii=False) if items else "[]"
+
+
+def _build_video_frame(videos, column_specs) -> pd.DataFrame:
+    """按列构建视频DataFrame，避免逐行构造字典"""
+    video_infos = [video["video"] for video in videos]
+    owner_infos = [video["owner"] for video in videos]
+
+    columns = {}
+    for column, source, key, default in column_specs:
+        if source == "video":
+            columns[column] = [info.get(key, default) for info in video_infos]
+        elif source == "owner":
+            columns[column] = [info.get(key, default) for info in owner_infos]
+        elif column == "page_count":
+            columns[column] = [len(video.get("pages", [])) for video in videos]
+        elif column == "page_info":
+            columns[column] = [_dump_json_list(video.get("pages", [])) for video in videos]
+        elif column == "honors":
+            columns[column] = [_dump_json_list(video.get("honors", [])) for video in videos]
+        elif column == "分区":
+            columns[column] = [f"{info.get('tname', '')} ({info.get('tid', '')})" for info in video_infos]
+
+    df = pd.DataFrame(columns, columns=[spec[0] for spec in column_specs])
+
+    # 向量化处理 NaN：对象列中的缺失值统一为 None，与逐行版本保持一致
+    for column in df.columns:
+        if df[column].dtype == object:
+            mask = df[column].isna()
+            if mask.any():
+                df[column] = df[column].where(~mask, None)
+    return df
+
+
+def prepare_full_video_frame(videos) -> pd.DataFrame:
+    """
+    批量准备完整的视频数据（列式构建，结果与逐行调用 prepare_full_video_data 一致）
+    
+    Args:
+        videos: 视频数据字典列表
+        
+    Returns:
+        全字段DataFrame
+    """
+    return _build_video_frame(videos, FULL_VIDEO_COLUMNS)
+
+
+def prepare_simple_video_frame(videos) -> pd.DataFrame:
+    """
+    批量准备简洁版的视频数据（列式构建，结果与逐行调用 prepare_simple_video_data 一致）
+    
+    Args:
+        videos: 视频数据字典列表
+        
+    Returns:
+        简洁版DataFrame
+    """
+    return _build_video_frame(videos, SIMPLE_VIDEO_COLUMNS)
+
+
+# 标准 LogRecord 属性，JSON 日志中其余属性视为 extra 字段输出
+_LOG_RECORD_FIELDS = set(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {"message", "asctime"}
+
+
+class JsonLogFormatter(logging.Formatter):
+    """每条日志输出为一行JSON，extra 参数中的字段一并输出"""
+
+    def format(self, record):
+        entry = {
+            "time": datetime.fromtimestamp(record.created).strftime('%Y-%m-%d %H:%M:%S.%f')[:-3],
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        for key, value in vars(record).items():
+            if key not in _LOG_RECORD_FIELDS and not key.startswith("_"):
+                entry[key] = value
+        if record.exc_info:
+            entry["exc_info"] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+class RateLimitFilter(logging.Filter):
+    """
+    重复日志限流：同一位置、同一消息模板的 WARNING 及以上日志在 interval 秒内只输出一次，
+    下一次输出时附带被省略的条数。使用 logger.warning("...%s", arg) 形式时，参数不同的同类日志也会合并。
+    """
+
+    def __init__(self, interval=10.0, min_level=logging.WARNING):
+        super().__init__()
+        self.interval = interval
+        self.min_level = min_level
+        self._last = {}
+
+    def filter(self, record):
+        if record.levelno < self.min_level or self.interval <= 0:
+            return True
+        # 同一条日志经过多个handler时只判断一次
+        decision = getattr(record, "_rate_limit_pass", None)
+        if decision is not None:
+            return decision
+        key = (record.name, record.lineno, record.msg)
+        now = record.created
+        last_time, suppressed = self._last.get(key, (None, 0))
+        if last_time is not None and now - last_time < self.interval:
+            self._last[key] = (last_time, suppressed + 1)
+            record._rate_limit_pass = False
+            return False
+        self._last[key] = (now, 0)
+        if suppressed:
+            record.suppressed = suppressed
+            record.msg = f"{record.msg} (此前 {suppressed} 条相同日志已省略)"
+        record._rate_limit_pass = True
+        return True
+
+
+class TqdmLoggingHandler(logging.StreamHandler):
+    """通过 tqdm.write 输出日志，避免打断进度条"""
+
+    def emit(self, record):
+        try:
+            tqdm.write(self.format(record), file=self.stream)
+        except Exception:
+            self.handleError(record)
+
+
 def setup_logging(config):
     """
     设置日志记录
     
+    各模块使用 logging.getLogger(__name__) 记录日志，此处统一配置根日志器：
+    级别(log_level)、文本或JSON格式(log_format)、日志文件(log_file)以及重复警告限流(log_rate_limit)。
+    
     Args:
         config: 配置信息
         
     Returns:
         logger对象
     """
-    import logging
-    log_level = getattr(logging, config.get("log_level", "INFO"))
-    logging.basicConfig(
-        level=log_level,
-        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-        handlers=[
-            logging.FileHandler("bilibili_crawler.log"),
-            logging.StreamHandler()
-        ]
-    )
-    return logging.getLogger("bilibili_crawler")
\ No newline at end of file
+    log_level = getattr(logging, str(config.get("log_level", "INFO")).upper())
+    if config.get("log_format", "text") == "json":
+        formatter = JsonLogFormatter()
+    else:
+        formatter = logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    
+    handlers = [TqdmLoggingHandler()]
+    if config.get("log_file", "bilibili_crawler.log"):
+        handlers.append(logging.FileHandler(config.get("log_file", "bilibili_crawler.log"), encoding='utf-8'))
+    
+    rate_limit = RateLimitFilter(config.get("log_rate_limit", 10))
+    for handler in handlers:
+        handler.setFormatter(formatter)
+        handler.addFilter(rate_limit)
+    
+    logging.basicConfig(level=log_level, handlers=handlers, force=True)
+    # 第三方库只输出警告及以上
+    for name in ("urllib3", "asyncio", "aiohttp"):
+        logging.getLogger(name).setLevel(max(log_level, logging.WARNING))
+    return logging.getLogger("bilibili_crawler")
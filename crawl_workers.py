@@ -0,0 +1,242 @@
+import asyncio
+import logging
+import multiprocessing
+import os
+import shutil
+import time
+from typing import Dict, List
+
+import pandas as pd
+
+from config import config
+from columnar_export import COLUMNAR_FORMATS, read_video_table, write_video_table
+from crawl_scheduler import SharedCrawlBudget, rate_limiter
+from crawl_state import JsonStateStore
+
+logger = logging.getLogger(__name__)
+
+# 每个工作进程使用独立副本、结束后合并回原文件的状态/缓存文件
+STATE_PATH_KEYS = ("search_state_path", "negative_cache_path", "owner_cache_path")
+
+# 工作进程内的共享对象，由进程池的 initializer 设置
+_shared = {}
+
+
+class WorkerShard:
+    """
+    工作进程的分片信息与跨进程共享状态，传给 main(worker=...)
+
+    - shard_index/shard_count: 进程编号与进程数
+    - budget: 所有进程共享的请求数/时长预算
+    - claim_slice(): 认领（关键词, 时间段），每个时间段只由先认领的进程搜索
+    - claim(): 认领搜索到的视频，同一个BV号只由一个进程获取详情和评论
+    """
+
+    def __init__(self, shard_index, shard_count, budget, claimed, claim_lock, claimed_slices):
+        self.shard_index = shard_index
+        self.shard_count = shard_count
+        self.budget = budget
+        self._claimed = claimed
+        self._claim_lock = claim_lock
+        self._claimed_slices = claimed_slices
+
+    def claim_slice(self, keyword, begin_ts, end_ts) -> bool:
+        """
+        认领搜索时间段（作为 search_videos 的 slice_filter）
+
+        所有进程按相同顺序遍历全部关键词和时间段，先到的进程认领，
+        因此即使只有一个关键词，各时间段也会分给空闲的进程。
+
+        Returns:
+            是否由本进程搜索该时间段
+        """
+        key = f"{keyword}|{begin_ts}|{end_ts}"
+        with self._claim_lock:
+            if key in self._claimed_slices:
+                return False
+            self._claimed_slices[key] = self.shard_index
+        return True
+
+    def claim(self, videos) -> List[Dict]:
+        """
+        认领视频
+
+        Args:
+            videos: 本进程搜索到的视频列表（已去重）
+
+        Returns:
+            未被其他进程认领的视频（保持原顺序）
+        """
+        with self._claim_lock:
+            taken = set(self._claimed.keys())
+            claimed = [video for video in videos if video["video"]["bvid"] not in taken]
+            self._claimed.update({video["video"]["bvid"]: self.shard_index for video in claimed})
+        if len(claimed) < len(videos):
+            logger.info("工作进程 %d: %d 个视频已由其他进程处理", self.shard_index, len(videos) - len(claimed))
+        return claimed
+
+
+def _part_path(path, index):
+    """工作进程的文件路径: name.csv -> name.part0.csv"""
+    base, ext = os.path.splitext(path)
+    return f"{base}.part{index}{ext}"
+
+
+def _init_worker(request_counter, next_slot, claimed, claim_lock, claimed_slices):
+    _shared.update(
+        request_counter=request_counter,
+        next_slot=next_slot,
+        claimed=claimed,
+        claim_lock=claim_lock,
+        claimed_slices=claimed_slices,
+    )
+
+
+def _run_worker(main_func, index, count, parent_config, main_kwargs, budget_limits):
+    """工作进程入口：使用父进程的配置，输出和状态文件改为本进程的分片文件"""
+    config.clear()
+    config.update(parent_config)
+    config["file_path"] = _part_path(parent_config["file_path"], index)
+    for key in STATE_PATH_KEYS:
+        path = parent_config.get(key)
+        if path:
+            # 从原文件的副本开始，结束后由父进程合并
+            config[key] = _part_path(path, index)
+            if os.path.exists(path):
+                shutil.copyfile(path, config[key])
+    if parent_config.get("metrics_port"):
+        config["metrics_port"] = parent_config["metrics_port"] + index
+    if parent_config.get("metrics_snapshot_path"):
+        config["metrics_snapshot_path"] = _part_path(parent_config["metrics_snapshot_path"], index)
+    if parent_config.get("profile_dir"):
+        config["profile_dir"] = os.path.join(parent_config["profile_dir"], f"worker{index}")
+
+    main_kwargs = dict(main_kwargs)
+    trace_path = main_kwargs.get("trace_path") or parent_config.get("trace_path")
+    if trace_path:
+        main_kwargs["trace_path"] = _part_path(trace_path, index)
+
+    rate_limiter.configure(parent_config.get("request_interval"), _shared["next_slot"])
+    max_requests, max_seconds, started = budget_limits
+    budget = SharedCrawlBudget(_shared["request_counter"], max_requests, max_seconds, started)
+    worker = WorkerShard(index, count, budget, _shared["claimed"], _shared["claim_lock"],
+                         _shared["claimed_slices"])
+    return asyncio.run(main_func(**main_kwargs, worker=worker))
+
+
+def merge_video_outputs(part_paths, output_path, output_format) -> int:
+    """
+    合并各工作进程的视频输出文件
+
+    Args:
+        part_paths: 分片文件路径列表（不存在的文件会被跳过）
+        output_path: 合并后的文件路径
+        output_format: csv、xlsx 或列式格式
+
+    Returns:
+        合并后的行数
+    """
+    part_paths = [path for path in part_paths if path and os.path.exists(path)]
+    if not part_paths:
+        return 0
+
+    if output_format in COLUMNAR_FORMATS:
+        df = pd.concat([read_video_table(path) for path in part_paths], ignore_index=True)
+        write_video_table(df, output_path, output_format)
+    elif output_format == "xlsx" and all(path.endswith(".xlsx") for path in part_paths):
+        df = pd.concat([pd.read_excel(path) for path in part_paths], ignore_index=True)
+        df.to_excel(output_path, index=False)
+    else:
+        df = pd.concat([pd.read_csv(path, encoding="utf-8-sig") for path in part_paths], ignore_index=True)
+        df.to_csv(output_path, index=False, encoding="utf-8-sig")
+
+    for path in part_paths:
+        if os.path.abspath(path) != os.path.abspath(output_path):
+            os.remove(path)
+    return len(df)
+
+
+def _merge_state_files(parent_config, worker_count):
+    """将各工作进程的状态/缓存文件合并回原文件"""
+    for key in STATE_PATH_KEYS:
+        path = parent_config.get(key)
+        if not path:
+            continue
+        store = JsonStateStore(path)
+        for index in range(worker_count):
+            part = _part_path(path, index)
+            if os.path.exists(part):
+                store.merge_file(part)
+                os.remove(part)
+        store.save()
+
+
+def run_workers(main_func, worker_count, main_kwargs) -> Dict:
+    """
+    多进程分片爬取（--workers）
+
+    每个进程有独立的事件循环和会话，按（关键词, 时间段）认领搜索任务：先到的进程搜索该时间段，
+    自适应划分时每个时间段先等分为 worker_count 段，因此单个关键词也能由多个进程分担。
+    请求预算、请求间隔(request_interval)、已认领的时间段和BV号在进程之间共享。
+    各进程写出分片输出文件（视频数据也各自写入数据库），结束后合并为一个输出文件，
+    状态/缓存文件合并回原路径。
+
+    Args:
+        main_func: main 协程函数
+        worker_count: 进程数
+        main_kwargs: 传给 main 的参数
+
+    Returns:
+        与 main 相同结构的汇总结果
+    """
+    max_requests = main_kwargs.get("max_requests")
+    if max_requests is None:
+        max_requests = config.get("crawl_max_requests")
+    max_minutes = main_kwargs.get("max_minutes")
+    if max_minutes is None:
+        max_minutes = config.get("crawl_max_minutes")
+    budget_limits = (max_requests, max_minutes * 60 if max_minutes else None, time.monotonic())
+
+    context = multiprocessing.get_context("spawn")
+    manager = context.Manager()
+    request_counter = context.Value("q", 0)
+    next_slot = context.Value("d", 0.0)
+    claimed = manager.dict()
+    claim_lock = manager.Lock()
+    claimed_slices = manager.dict()
+
+    parent_config = dict(config)
+    print(f"启动 {worker_count} 个工作进程，按关键词和时间段分配爬取")
+    pool = context.Pool(worker_count, initializer=_init_worker,
+                        initargs=(request_counter, next_slot, claimed, claim_lock, claimed_slices))
+    try:
+        results = pool.starmap(_run_worker, [
+            (main_func, index, worker_count, parent_config, main_kwargs, budget_limits)
+            for index in range(worker_count)
+        ])
+        pool.close()
+    except BaseException:
+        pool.terminate()
+        raise
+    finally:
+        pool.join()
+        manager.shutdown()
+
+    _merge_state_files(parent_config, worker_count)
+
+    results = [result for result in results if result]
+    output_format = main_kwargs.get("output_format") or config["output_format"]
+    part_paths = [result["output_file"] for result in results]
+    file_base, _ = os.path.splitext(config["file_path"])
+    output_ext = os.path.splitext(part_paths[0])[1] if part_paths else ".csv"
+    output_path = f"{file_base}{output_ext}"
+    row_count = merge_video_outputs(part_paths, output_path, output_format)
+    print(f"已合并 {len(part_paths)} 个工作进程的结果: {output_path} ({row_count} 条)")
+
+    return {
+        "video_count": sum(result["video_count"] for result in results),
+        "output_file": output_path,
+        "comment_files": sum(result["comment_files"] for result in results),
+        "budget_exhausted": any(result["budget_exhausted"] for result in results),
+        "error": next((result["error"] for result in results if result.get("error")), None),
+    }
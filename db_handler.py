@@ -1,8 +1,50 @@
 import pymysql
+import logging
 from pymysql.err import Error
 from tqdm import tqdm
+from functools import lru_cache
+import pandas as pd
 import time
 import re
+from video_stats import snapshots_to_frame
+
+logger = logging.getLogger(__name__)
+
+
+# 支持的日期字符串格式
+DATETIME_FORMATS = [
+    '%Y-%m-%d %H:%M:%S',  # 标准格式
+    '%Y-%m-%d',          # 仅日期
+    '%Y/%m/%d %H:%M:%S',  # 斜杠分隔
+    '%Y/%m/%d',          # 仅日期，斜杠分隔
+]
+
+# UP主资料字段（用于补齐旧版本创建的表）
+OWNER_PROFILE_COLUMNS = [
+    ("sign", "VARCHAR(255)"),
+    ("level", "TINYINT UNSIGNED"),
+    ("follower_count", "INT UNSIGNED"),
+    ("following_count", "INT UNSIGNED"),
+    ("video_count", "INT UNSIGNED"),
+    ("profile_fetched_at", "DATETIME"),
+]
+
+# 最近一次匹配成功的格式，同一批数据通常格式相同，优先尝试
+_last_datetime_format = [DATETIME_FORMATS[0]]
+
+
+@lru_cache(maxsize=65536)
+def _parse_absolute_datetime(date_str):
+    """解析绝对日期字符串，结果按输入缓存；无法解析时返回None"""
+    last_format = _last_datetime_format[0]
+    for fmt in [last_format] + [f for f in DATETIME_FORMATS if f != last_format]:
+        try:
+            parsed = time.strftime('%Y-%m-%d %H:%M:%S', time.strptime(date_str, fmt))
+        except ValueError:
+            continue
+        _last_datetime_format[0] = fmt
+        return parsed
+    return None
 
 
 class DatabaseHandler:
@@ -37,13 +79,13 @@ class DatabaseHandler:
             try:
                 self.cursor = self.connection.cursor()
                 self.cursor.execute("SELECT VERSION()")
-                print(f"已成功连接到MySQL数据库: {self.db_config['database']}")
+                logger.info("已成功连接到MySQL数据库: %s", self.db_config['database'])
                 return True
             except:
-                print("无法连接到MySQL数据库")
+                logger.error("无法连接到MySQL数据库")
                 return False
         except Error as e:
-            print(f"连接MySQL数据库时发生错误: {e}")
+            logger.error("连接MySQL数据库时发生错误: %s", e)
             return False
             
     def close(self):
@@ -54,9 +96,9 @@ class DatabaseHandler:
                 if self.cursor:
                     self.cursor.close()
                 self.connection.close()
-                print("MySQL数据库连接已关闭")
+                logger.info("MySQL数据库连接已关闭")
             except Exception as e:
-                print(f"关闭数据库连接时出错: {e}")
+                logger.error("关闭数据库连接时出错: %s", e)
     
     def init_database(self):
         """初始化数据库表结构"""
@@ -110,6 +152,12 @@ class DatabaseHandler:
                 mid BIGINT PRIMARY KEY,
                 name VARCHAR(100),
                 face_url VARCHAR(255),
+                sign VARCHAR(255),
+                level TINYINT UNSIGNED,
+                follower_count INT UNSIGNED,
+                following_count INT UNSIGNED,
+                video_count INT UNSIGNED,
+                profile_fetched_at DATETIME,
                 created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
                 updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
                 INDEX idx_name (name)
@@ -141,17 +189,41 @@ class DatabaseHandler:
             ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
             """
             
+            # 创建视频统计快照表（只追加，保留历史轨迹）
+            stats_table = f"""
+            CREATE TABLE IF NOT EXISTS {self._stats_table()} (
+                bvid VARCHAR(20) NOT NULL,
+                fetched_at DATETIME NOT NULL,
+                aid BIGINT UNSIGNED,
+                owner_mid BIGINT UNSIGNED,
+                view_count INT UNSIGNED,
+                danmaku_count INT UNSIGNED,
+                reply_count INT UNSIGNED,
+                favorite_count INT UNSIGNED,
+                coin_count INT UNSIGNED,
+                share_count INT UNSIGNED,
+                like_count INT UNSIGNED,
+                PRIMARY KEY (bvid, fetched_at),
+                INDEX idx_owner_fetched (owner_mid, fetched_at),
+                INDEX idx_fetched_at (fetched_at)
+            ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
+            """
+            
             # 执行创建表操作
             self.cursor.execute(video_table)
             self.cursor.execute(owner_table)
             self.cursor.execute(comment_table)
+            self.cursor.execute(stats_table)
+            
+            # 旧版本创建的UP主表缺少资料字段，补齐
+            self._ensure_columns(self.db_tables['owners'], OWNER_PROFILE_COLUMNS)
             self.connection.commit()
             
-            print(f"已成功创建/确认表结构: {list(self.db_tables.values())}")
+            logger.info("已成功创建/确认表结构: %s", list(self.db_tables.values()))
             return True
             
         except Error as e:
-            print(f"初始化数据库结构时发生错误: {e}")
+            logger.error("初始化数据库结构时发生错误: %s", e)
             return False
     
     def insert_videos(self, videos_data):
@@ -165,14 +237,14 @@ class DatabaseHandler:
         try:
             if not self.connection:
                 if not self.connect():
-                    print("数据库连接失败，无法插入数据")
+                    logger.error("数据库连接失败，无法插入数据")
                     return
                     
             # 测试连接
             self.cursor.execute("SELECT 1")
         except:
             if not self.connect():
-                print("数据库连接异常，无法插入数据")
+                logger.error("数据库连接异常，无法插入数据")
                 return
         
         videos_table = self.db_tables['videos']
@@ -183,7 +255,11 @@ class DatabaseHandler:
         owners_to_insert = []
         owners_seen = set()  # 用于去重UP主
         
-        for video in tqdm(videos_data, desc="处理视频数据"):
+        # 发布时间与创建时间批量解析
+        pubdates = self._parse_datetime_batch([video["video"].get("pubdate", "") for video in videos_data])
+        ctimes = self._parse_datetime_batch([video["video"].get("ctime", "") for video in videos_data])
+        
+        for position, video in enumerate(tqdm(videos_data, desc="处理视频数据")):
             video_info = video["video"]
             owner_info = video["owner"]
             
@@ -196,8 +272,8 @@ class DatabaseHandler:
                 video_info.get("tid", 0),
                 video_info.get("tname", "")[:50],
                 video_info.get("description", ""),
-                self._parse_datetime(video_info.get("pubdate", "")),
-                self._parse_datetime(video_info.get("ctime", "")),
+                pubdates[position],
+                ctimes[position],
                 video_info.get("duration", 0),
                 video_info.get("view_count", 0),
                 video_info.get("danmaku_count", 0),
@@ -266,12 +342,193 @@ class DatabaseHandler:
                 self.cursor.executemany(owner_insert_query, owners_to_insert)
             
             self.connection.commit()
-            print(f"成功导入 {len(videos_to_insert)} 条视频数据和 {len(owners_to_insert)} 条UP主数据")
+            logger.info("成功导入 %s 条视频数据和 %s 条UP主数据", len(videos_to_insert), len(owners_to_insert))
             
         except Error as e:
-            print(f"插入数据时发生错误: {e}")
+            logger.error("插入数据时发生错误: %s", e)
+            self.connection.rollback()
+    
+    def _ensure_columns(self, table, columns):
+        """为已存在的表补充缺失的列"""
+        self.cursor.execute(
+            "SELECT COLUMN_NAME FROM information_schema.COLUMNS WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s",
+            (table,)
+        )
+        existing = {row[0] for row in self.cursor.fetchall()}
+        for column, definition in columns:
+            if column not in existing:
+                self.cursor.execute(f"ALTER TABLE {table} ADD COLUMN {column} {definition}")
+                logger.info("已为表 %s 添加字段: %s", table, column)
+    
+    def upsert_owner_profiles(self, profiles):
+        """
+        批量写入UP主资料
+        
+        Args:
+            profiles: OwnerProfileFetcher.fetch_profiles 返回的资料字典列表
+        """
+        # 连接检查
+        try:
+            if not self.connection:
+                if not self.connect():
+                    return
+                
+            # 测试连接
+            self.cursor.execute("SELECT 1")
+        except:
+            if not self.connect():
+                return
+        
+        owners_to_upsert = [
+            (
+                profile["mid"],
+                (profile.get("name") or "")[:100],
+                (profile.get("face_url") or "")[:255],
+                (profile.get("sign") or "")[:255],
+                profile.get("level", 0),
+                profile.get("follower_count", 0),
+                profile.get("following_count", 0),
+                profile.get("video_count", 0),
+                time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(profile.get("fetched_at") or time.time()))
+            )
+            for profile in profiles
+        ]
+        
+        try:
+            if owners_to_upsert:
+                owner_upsert_query = f"""
+                INSERT INTO {self.db_tables['owners']} 
+                (mid, name, face_url, sign, level, follower_count, following_count,
+                 video_count, profile_fetched_at)
+                VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s)
+                ON DUPLICATE KEY UPDATE 
+                    name = VALUES(name),
+                    face_url = VALUES(face_url),
+                    sign = VALUES(sign),
+                    level = VALUES(level),
+                    follower_count = VALUES(follower_count),
+                    following_count = VALUES(following_count),
+                    video_count = VALUES(video_count),
+                    profile_fetched_at = VALUES(profile_fetched_at),
+                    updated_at = CURRENT_TIMESTAMP
+                """
+                
+                batch_size = 500
+                for i in range(0, len(owners_to_upsert), batch_size):
+                    self.cursor.executemany(owner_upsert_query, owners_to_upsert[i:i+batch_size])
+                self.connection.commit()
+                
+                logger.info("成功更新 %s 条UP主资料", len(owners_to_upsert))
+                
+        except Error as e:
+            logger.error("更新UP主资料时发生错误: %s", e)
             self.connection.rollback()
     
+    def insert_video_stats(self, snapshots):
+        """
+        追加视频统计快照
+        
+        Args:
+            snapshots: video_stats.build_stat_snapshots 返回的快照列表
+        """
+        # 连接检查
+        try:
+            if not self.connection:
+                if not self.connect():
+                    return
+                
+            # 测试连接
+            self.cursor.execute("SELECT 1")
+        except:
+            if not self.connect():
+                return
+        
+        stats_to_insert = [
+            (
+                snapshot["bvid"],
+                snapshot["fetched_at"].strftime('%Y-%m-%d %H:%M:%S'),
+                snapshot["aid"],
+                snapshot["owner_mid"],
+                snapshot["view_count"],
+                snapshot["danmaku_count"],
+                snapshot["reply_count"],
+                snapshot["favorite_count"],
+                snapshot["coin_count"],
+                snapshot["share_count"],
+                snapshot["like_count"]
+            )
+            for snapshot in snapshots
+        ]
+        
+        try:
+            if stats_to_insert:
+                # 快照只追加不覆盖，同一时刻的重复快照直接忽略
+                stats_insert_query = f"""
+                INSERT IGNORE INTO {self._stats_table()} 
+                (bvid, fetched_at, aid, owner_mid, view_count, danmaku_count, reply_count,
+                 favorite_count, coin_count, share_count, like_count)
+                VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
+                """
+                
+                batch_size = 500
+                for i in range(0, len(stats_to_insert), batch_size):
+                    self.cursor.executemany(stats_insert_query, stats_to_insert[i:i+batch_size])
+                self.connection.commit()
+                
+                logger.info("成功追加 %s 条视频统计快照", len(stats_to_insert))
+                
+        except Error as e:
+            logger.error("插入视频统计快照时发生错误: %s", e)
+            self.connection.rollback()
+    
+    def fetch_video_stats(self, since=None, bvids=None, owner_mids=None):
+        """
+        查询视频统计快照
+        
+        Args:
+            since: 仅返回该时间(datetime)之后的快照
+            bvids: 仅返回这些视频的快照
+            owner_mids: 仅返回这些UP主的快照
+            
+        Returns:
+            快照DataFrame（列与类型同 video_stats.load_stats_parquet），可直接传入 video_stats.compute_growth；
+            查询失败时返回空DataFrame
+        """
+        conditions = []
+        params = []
+        if since is not None:
+            conditions.append("fetched_at >= %s")
+            params.append(since.strftime('%Y-%m-%d %H:%M:%S'))
+        if bvids:
+            conditions.append(f"bvid IN ({', '.join(['%s'] * len(bvids))})")
+            params.extend(bvids)
+        if owner_mids:
+            conditions.append(f"owner_mid IN ({', '.join(['%s'] * len(owner_mids))})")
+            params.extend(owner_mids)
+        
+        where_clause = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+        query = f"""
+        SELECT bvid, fetched_at, aid, owner_mid, view_count, danmaku_count, reply_count,
+               favorite_count, coin_count, share_count, like_count
+        FROM {self._stats_table()}
+        {where_clause}
+        ORDER BY bvid, fetched_at
+        """
+        
+        try:
+            self.cursor.execute(query, params)
+            columns = [desc[0] for desc in self.cursor.description]
+            rows = pd.DataFrame(list(self.cursor.fetchall()), columns=columns)
+            # 可为空的数值列按0处理，与本地快照的紧凑类型一致
+            return snapshots_to_frame(rows.fillna(0))
+        except Error as e:
+            logger.error("查询视频统计快照时发生错误: %s", e)
+            return snapshots_to_frame([])
+    
+    def _stats_table(self):
+        """视频统计快照表名（兼容未配置该表名的旧配置）"""
+        return self.db_tables.get('video_stats', 'bili_video_stats')
+    
     def insert_comments(self, comments_data, bvid, aid):
         """
         插入评论数据到数据库
@@ -322,7 +579,7 @@ class DatabaseHandler:
                         content, comment_time, reply_count, like_count, ip_location, is_vip
                     ))
                 except (ValueError, TypeError) as e:
-                    print(f"处理评论数据时出错: {e}, 数据: {comment}")
+                    logger.warning("处理评论数据时出错: %s, 数据: %s", e, comment)
                     continue
         
         try:
@@ -353,10 +610,10 @@ class DatabaseHandler:
                     self.cursor.executemany(comment_insert_query, batch)
                     self.connection.commit()
                     
-                print(f"成功导入 {len(comments_to_insert)} 条评论数据，视频BV号: {bvid}")
+                logger.info("成功导入 %s 条评论数据，视频BV号: %s", len(comments_to_insert), bvid)
                 
         except Error as e:
-            print(f"插入评论数据时发生错误: {e}")
+            logger.error("插入评论数据时发生错误: %s", e)
             self.connection.rollback()
     
     def _parse_datetime(self, date_str):
@@ -368,19 +625,10 @@ class DatabaseHandler:
         if hasattr(date_str, 'strftime'):
             return date_str.strftime('%Y-%m-%d %H:%M:%S')
             
-        # 尝试解析不同格式的日期字符串
-        formats = [
-            '%Y-%m-%d %H:%M:%S',  # 标准格式
-            '%Y-%m-%d',          # 仅日期
-            '%Y/%m/%d %H:%M:%S',  # 斜杠分隔
-            '%Y/%m/%d',          # 仅日期，斜杠分隔
-        ]
-        
-        for fmt in formats:
-            try:
-                return time.strftime('%Y-%m-%d %H:%M:%S', time.strptime(str(date_str), fmt))
-            except ValueError:
-                continue
+        # 尝试解析不同格式的日期字符串（结果与匹配格式均有缓存）
+        parsed = _parse_absolute_datetime(str(date_str))
+        if parsed is not None:
+            return parsed
         
         # 处理特殊格式，如"3天前"、"1小时前"等
         if isinstance(date_str, str):
@@ -408,4 +656,23 @@ class DatabaseHandler:
                 return time.strftime('%Y-%m-%d %H:%M:00', past)
         
         # 无法解析，返回NULL
-        return None
\ No newline at end of file
+        return None
+    
+    def _parse_datetime_batch(self, values):
+        """
+        批量解析日期，结果与逐个调用 _parse_datetime 一致
+        
+        标准格式的字符串一次性向量化解析，其余值回退到逐个解析。
+        """
+        series = pd.Series(values, dtype=object)
+        is_str = series.map(lambda value: isinstance(value, str) and value != '')
+        parsed = pd.to_datetime(series[is_str], format='%Y-%m-%d %H:%M:%S', errors='coerce')
+        
+        results = [None] * len(series)
+        for position, value in parsed.dt.strftime('%Y-%m-%d %H:%M:%S').items():
+            if isinstance(value, str):
+                results[position] = value
+        for position, value in enumerate(values):
+            if results[position] is None and value:
+                results[position] = self._parse_datetime(value)
+        return results
\ No newline at end of file
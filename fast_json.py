@@ -0,0 +1,204 @@
+import json
+from typing import Any, Dict, List, Optional
+
+# 可选的高性能JSON库，按 orjson > msgspec > 标准库 的顺序使用
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import msgspec
+except ImportError:
+    msgspec = None
+
+if orjson is not None:
+    BACKEND = "orjson"
+elif msgspec is not None:
+    BACKEND = "msgspec"
+else:
+    BACKEND = "json"
+
+
+def loads(data) -> Any:
+    """
+    解析JSON文本或字节串
+
+    Args:
+        data: str 或 bytes
+
+    Returns:
+        解析后的Python对象
+    """
+    if orjson is not None:
+        return orjson.loads(data)
+    if msgspec is not None:
+        return msgspec.json.decode(data)
+    return json.loads(data)
+
+
+if msgspec is not None:
+    # 以下结构只声明 _parse_video_html 与 CommentProcessor 实际用到的字段，
+    # msgspec 解码时会直接跳过其余字段，不为它们创建Python对象。
+    # 默认值与使用处 .get() 的默认值一致，保证结果与完整解析相同。
+
+    class _Stat(msgspec.Struct):
+        view: Any = 0
+        danmaku: Any = 0
+        reply: Any = 0
+        favorite: Any = 0
+        coin: Any = 0
+        share: Any = 0
+        like: Any = 0
+        dislike: Any = 0
+
+    class _Rights(msgspec.Struct):
+        download: Any = 0
+        no_reprint: Any = 0
+        autoplay: Any = 0
+
+    class _Owner(msgspec.Struct):
+        mid: Any = 0
+        name: Any = ""
+        face: Any = ""
+
+    class _Dimension(msgspec.Struct):
+        width: Any = 0
+        height: Any = 0
+
+    class _Page(msgspec.Struct):
+        cid: Any = 0
+        page: Any = 0
+        part: Any = ""
+        duration: Any = 0
+        dimension: _Dimension = msgspec.field(default_factory=_Dimension)
+        first_frame: Any = ""
+        ctime: Any = 0
+
+    class _Honor(msgspec.Struct):
+        type: Any = 0
+        desc: Any = ""
+
+    class _HonorReply(msgspec.Struct):
+        honor: List[_Honor] = []
+
+    class _VideoData(msgspec.Struct):
+        bvid: Any = ""
+        aid: Any = 0
+        title: Any = ""
+        pic: Any = ""
+        tid: Any = 0
+        tname: Any = ""
+        tid_v2: Any = 0
+        tname_v2: Any = ""
+        desc: Any = ""
+        pubdate: Any = 0
+        ctime: Any = 0
+        duration: Any = 0
+        copyright: Any = 0
+        state: Any = 0
+        mission_id: Any = 0
+        videos: Any = 0
+        dynamic: Any = ""
+        stat: _Stat = msgspec.field(default_factory=_Stat)
+        rights: _Rights = msgspec.field(default_factory=_Rights)
+        owner: _Owner = msgspec.field(default_factory=_Owner)
+        pages: List[_Page] = []
+        honor_reply: _HonorReply = msgspec.field(default_factory=_HonorReply)
+
+    class _InitialState(msgspec.Struct):
+        videoData: Optional[_VideoData] = None
+
+    class _LevelInfo(msgspec.Struct):
+        current_level: Any = 0
+
+    class _Vip(msgspec.Struct):
+        vipStatus: Any = 0
+
+    class _Member(msgspec.Struct):
+        uname: Any = ""
+        sex: Any = ""
+        avatar: Any = ""
+        sign: Any = ""
+        level_info: _LevelInfo = msgspec.field(default_factory=_LevelInfo)
+        vip: _Vip = msgspec.field(default_factory=_Vip)
+
+    class _Content(msgspec.Struct):
+        message: Any = ""
+
+    class _ReplyControl(msgspec.Struct):
+        location: Any = ""
+        sub_reply_entry_text: Any = ""
+
+    class _Reply(msgspec.Struct):
+        rpid: Any = ""
+        parent: Any = ""
+        mid: Any = ""
+        ctime: Any = 0
+        like: Any = 0
+        rcount: Any = None
+        member: _Member = msgspec.field(default_factory=_Member)
+        content: _Content = msgspec.field(default_factory=_Content)
+        reply_control: _ReplyControl = msgspec.field(default_factory=_ReplyControl)
+
+    class _Cursor(msgspec.Struct):
+        next: Any = ""
+        is_end: Any = False
+
+    class _ReplyData(msgspec.Struct):
+        replies: Optional[List[_Reply]] = None
+        cursor: _Cursor = msgspec.field(default_factory=_Cursor)
+
+    class _ReplyPage(msgspec.Struct):
+        code: Any = 0
+        message: Any = ""
+        data: Optional[_ReplyData] = None
+
+    _initial_state_decoder = msgspec.json.Decoder(_InitialState)
+    _reply_page_decoder = msgspec.json.Decoder(_ReplyPage)
+
+
+def decode_video_data(blob) -> Optional[Dict[str, Any]]:
+    """
+    从 __INITIAL_STATE__ JSON 中取出 videoData
+
+    安装了 msgspec 时只解码用到的字段，否则完整解析后取 videoData。
+
+    Args:
+        blob: __INITIAL_STATE__ 的JSON文本
+
+    Returns:
+        videoData 字典，不存在时返回None
+    """
+    if msgspec is not None:
+        try:
+            state = _initial_state_decoder.decode(blob)
+            if state.videoData is None:
+                return None
+            return msgspec.to_builtins(state.videoData)
+        except msgspec.ValidationError:
+            # 字段类型与预期不符时回退到完整解析
+            pass
+
+    data = loads(blob)
+    return data.get('videoData') if isinstance(data, dict) else None
+
+
+def decode_reply_page(raw) -> Dict[str, Any]:
+    """
+    解析评论接口(主评论/二级评论)的响应
+
+    安装了 msgspec 时只解码 CommentProcessor 与分页逻辑用到的字段。
+
+    Args:
+        raw: 响应体 bytes 或 str
+
+    Returns:
+        与完整解析结构相同的字典（仅包含用到的字段）
+    """
+    if msgspec is not None:
+        try:
+            return msgspec.to_builtins(_reply_page_decoder.decode(raw))
+        except msgspec.ValidationError:
+            pass
+    return loads(raw)
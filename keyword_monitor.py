@@ -0,0 +1,178 @@
+import asyncio
+import logging
+import os
+import time
+from datetime import datetime
+from typing import Dict, List, Optional
+
+from config import config
+from bilibili_api import BilibiliAPI
+from crawl_scheduler import rate_limiter
+from crawl_state import JsonStateStore
+from crawl_utils import iter_keywords, filter_search_results, setup_logging
+
+try:
+    from db_handler import DatabaseHandler
+except ImportError:
+    DatabaseHandler = None
+
+logger = logging.getLogger(__name__)
+
+
+class KeywordMonitor:
+    """
+    关键词监控索引
+
+    每个关键词记录最近处理过的BV号（按发布时间从新到旧，最多 index_size 个）。
+    轮询时按发布时间排序搜索，遇到索引中的BV号即停止翻页，因此每轮只需请求少量页面。
+    新视频在处理完成后才写入索引，处理失败时下一轮会重新发现。
+    """
+
+    def __init__(self, api, index_path=None, index_size=200, max_pages=5):
+        """
+        Args:
+            api: BilibiliAPI 实例
+            index_path: 索引文件路径，None表示只保存在内存中
+            index_size: 每个关键词保留的BV号数量
+            max_pages: 每轮每个关键词最多请求的页数
+        """
+        self.api = api
+        self.index = JsonStateStore(index_path)
+        self.index_size = index_size
+        self.max_pages = max_pages
+
+    async def poll(self, keyword) -> List[Dict]:
+        """
+        查找关键词的新视频
+
+        Returns:
+            上次处理之后发布的视频（按发布时间从新到旧，未过滤黑名单）
+        """
+        known = self.index.get(keyword) or []
+        videos = await self.api.search_new_videos(keyword, known, self.max_pages)
+        if not known:
+            logger.info("关键词 '%s' 首次监控，建立索引（%d 个视频）", keyword, len(videos))
+        return videos
+
+    def remember(self, keyword, videos):
+        """将已处理的新视频写入关键词索引（包括被黑名单过滤的视频，避免下次再次翻到它们）"""
+        if not videos:
+            return
+        known = self.index.get(keyword) or []
+        bvids = [video["video"]["bvid"] for video in videos]
+        new_bvids = set(bvids)
+        self.index.set(keyword, (bvids + [bvid for bvid in known if bvid not in new_bvids])[:self.index_size])
+
+    def save(self):
+        self.index.save()
+
+
+def keyword_interval(keyword) -> float:
+    """关键词的监控间隔(秒)：monitor_keyword_intervals 中的设置优先，否则使用 monitor_interval_minutes"""
+    minutes = config.get("monitor_keyword_intervals", {}).get(keyword, config.get("monitor_interval_minutes", 30))
+    return minutes * 60
+
+
+def _cycle_file_path(file_path) -> str:
+    """每轮的输出文件: name.csv -> name_20240101_120000.csv"""
+    base, ext = os.path.splitext(file_path)
+    return f"{base}_{datetime.now():%Y%m%d_%H%M%S}{ext}"
+
+
+async def run_monitor(main_func, main_kwargs, cycles=None) -> Optional[Dict]:
+    """
+    持续监控关键词（--monitor）
+
+    每个关键词按各自的间隔轮询；到期的关键词各请求少量按发布时间排序的搜索页，
+    汇总后的新视频交给 main 获取详情/评论并输出（每轮一个带时间后缀的输出文件）。
+    HTTP会话、缓存和数据库连接在各轮之间复用。
+
+    Args:
+        main_func: main 协程函数
+        main_kwargs: 传给 main 的参数（详情、评论、输出格式等）
+        cycles: 轮询轮数，None表示一直运行
+
+    Returns:
+        最后一轮的处理结果，没有新视频时为None
+    """
+    setup_logging(config)
+    rate_limiter.configure(config.get("request_interval"))
+    api = BilibiliAPI(
+        detail_backend=config.get("detail_backend", "html"),
+        stream_pages=config.get("stream_video_pages", True),
+        search_state_path=config.get("search_state_path"),
+        search_state_ttl=config.get("search_state_ttl"),
+        negative_cache_path=config.get("negative_cache_path"),
+        negative_cache_ttl=config.get("negative_cache_ttl", 3 * 86400)
+    )
+    monitor = KeywordMonitor(
+        api,
+        index_path=config.get("monitor_index_path"),
+        index_size=config.get("monitor_index_size", 200),
+        max_pages=config.get("monitor_max_page", 5)
+    )
+    db_handler = None
+    if main_kwargs.get("use_database") and DatabaseHandler and config.get("db_config"):
+        db_handler = DatabaseHandler(config)
+        if not db_handler.connect() or not db_handler.init_database():
+            logger.error("数据库初始化失败，每轮将各自尝试连接")
+            db_handler = None
+
+    keywords = list(iter_keywords(config["keywords"], config["is_union"]))
+    next_due = dict.fromkeys(keywords, 0.0)
+    base_file_path = config["file_path"]
+    result = None
+    cycle = 0
+    print(f"开始监控 {len(keywords)} 个关键词")
+    try:
+        while keywords and (cycles is None or cycle < cycles):
+            now = time.monotonic()
+            due = [keyword for keyword in keywords if next_due[keyword] <= now]
+            if not due:
+                await asyncio.sleep(min(next_due.values()) - now)
+                continue
+            cycle += 1
+
+            found = {}
+            new_videos = {}
+            for keyword in due:
+                requests_before = api.request_count
+                next_due[keyword] = time.monotonic() + keyword_interval(keyword)
+                try:
+                    videos = await monitor.poll(keyword)
+                except Exception as e:
+                    # 本轮不更新该关键词的索引，下一轮从上次的位置重新搜索
+                    logger.exception("监控关键词 '%s' 失败: %s", keyword, e)
+                    continue
+                found[keyword] = videos
+                for video in filter_search_results(list(videos), config["keywords_blacklist"]):
+                    new_videos.setdefault(video["video"]["bvid"], video)
+                logger.info("关键词 '%s': %d 个新视频（%d 次请求）",
+                            keyword, len(videos), api.request_count - requests_before)
+
+            print(f"\n第 {cycle} 轮: {len(due)} 个关键词，发现 {len(new_videos)} 个新视频")
+            if new_videos:
+                config["file_path"] = _cycle_file_path(base_file_path)
+                try:
+                    result = await main_func(**main_kwargs, api=api, db_handler=db_handler,
+                                             videos=list(new_videos.values()))
+                except Exception as e:
+                    # 不写入索引，下一轮会重新发现这些视频
+                    logger.exception("第 %d 轮处理失败: %s", cycle, e)
+                    continue
+                finally:
+                    config["file_path"] = base_file_path
+                if result.get("error"):
+                    # 输出文件已保存但数据库写入失败，不写入索引，下一轮重新处理
+                    logger.error("第 %d 轮处理未完成: %s", cycle, result["error"])
+                    continue
+            for keyword, videos in found.items():
+                monitor.remember(keyword, videos)
+            monitor.save()
+    finally:
+        monitor.save()
+        api.negative_cache.save()
+        await api.close()
+        if db_handler is not None:
+            db_handler.close()
+    return result
@@ -1,24 +1,40 @@
 import asyncio
+import logging
+import time
 import pandas as pd
 from config import config
-from bilibili_api import BilibiliAPI
+from bilibili_api import BilibiliAPI, search_min_slice_seconds
 import re
 import os
 from bil_comment_crawl import start_async as crawl_comments
-import csv
 import random
 from tqdm import tqdm
-import traceback
 import argparse
 from typing import List, Dict, Any
 from datetime import datetime, timedelta
-from mysql_export import save_videos_to_mysql, save_comments_to_mysql
+from mysql_export import (
+    save_videos_to_mysql, save_comments_to_mysql,
+    save_video_stats_to_mysql, save_owner_profiles_to_mysql
+)
+from owner_profile import OwnerProfileCache, OwnerProfileFetcher, apply_owner_profiles
+from comment_planner import plan_comment_crawl, summarize_plan
+from crawl_scheduler import CrawlBudget, PRIORITY_FUNCTIONS, prioritize, rate_limiter
+from crawl_workers import run_workers
+from queue_crawler import run_queue
+from crawl_daemon import run_daemon
+from keyword_monitor import run_monitor
+from crawl_planner import estimate_crawl, format_plan, resolve_time_range
+from crawl_metrics import metrics, start_http_server, SnapshotWriter
+from crawl_profiler import StageProfiler
+from task_tracer import tracer
+from video_stats import build_stat_snapshots, save_stats_parquet
+from columnar_export import COLUMNAR_FORMATS, open_comment_writer
 
 
 # 引入工具函数
 from crawl_utils import (
-    mix_keywords, extract_comment_data, 
-    prepare_full_video_data, prepare_simple_video_data,
+    iter_keywords, count_keywords, extract_comment_data, save_video_output, filter_search_results,
+    prepare_full_video_frame, prepare_simple_video_frame,
     setup_logging
 )
 
@@ -29,9 +45,23 @@ except ImportError:
     print("警告：未找到db_handler模块，数据库功能将不可用。请确保已安装mysql-connector-python库并创建db_handler.py文件。")
     DatabaseHandler = None
 
+logger = logging.getLogger("bilibili_crawler")
+
 # ------------ 主流程 ------------
 async def main(max_page=20, fetch_details=True, fetch_comments=False, comments_max_page=None,
-               output_format=None, output_mode=None, use_database=None, recent_days=None):
+               output_format=None, output_mode=None, use_database=None, recent_days=None,
+               fetch_owners=None, detail_backend=None, partition=None, search_only=False,
+               max_requests=None, max_minutes=None, priority=None, profile=False, trace_path=None,
+               worker=None, api=None, db_handler=None, videos=None):
+    """
+    爬取主流程
+    
+    worker 为 crawl_workers.WorkerShard 时作为 --workers 的一个工作进程运行：
+    按（关键词, 时间段）认领搜索任务，使用共享预算，并认领搜索到的视频避免与其他进程重复。
+    api/db_handler 由常驻进程(crawl_daemon)传入时复用其会话、缓存和数据库连接，结束后不关闭。
+    videos 为已搜索到的基本信息列表时跳过搜索阶段，只处理这些视频（监控模式）。
+    返回结果统计字典；数据库保存失败时 error 字段说明原因（输出文件仍已保存）。
+    """
     # 使用参数覆盖配置
     if output_format is not None:
         config["output_format"] = output_format
@@ -39,266 +69,480 @@ async def main(max_page=20, fetch_details=True, fetch_comments=False, comments_m
         config["output_mode"] = output_mode
     if use_database is not None:
         config["use_database"] = use_database
+    if detail_backend is not None:
+        config["detail_backend"] = detail_backend
+    if partition is not None:
+        config["search_partition"] = partition
+    if fetch_owners is None:
+        fetch_owners = config.get("fetch_owner_profiles", False)
+    if search_only:
+        # 仅使用搜索结果，跳过视频详情阶段
+        fetch_details = False
+    if max_requests is not None:
+        config["crawl_max_requests"] = max_requests
+    if max_minutes is not None:
+        config["crawl_max_minutes"] = max_minutes
+    if priority is not None:
+        config["crawl_priority"] = priority
     
-    # 处理时间范围参数
-    if recent_days is not None:
-        # 如果指定了最近天数，则覆盖time_begin和time_end
-        now = datetime.now()
-        time_end = now.strftime("%Y-%m-%d %H:%M:%S")
-        time_begin = (now - timedelta(days=recent_days)).strftime("%Y-%m-%d %H:%M:%S")
-        
-        # 更新配置
-        config["time_begin"] = time_begin
-        config["time_end"] = time_end
-        print(f"已设置筛选最近 {recent_days} 天的热门视频 ({time_begin} 至 {time_end})")
-    elif config.get("recent_hot_days"):
-        # 如果配置文件中有recent_hot_days，但命令行没有指定
-        recent_days = config.get("recent_hot_days")
+    setup_logging(config)
+    if worker is None:
+        # 工作进程的速率限制由 crawl_workers 配置为进程间共享
+        rate_limiter.configure(config.get("request_interval"))
+    
+    # 处理时间范围参数（与 --plan、任务队列使用相同的规则）
+    time_begin, time_end, recent_days_value = resolve_time_range(config, recent_days)
+    if recent_days_value:
+        # 按最近天数搜索时覆盖time_begin和time_end
         now = datetime.now()
         time_end = now.strftime("%Y-%m-%d %H:%M:%S")
-        time_begin = (now - timedelta(days=recent_days)).strftime("%Y-%m-%d %H:%M:%S")
+        time_begin = (now - timedelta(days=recent_days_value)).strftime("%Y-%m-%d %H:%M:%S")
         
         # 更新配置
         config["time_begin"] = time_begin
         config["time_end"] = time_end
-        print(f"已设置筛选最近 {recent_days} 天的热门视频 ({time_begin} 至 {time_end})")
+        print(f"已设置筛选最近 {recent_days_value} 天的热门视频 ({time_begin} 至 {time_end})")
+    
+    # 关键词按稳定顺序逐个生成，不展开完整的组合列表；
+    # 多进程时每个进程遍历全部关键词，按（关键词, 时间段）认领搜索任务
+    if videos is not None:
+        keywords_combined, keyword_total = [], 0
+    else:
+        keywords_combined = iter_keywords(config["keywords"], config["is_union"])
+        keyword_total = count_keywords(config["keywords"], config["is_union"])
+    slice_options = {
+        "slice_filter": worker.claim_slice,
+        "root_splits": worker.shard_count,
+    } if worker else {}
+    
+    # 全局预算（请求数/运行时长）与处理优先级
+    max_minutes_value = config.get("crawl_max_minutes")
+    budget = worker.budget if worker else CrawlBudget(
+        max_requests=config.get("crawl_max_requests"),
+        max_seconds=max_minutes_value * 60 if max_minutes_value else None
+    )
+    crawl_priority = config.get("crawl_priority", "search")
+    budget_stopped = False
+    
+    # 按阶段的CPU/内存分析（--profile），结果保存在输出文件旁
+    profile_dir = config.get("profile_dir") or f"{os.path.splitext(config['file_path'])[0]}_profile_{datetime.now():%Y%m%d_%H%M%S}"
+    profiler = StageProfiler(profile_dir, enabled=profile)
     
-    api = BilibiliAPI()
-    keywords_combined = mix_keywords(config["keywords"], config["is_union"])
-    print(f"关键词数量: {len(keywords_combined)}, 每关键词页数: {config['page']}")
+    # 异步任务时间线（Chrome trace-event JSON，可在 Perfetto 中查看）
+    trace_path = trace_path or config.get("trace_path")
+    if trace_path:
+        tracer.enable()
+    
+    # 运行指标：Prometheus接口与定期JSON快照（可选）
+    metrics_server = None
+    snapshot_writer = None
+    if config.get("metrics_port"):
+        metrics_server = start_http_server(metrics, config["metrics_port"])
+        print(f"指标接口: http://127.0.0.1:{config['metrics_port']}/metrics")
+    if config.get("metrics_snapshot_path"):
+        snapshot_writer = SnapshotWriter(
+            metrics, config["metrics_snapshot_path"], config.get("metrics_snapshot_interval", 30)
+        ).start()
+    
+    owns_api = api is None
+    if owns_api:
+        api = BilibiliAPI(
+            detail_backend=config.get("detail_backend", "html"),
+            stream_pages=config.get("stream_video_pages", True),
+            search_state_path=config.get("search_state_path"),
+            search_state_ttl=config.get("search_state_ttl"),
+            negative_cache_path=config.get("negative_cache_path"),
+            negative_cache_ttl=config.get("negative_cache_ttl", 3 * 86400)
+        )
+    else:
+        # 复用的实例按本次的配置获取详情
+        api.detail_backend = config.get("detail_backend", api.detail_backend)
+    try:
+        print(f"关键词数量: {keyword_total}, 每关键词页数: {config['page']}")
     
-    # 第一步：获取视频基本信息
-    print("\n=== 第一阶段：获取视频基本信息 ===")
-    all_videos = []
-    actual_pages = min(config.get('page', 1), max_page)
-    recent_days_value = recent_days if recent_days is not None else config.get("recent_days")
+        # 第一步：获取视频基本信息
+        print("\n=== 第一阶段：获取视频基本信息 ===")
+        all_videos = list(videos) if videos is not None else []
+        actual_pages = min(config.get('page', 1), max_page)
+        search_partition = config.get("search_partition", "daily")
+        min_slice_seconds = search_min_slice_seconds(config.get("search_min_slice_hours", 1))
     
-    keyword_pbar = tqdm(keywords_combined, desc="关键词进度", position=0)
-    for idx, keyword in enumerate(keyword_pbar):
-        keyword_pbar.set_description(f"处理关键词 [{idx+1}/{len(keywords_combined)}]: {keyword}")
-        pages_list = list(range(1, actual_pages + 1))
+        stage_started = time.perf_counter()
+        profiler.start("search")
+        keyword_pbar = tqdm(keywords_combined, total=keyword_total, desc="关键词进度", position=0)
+        for idx, keyword in enumerate(keyword_pbar):
+            if budget.exhausted:
+                print(f"\n预算已用完，停止搜索剩余 {keyword_total - idx} 个关键词 ({budget.describe()})")
+                budget_stopped = True
+                break
+            keyword_pbar.set_description(f"处理关键词 [{idx+1}/{keyword_total}]: {keyword}")
+            pages_list = list(range(1, actual_pages + 1))
         
-        try:
-            # 传递近期日期参数给API
-            if recent_days_value:
-                print(f"按最近 {recent_days_value} 天逐日搜索: {keyword}")
-                videos_for_keyword = await api.search_videos(
-                    keyword=keyword,
-                    pages=range(1, actual_pages + 1),
-                    recent_days=recent_days_value
-                )
-            else:
-                # 原有的时间范围搜索
-                videos_for_keyword = await api.search_videos(
-                    keyword=keyword,
-                    time_begin=config.get("time_begin", None),
-                    time_end=config.get("time_end", None),
-                    pages=range(1, actual_pages + 1)
-                )
-            
-            # 数据清洗和黑名单过滤
-            filtered = []
-            for video in videos_for_keyword:
-                title = video["video"]["title"]
-                title = re.sub(r"<.*?>", "", title)
-                video["video"]["title"] = title
-                
-                # 黑名单过滤
-                if not any(black in title for black in config["keywords_blacklist"]):
-                    filtered.append(video)
+            try:
+                # 传递近期日期参数给API；搜索页逐页计入预算，用完时在时间段或页面之间停止
+                if recent_days_value:
+                    print(f"按最近 {recent_days_value} 天搜索({search_partition}): {keyword}")
+                    videos_for_keyword = await api.search_videos(
+                        keyword=keyword,
+                        pages=range(1, actual_pages + 1),
+                        recent_days=recent_days_value,
+                        partition=search_partition,
+                        min_slice_seconds=min_slice_seconds,
+                        order=config.get("search_order", "click"),
+                        budget=budget,
+                        **slice_options
+                    )
+                else:
+                    # 原有的时间范围搜索
+                    videos_for_keyword = await api.search_videos(
+                        keyword=keyword,
+                        time_begin=time_begin,
+                        time_end=time_end,
+                        pages=range(1, actual_pages + 1),
+                        partition=search_partition,
+                        min_slice_seconds=min_slice_seconds,
+                        order=config.get("search_order", "click"),
+                        budget=budget,
+                        **slice_options
+                    )
             
-            all_videos.extend(filtered)
+                # 数据清洗和黑名单过滤
+                all_videos.extend(filter_search_results(videos_for_keyword, config["keywords_blacklist"]))
             
-        except Exception as e:
-            print(f"关键词 '{keyword}' 处理失败: {str(e)}")
-            traceback.print_exc()
+            except Exception as e:
+                logger.exception("关键词 '%s' 处理失败: %s", keyword, e)
+        if budget.exhausted:
+            # 预算在关键词的时间段或页面之间用完，已搜索到的视频继续处理
+            budget_stopped = True
+    
+        metrics.observe("stage_seconds", time.perf_counter() - stage_started, stage="search")
+        profiler.stop("search")
     
-    # 去重（基于BV号）
-    unique_videos = {}
-    for video in all_videos:
-        bvid = video["video"]["bvid"]
-        if bvid not in unique_videos:
-            unique_videos[bvid] = video
+        # 去重（基于BV号）
+        unique_videos = {}
+        for video in all_videos:
+            bvid = video["video"]["bvid"]
+            if bvid not in unique_videos:
+                unique_videos[bvid] = video
     
-    basic_results = list(unique_videos.values())
-    print(f"基本信息获取完成，去重后共 {len(basic_results)} 个视频")
+        basic_results = list(unique_videos.values())
+        if worker:
+            basic_results = worker.claim(basic_results)
+        basic_results = prioritize(basic_results, crawl_priority)
+        print(f"基本信息获取完成，去重后共 {len(basic_results)} 个视频")
+        if crawl_priority != "search":
+            print(f"按优先级 {crawl_priority} 排序后处理")
+        if search_only:
+            api.complete_search_results(basic_results)
+            print("仅搜索模式：使用搜索结果中的数据，不获取视频详情")
     
-    # 第二步：获取视频详细信息（可选）
-    detailed_results = []
-    if fetch_details and basic_results:
-        print("\n=== 第二阶段：获取视频详细信息 ===")
+        # 第二步：获取视频详细信息（可选）
+        detailed_results = []
+        if fetch_details and basic_results:
+            print("\n=== 第二阶段：获取视频详细信息 ===")
+            stage_started = time.perf_counter()
+            profiler.start("detail")
         
-        # 分批处理
-        batch_size = 20
-        total_batches = (len(basic_results) + batch_size - 1) // batch_size
+            # 分批处理
+            batch_size = 20
+            total_batches = (len(basic_results) + batch_size - 1) // batch_size
         
-        # 单层进度条显示批次处理进度
-        batch_pbar = tqdm(total=total_batches, desc="详细信息批次处理", position=0)
+            # 单层进度条显示批次处理进度
+            batch_pbar = tqdm(total=total_batches, desc="详细信息批次处理", position=0)
         
-        processed_videos = []
-        for i in range(total_batches):
-            start_idx = i * batch_size
-            end_idx = min((i + 1) * batch_size, len(basic_results))
-            batch = basic_results[start_idx:end_idx]
+            processed_videos = []
+            for i in range(total_batches):
+                start_idx = i * batch_size
+                # 批次大小不超过剩余请求数
+                end_idx = start_idx + budget.cap(min(batch_size, len(basic_results) - start_idx))
+                if budget.exhausted or end_idx <= start_idx:
+                    break
+                batch = basic_results[start_idx:end_idx]
+                requests_before = api.request_count
+                metrics.set_gauge("queue_depth", len(basic_results) - start_idx, stage="detail")
             
-            batch_pbar.set_description(f"批次 {i+1}/{total_batches} ({start_idx+1}-{end_idx}/{len(basic_results)})")
+                batch_pbar.set_description(f"批次 {i+1}/{total_batches} ({start_idx+1}-{end_idx}/{len(basic_results)})")
             
-            # 获取这一批次的视频详情
-            batch_results = await api.get_videos_detail(batch, show_progress=False)  # 在API中禁用进度条
-            processed_videos.extend(batch_results)
+                # 获取这一批次的视频详情
+                with tracer.span("detail batch", "batch", size=len(batch)):
+                    batch_results = await api.get_videos_detail(batch, show_progress=False)  # 在API中禁用进度条
+                processed_videos.extend(batch_results)
+                budget.spend(api.request_count - requests_before)
             
-            # 更新进度条
-            batch_pbar.update(1)
+                # 更新进度条
+                batch_pbar.update(1)
             
-            # 添加批次间的延迟
-            if i < total_batches - 1:  # 不是最后一批
-                await asyncio.sleep(random.uniform(0.4, 1.2))
+                # 添加批次间的延迟
+                if i < total_batches - 1:  # 不是最后一批
+                    await tracer.sleep(random.uniform(0.4, 1.2), "detail batch delay")
         
-        batch_pbar.close()
-        detailed_results = processed_videos
-    else:
-        detailed_results = basic_results
+            batch_pbar.close()
+            metrics.set_gauge("queue_depth", 0, stage="detail")
+            metrics.observe("stage_seconds", time.perf_counter() - stage_started, stage="detail")
+            profiler.stop("detail")
+        
+            # 预算用完：剩余视频保留搜索得到的基本信息
+            if len(processed_videos) < len(basic_results):
+                print(f"\n预算已用完，{len(basic_results) - len(processed_videos)} 个视频未获取详情 ({budget.describe()})")
+                processed_videos.extend(basic_results[len(processed_videos):])
+                budget_stopped = True
+            detailed_results = processed_videos
+        
+            # 追加视频统计快照（时间序列）
+            if config.get("record_video_stats", True):
+                stat_snapshots = build_stat_snapshots(detailed_results)
+                try:
+                    save_stats_parquet(stat_snapshots, config.get("stats_dir", "./video_stats"))
+                except Exception as e:
+                    logger.error("保存视频统计快照失败: %s", e)
+        else:
+            detailed_results = basic_results
     
-    # 处理结果并保存到Excel
-    print("\n正在处理结果并保存...")
-    if config["output_mode"] == "full":
-        print("使用全字段输出模式")
-        rows = [prepare_full_video_data(video) for video in tqdm(detailed_results, desc="处理数据")]
-    else:
-        print("使用简洁输出模式")
-        rows = [prepare_simple_video_data(video) for video in tqdm(detailed_results, desc="处理数据")]
+        # 获取UP主资料（可选，按mid去重并使用缓存）
+        owner_profiles = {}
+        if fetch_owners and detailed_results:
+            print("\n=== 获取UP主资料 ===")
+            owner_cache = OwnerProfileCache(
+                config.get("owner_cache_path", "./cache/owner_profiles.json"),
+                ttl=config.get("owner_cache_ttl", 86400),
+                maxsize=config.get("owner_cache_size", 2048)
+            )
+            owner_fetcher = OwnerProfileFetcher(owner_cache)
+            with metrics.timer("stage_seconds", stage="owners"):
+                owner_profiles = await owner_fetcher.fetch_profiles(
+                    [video["owner"].get("mid", 0) for video in detailed_results]
+                )
+            apply_owner_profiles(detailed_results, owner_profiles)
     
-    # 设置输出文件名，添加时间范围信息
-    file_path = config["file_path"]
-    file_base, file_ext = os.path.splitext(file_path)
+        # 处理结果并保存到Excel
+        print("\n正在处理结果并保存...")
+        if config["output_mode"] == "full":
+            print("使用全字段输出模式")
+            df = prepare_full_video_frame(detailed_results)
+        else:
+            print("使用简洁输出模式")
+            df = prepare_simple_video_frame(detailed_results)
+        rows = df.to_dict("records")
     
-    if config["output_format"] == "xlsx":
-        output_path = f"{file_base}.xlsx" if file_ext != ".xlsx" else file_path
-        try:
-            df = pd.DataFrame(rows)
-            df.to_excel(output_path, index=False)
-            print(f"数据已保存到Excel文件: {output_path}")
-        except Exception as e:
-            print(f"保存Excel失败: {str(e)}")
-            try:
-                csv_path = f"{file_base}.csv"
-                df = pd.DataFrame(rows)
-                df.to_csv(csv_path, index=False, encoding='utf-8-sig')
-                print(f"已备选保存为CSV文件: {csv_path}")
-            except Exception as csv_e:
-                print(f"保存CSV失败: {str(csv_e)}")
-    else:
-        # 默认CSV格式
-        output_path = f"{file_base}.csv" if file_ext != ".csv" else file_path
-        try:
-            df = pd.DataFrame(rows)
-            df.to_csv(output_path, index=False, encoding='utf-8-sig')
-            print(f"数据已保存到CSV文件: {output_path}")
-        except Exception as e:
-            print(f"保存CSV失败: {str(e)}")
+        output_path = save_video_output(df, config["file_path"], config["output_format"])
+        # 数据库失败时仍返回结果（error 说明原因），输出文件已保存
+        result = {
+            "video_count": len(detailed_results),
+            "output_file": output_path,
+            "comment_files": 0,
+            "budget_exhausted": budget_stopped,
+            "error": None
+        }
 
-    if config["use_database"] and db_handler:
-        print("\n=== 将视频数据保存到MySQL数据库 ===")
-        db_handler = DatabaseHandler(config)
-        if not db_handler.connect() or not db_handler.init_database():
-            print("数据库初始化失败，无法保存视频数据")
-            return
+        if config["use_database"] and DatabaseHandler:
+            print("\n=== 将视频数据保存到MySQL数据库 ===")
+            profiler.start("db_export")
+            if db_handler is None:
+                db_check = DatabaseHandler(config)
+                if not db_check.connect() or not db_check.init_database():
+                    logger.error("数据库初始化失败，无法保存视频数据")
+                    result["error"] = "数据库初始化失败，无法保存视频数据"
+                    return result
+        
+            # 保存视频数据到数据库
+            with metrics.timer("db_flush_seconds", table="videos"):
+                save_videos_to_mysql(detailed_results, config, db_handler)
+        
+            # 保存UP主资料到数据库
+            if owner_profiles:
+                with metrics.timer("db_flush_seconds", table="owner_profiles"):
+                    save_owner_profiles_to_mysql(list(owner_profiles.values()), config, db_handler)
         
-        # 保存视频数据到数据库
-        save_videos_to_mysql(detailed_results, config)
+            # 保存视频统计快照到数据库
+            if fetch_details and config.get("record_video_stats", True):
+                with metrics.timer("db_flush_seconds", table="video_stats"):
+                    save_video_stats_to_mysql(build_stat_snapshots(detailed_results), config, db_handler)
+            profiler.stop("db_export")
     
-    # 第三步：获取视频评论（可选）
-    comment_files = []
-    if fetch_comments and len(rows) > 0:
-        print("\n=== 第三阶段：获取视频评论数据 ===")
-        comments_dir = os.path.join(os.path.dirname(output_path), "comments")
-        os.makedirs(comments_dir, exist_ok=True)
+        # 第三步：获取视频评论（可选）
+        comment_files = []
+        if fetch_comments and len(rows) > 0:
+            print("\n=== 第三阶段：获取视频评论数据 ===")
+            stage_started = time.perf_counter()
+            profiler.start("comments")
+            comments_dir = os.path.join(os.path.dirname(output_path), "comments")
+            os.makedirs(comments_dir, exist_ok=True)
         
-        # 使用单层进度条
-        comment_pbar = tqdm(total=len(rows), desc="评论爬取", position=0)
+            # 根据评论数规划：跳过无评论视频，按评论数分配页数，按预计收获（或调度优先级）排序
+            comment_budget = config.get("comments_request_budget")
+            if budget.remaining_requests() is not None:
+                comment_budget = budget.cap(comment_budget) if comment_budget is not None else budget.remaining_requests()
+            comment_tasks = plan_comment_crawl(
+                detailed_results,
+                max_page=comments_max_page or config.get("comments_max_page", 5),
+                request_budget=comment_budget,
+                skip_empty=config.get("comments_skip_empty", True),
+                keep_order=crawl_priority != "search"
+            )
+            print(summarize_plan(comment_tasks, len(detailed_results)))
         
-        for i, video in enumerate(rows):
-            # 获取视频ID - 根据输出模式获取字段
-            if config["output_mode"] == "full":
-                bvid = video["bvid"]
-                aid = video["aid"]
-                title_field = "title"
-            else:
-                bvid = video["BV号"]
-                aid = video["AV号"]
-                title_field = "标题"
+            # 使用单层进度条
+            comment_pbar = tqdm(total=len(comment_tasks), desc="评论爬取", position=0)
+        
+            for i, task in enumerate(comment_tasks):
+                if budget.exhausted:
+                    print(f"\n预算已用完，跳过剩余 {len(comment_tasks) - i} 个视频的评论 ({budget.describe()})")
+                    budget_stopped = True
+                    break
+                bvid = task["bvid"]
+                aid = task["aid"]
+                metrics.set_gauge("queue_depth", len(comment_tasks) - i, stage="comments")
             
-            title = video.get(title_field, "未知标题")[:15]  # 标题前15个字符
-            comment_pbar.set_description(f"视频 {i+1}/{len(rows)}: {title}...")
+                title = str(task["title"])[:15]  # 标题前15个字符
+                comment_pbar.set_description(f"视频 {i+1}/{len(comment_tasks)}: {title}...")
             
-            # 创建评论CSV文件
-            csv_path = os.path.join(comments_dir, f"{bvid}_comments.csv")
-            with open(csv_path, mode='w', newline='', encoding='utf-8-sig') as file:
-                csv_writer = csv.writer(file)
-                csv_writer.writerow(['序号', '上级评论ID', '评论ID', '用户ID', '用户名', '用户等级', 
-                                    '性别', '评论内容', '评论时间', '回复数', '点赞数', 
-                                    '个性签名', 'IP属地', '是否是大会员', '头像'])
-                
-                try:
-                    count = 0
-                    next_pageID = ''
-                    is_second = config.get("is_second_comments", False)
-                    cookie = None  # 使用默认cookie
+                # 创建评论文件（CSV或列式格式）
+                comment_path_base = os.path.join(comments_dir, f"{bvid}_comments")
+                with open_comment_writer(comment_path_base, config["output_format"]) as (csv_path, csv_writer):
+                    try:
+                        count = 0
+                        next_pageID = ''
+                        is_second = config.get("is_second_comments", False)
+                        cookie = None  # 使用默认cookie
                     
-                    # 爬取评论
-                    await crawl_comments(bvid, aid, next_pageID, count, csv_writer, 
-                                is_second, cookie, None, None, 
-                                max_page=comments_max_page or config.get("comments_max_page", 5), 
-                                page_counter=0)
+                        # 爬取评论
+                        with tracer.span("comments", "video", bvid=bvid, pages=task["pages"]):
+                            await crawl_comments(bvid, aid, next_pageID, count, csv_writer, 
+                                        is_second, cookie, None, None, 
+                                        max_page=task["pages"], 
+                                        page_counter=0)
                     
-                    # 保存评论文件路径
-                    comment_files.append((bvid, aid, csv_path))
+                        # 保存评论文件路径
+                        comment_files.append((bvid, aid, csv_path))
                     
-                except Exception as e:
-                    print(f"获取评论失败: {str(e)}")
-                    traceback.print_exc()
+                    except Exception as e:
+                        logger.exception("获取评论失败: %s", e)
             
-            # 更新进度条
-            comment_pbar.update(1)
+                # 主评论请求数按计划页数计入预算（实际可能更少）
+                budget.spend(task["pages"])
             
-            # 添加随机延迟
-            await asyncio.sleep(random.uniform(0.5, 1.5))
+                # 更新进度条
+                comment_pbar.update(1)
+            
+                # 添加随机延迟
+                await tracer.sleep(random.uniform(0.5, 1.5), "comment video delay")
         
-        comment_pbar.close()
+            comment_pbar.close()
+            metrics.set_gauge("queue_depth", 0, stage="comments")
+            metrics.observe("stage_seconds", time.perf_counter() - stage_started, stage="comments")
+            profiler.stop("comments")
 
-        if config["use_database"] and db_handler:
-            print("\n=== 将评论数据保存到MySQL数据库 ===")
-            if not db_handler.connect():
-                print("数据库连接失败，无法保存评论数据")
-                return
+            if config["use_database"] and DatabaseHandler:
+                print("\n=== 将评论数据保存到MySQL数据库 ===")
+                if db_handler is None and not db_check.connect():
+                    logger.error("数据库连接失败，无法保存评论数据")
+                    result.update(comment_files=len(comment_files), budget_exhausted=budget_stopped,
+                                  error="数据库连接失败，无法保存评论数据")
+                    return result
             
-            # 保存评论数据到数据库
-            save_comments_to_mysql(comment_files, config)
+                # 保存评论数据到数据库
+                profiler.start("db_export")
+                with metrics.timer("db_flush_seconds", table="comments"):
+                    save_comments_to_mysql(comment_files, config, db_handler)
+                profiler.stop("db_export")
         
-    print("\n任务完成!")
-    return {
-        "video_count": len(detailed_results),
-        "output_file": output_path,
-        "comment_files": len(comment_files)
-    }
+        if budget_stopped:
+            print(f"\n预算已用完，已保存部分结果 ({budget.describe()})")
+    
+        print("\n任务完成!")
+        result.update(comment_files=len(comment_files), budget_exhausted=budget_stopped)
+        return result
+    finally:
+        # 提前返回或出错时也关闭自建的HTTP会话、结束分析、导出时间线并关闭指标服务
+        if owns_api:
+            await api.close()
+        profiler.close()
+        if trace_path and tracer.export(trace_path):
+            print(f"任务时间线已保存到: {trace_path} ({len(tracer.events)} 个事件)")
+        print("\n" + metrics.summary())
+        if snapshot_writer:
+            snapshot_writer.stop()
+        if metrics_server:
+            metrics_server.shutdown()
+
 
 def parse_args():
     """解析命令行参数"""
     parser = argparse.ArgumentParser(description="B站视频爬虫")
     parser.add_argument("--max-page", type=int, default=None, help="最大爬取页数")
     parser.add_argument("--no-details", action="store_true", help="不获取视频详情")
+    parser.add_argument("--search-only", action="store_true",
+                        help="仅搜索模式: 直接使用搜索结果中的AV号、UP主ID、分区等字段，不访问视频页面")
     parser.add_argument("--comments", action="store_true", help="爬取评论")
     parser.add_argument("--comments-max-page", type=int, default=None, help="评论最大页数")
-    parser.add_argument("--format", choices=["csv", "xlsx"], default=None, help="输出文件格式")
+    parser.add_argument("--comments-budget", type=int, default=None, help="评论阶段主评论请求总数上限")
+    parser.add_argument("--format", choices=["csv", "xlsx"] + list(COLUMNAR_FORMATS), default=None, help="输出文件格式")
     parser.add_argument("--output-mode", choices=["simple", "full"], default=None, help="输出模式: simple或full")
     parser.add_argument("--use-db", action="store_true", help="保存到MySQL数据库")
     parser.add_argument("--no-db", action="store_false", dest="use_db", help="不保存到数据库")
+    parser.add_argument("--detail-backend", choices=["html", "json"], default=None,
+                        help="视频详情获取方式: html解析视频页面，json调用view接口(更省流量)")
+    parser.add_argument("--partition", choices=["daily", "adaptive"], default=None,
+                        help="搜索时间段划分: daily按天划分，adaptive在结果达到上限时自动二分时间段")
+    parser.add_argument("--order", choices=["click", "pubdate"], default=None,
+                        help="搜索结果排序: click按播放量，pubdate按发布时间从新到旧")
+    parser.add_argument("--owners", action="store_true", default=None, help="获取UP主资料(粉丝数、投稿数、等级)")
+    parser.add_argument("--max-requests", type=int, default=None, help="全局请求次数上限，用完后停止并保存已获取的结果")
+    parser.add_argument("--max-minutes", type=float, default=None, help="全局运行时长上限(分钟)")
+    parser.add_argument("--priority", choices=list(PRIORITY_FUNCTIONS), default=None,
+                        help="详情与评论的处理顺序: search搜索顺序，views播放量，recency发布时间，replies评论数")
+    parser.add_argument("--workers", type=int, default=None,
+                        help="工作进程数，按关键词和时间段分配并行爬取，共享请求预算并合并输出")
+    parser.add_argument("--request-interval", type=float, default=None,
+                        help="全局相邻请求的最小间隔(秒)，多进程时所有进程共享")
+    parser.add_argument("--queue", type=str, default=None,
+                        help="分布式任务队列地址(sqlite:///path、redis://host:port/db、memory://)，多个进程/机器共享任务")
+    parser.add_argument("--queue-role", choices=["seed", "work", "export", "all"], default="all",
+                        help="队列模式的角色: seed写入搜索任务，work处理任务，export导出结果，all依次执行")
+    parser.add_argument("--monitor", action="store_true",
+                        help="持续监控关键词: 按发布时间排序搜索，遇到已处理的视频即停止翻页，只处理新视频")
+    parser.add_argument("--monitor-interval", type=float, default=None, help="监控模式的轮询间隔(分钟)")
+    parser.add_argument("--monitor-cycles", type=int, default=None, help="监控模式的轮询轮数，默认一直运行")
+    parser.add_argument("--daemon", action="store_true",
+                        help="以常驻服务运行，保持会话、缓存和数据库连接，通过本地HTTP接口接收爬取作业")
+    parser.add_argument("--daemon-port", type=int, default=None, help="常驻服务的HTTP端口")
+    parser.add_argument("--daemon-socket", type=str, default=None, help="常驻服务监听的Unix socket路径(代替HTTP端口)")
+    parser.add_argument("--plan", action="store_true",
+                        help="只估算请求数、流量和耗时并打印爬取计划，不发出网络请求")
+    parser.add_argument("--profile", action="store_true",
+                        help="按阶段(search/detail/comments/db_export)记录CPU与内存分析，保存在输出文件旁")
+    parser.add_argument("--trace", type=str, default=None, dest="trace_path",
+                        help="记录异步任务时间线(请求/信号量等待/sleep/解析)并导出为Chrome trace JSON文件")
+    parser.add_argument("--metrics-port", type=int, default=None, help="在该端口提供Prometheus指标接口(/metrics)")
+    parser.add_argument("--metrics-file", type=str, default=None, help="定期写入JSON指标快照的文件路径")
+    parser.add_argument("--log-level", choices=["DEBUG", "INFO", "WARNING", "ERROR"], default=None,
+                        help="日志级别，DEBUG时输出每个请求的URL和进度")
+    parser.add_argument("--log-json", action="store_true", help="日志输出为JSON行格式")
     parser.add_argument("--keyword", type=str, default=None, help="搜索关键词，覆盖config中的设置")
     parser.add_argument("--recent-days", type=int, default=None, 
                         help="筛选最近N天的热门视频(按播放量排序)，如--recent-days 7表示最近一周")
     
     args = parser.parse_args()
     
+    if args.comments_budget is not None:
+        config["comments_request_budget"] = args.comments_budget
+    if args.metrics_port is not None:
+        config["metrics_port"] = args.metrics_port
+    if args.metrics_file is not None:
+        config["metrics_snapshot_path"] = args.metrics_file
+    if args.request_interval is not None:
+        config["request_interval"] = args.request_interval
+    if args.log_level is not None:
+        config["log_level"] = args.log_level
+    if args.log_json:
+        config["log_format"] = "json"
+    if args.queue is not None:
+        config["queue_url"] = args.queue
+    if args.order is not None:
+        config["search_order"] = args.order
+    if args.monitor_interval is not None:
+        config["monitor_interval_minutes"] = args.monitor_interval
+    
     # 如果指定了关键词，更新配置
     if args.keyword:
         config["keywords"] = [args.keyword]
@@ -323,19 +567,88 @@ if __name__ == "__main__":
     use_database = args.use_db if args.use_db is not None else config.get("use_database", False)
     recent_days = args.recent_days
     
-    # 运行主程序
-    result = asyncio.run(main(
-        max_page=max_page,
-        fetch_details=fetch_details,
-        fetch_comments=fetch_comments,
-        comments_max_page=comments_max_page,
-        output_format=output_format,
-        output_mode=output_mode,
-        use_database=use_database,
-        recent_days=recent_days
-    ))
+    if args.plan or config.get("queue_url"):
+        # 计划模式和队列模式不经过 main()，在这里应用命令行覆盖
+        for key, value in (("detail_backend", args.detail_backend), ("search_partition", args.partition),
+                           ("crawl_max_requests", args.max_requests), ("crawl_max_minutes", args.max_minutes),
+                           ("output_format", output_format), ("output_mode", output_mode)):
+            if value is not None:
+                config[key] = value
+    
+    if args.plan:
+        # 计划模式：按与正式运行相同的参数估算，不发出网络请求
+        print(format_plan(estimate_crawl(
+            config,
+            max_page=max_page,
+            fetch_details=fetch_details,
+            fetch_comments=fetch_comments,
+            comments_max_page=comments_max_page,
+            recent_days=recent_days,
+            fetch_owners=args.owners,
+            search_only=args.search_only
+        )))
+        raise SystemExit(0)
+    
+    if args.daemon:
+        # 常驻服务模式：作业通过 POST /jobs 提交，命令行的配置类参数作为默认值
+        run_daemon(
+            main,
+            host=config.get("daemon_host", "127.0.0.1"),
+            port=args.daemon_port or config.get("daemon_port", 8765),
+            socket_path=args.daemon_socket or config.get("daemon_socket")
+        )
+        raise SystemExit(0)
+    
+    if config.get("queue_url"):
+        # 分布式队列模式：搜索时间段、视频详情和评论作为任务由多个进程/机器共同处理
+        result = asyncio.run(run_queue(
+            config["queue_url"],
+            role=args.queue_role,
+            max_page=max_page,
+            fetch_details=fetch_details and not args.search_only,
+            fetch_comments=fetch_comments,
+            comments_max_page=comments_max_page,
+            recent_days=recent_days,
+            use_database=use_database
+        ))
+        if result is None:
+            raise SystemExit(0)
+    else:
+        # 运行主程序
+        main_kwargs = dict(
+            max_page=max_page,
+            fetch_details=fetch_details,
+            fetch_comments=fetch_comments,
+            comments_max_page=comments_max_page,
+            output_format=output_format,
+            output_mode=output_mode,
+            use_database=use_database,
+            recent_days=recent_days,
+            fetch_owners=args.owners,
+            detail_backend=args.detail_backend,
+            partition=args.partition,
+            search_only=args.search_only,
+            max_requests=args.max_requests,
+            max_minutes=args.max_minutes,
+            priority=args.priority,
+            profile=args.profile,
+            trace_path=args.trace_path
+        )
+        workers = args.workers if args.workers is not None else config.get("workers", 1)
+        if args.monitor:
+            # 监控模式：每轮只把新视频交给 main 处理
+            result = asyncio.run(run_monitor(main, main_kwargs, cycles=args.monitor_cycles))
+            if result is None:
+                raise SystemExit(0)
+        elif workers > 1:
+            result = run_workers(main, workers, main_kwargs)
+        else:
+            result = asyncio.run(main(**main_kwargs))
     
     print(f"\n任务统计:")
     print(f"- 获取视频数量: {result['video_count']}")
     print(f"- 输出文件: {result['output_file']}")
-    print(f"- 评论文件数: {result['comment_files']}")
\ No newline at end of file
+    print(f"- 评论文件数: {result['comment_files']}")
+    if result.get("error"):
+        print(f"- 错误: {result['error']}")
+        raise SystemExit(1)
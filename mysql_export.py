@@ -1,70 +1,140 @@
 import pandas as pd
+import logging
 import numpy as np
 from db_handler import DatabaseHandler
 from crawl_utils import extract_comment_data
 
-def save_videos_to_mysql(videos, config):
+logger = logging.getLogger(__name__)
+
+def save_videos_to_mysql(videos, config, db_handler=None):
     """
     将视频数据保存到 MySQL 数据库
     
     Args:
         videos: 视频数据列表
         config: 包含db_config配置的字典
+        db_handler: 已连接并初始化的 DatabaseHandler（常驻进程复用连接），None时新建连接并在结束后关闭
     """
     # 确保config包含有效的db_config配置
     if not config.get("db_config"):
-        print("错误: 缺少数据库配置，请在config中设置db_config")
+        logger.error("缺少数据库配置，请在config中设置db_config")
         return False
         
     # 使用整个config对象初始化数据库处理器
-    db_handler = DatabaseHandler(config)
-    if not db_handler.connect() or not db_handler.init_database():
-        print("数据库初始化失败，无法保存视频数据")
-        return False
+    owned = db_handler is None
+    if owned:
+        db_handler = DatabaseHandler(config)
+        if not db_handler.connect() or not db_handler.init_database():
+            logger.error("数据库初始化失败，无法保存视频数据")
+            return False
 
     try:
         db_handler.insert_videos(videos)
-        print(f"成功保存 {len(videos)} 条视频数据到数据库")
+        logger.info("成功保存 %s 条视频数据到数据库", len(videos))
+    except Exception as e:
+        logger.error("保存视频数据到数据库失败: %s", e)
+    finally:
+        if owned:
+            db_handler.close()
+    return True
+
+def save_owner_profiles_to_mysql(profiles, config, db_handler=None):
+    """
+    将UP主资料批量写入 MySQL 数据库
+    
+    Args:
+        profiles: UP主资料字典列表
+        config: 包含db_config配置的字典
+        db_handler: 已连接并初始化的 DatabaseHandler（常驻进程复用连接），None时新建连接并在结束后关闭
+    """
+    if not config.get("db_config"):
+        logger.error("缺少数据库配置，请在config中设置db_config")
+        return False
+    
+    owned = db_handler is None
+    if owned:
+        db_handler = DatabaseHandler(config)
+        if not db_handler.connect() or not db_handler.init_database():
+            logger.error("数据库初始化失败，无法保存UP主资料")
+            return False
+    
+    try:
+        db_handler.upsert_owner_profiles(profiles)
     except Exception as e:
-        print(f"保存视频数据到数据库失败: {str(e)}")
+        logger.error("保存UP主资料到数据库失败: %s", e)
     finally:
-        db_handler.close()
+        if owned:
+            db_handler.close()
     return True
 
-def save_comments_to_mysql(comment_files, config):
+def save_video_stats_to_mysql(snapshots, config, db_handler=None):
+    """
+    将视频统计快照追加到 MySQL 数据库
+    
+    Args:
+        snapshots: video_stats.build_stat_snapshots 返回的快照列表
+        config: 包含db_config配置的字典
+        db_handler: 已连接并初始化的 DatabaseHandler（常驻进程复用连接），None时新建连接并在结束后关闭
+    """
+    if not config.get("db_config"):
+        logger.error("缺少数据库配置，请在config中设置db_config")
+        return False
+    
+    owned = db_handler is None
+    if owned:
+        db_handler = DatabaseHandler(config)
+        if not db_handler.connect() or not db_handler.init_database():
+            logger.error("数据库初始化失败，无法保存视频统计快照")
+            return False
+    
+    try:
+        db_handler.insert_video_stats(snapshots)
+    except Exception as e:
+        logger.error("保存视频统计快照到数据库失败: %s", e)
+    finally:
+        if owned:
+            db_handler.close()
+    return True
+
+def save_comments_to_mysql(comment_files, config, db_handler=None):
     """
     将评论数据保存到 MySQL 数据库
     
     Args:
         comment_files: 评论文件列表，每项为 (bvid, aid, csv_path) 的元组
         config: 包含db_config配置的字典
+        db_handler: 已连接并初始化的 DatabaseHandler（常驻进程复用连接），None时新建连接并在结束后关闭
     """
     # 确保config包含有效的db_config配置
     if not config.get("db_config"):
-        print("错误: 缺少数据库配置，请在config中设置db_config") 
+        logger.error("缺少数据库配置，请在config中设置db_config")
         return False
         
     # 使用整个config对象初始化数据库处理器
-    db_handler = DatabaseHandler(config)
-    if not db_handler.connect():
-        print("数据库连接失败，无法保存评论数据")
-        return False
+    owned = db_handler is None
+    if owned:
+        db_handler = DatabaseHandler(config)
+        if not db_handler.connect():
+            logger.error("数据库连接失败，无法保存评论数据")
+            return False
 
     try:
         for bvid, aid, csv_path in comment_files:
             comments_data = extract_comment_data(csv_path)
             if comments_data:
                 db_handler.insert_comments(comments_data, bvid, aid)
-        print(f"成功保存 {len(comment_files)} 个评论文件到数据库")
+        logger.info("成功保存 %s 个评论文件到数据库", len(comment_files))
     except Exception as e:
-        print(f"保存评论数据到数据库失败: {str(e)}")
+        logger.error("保存评论数据到数据库失败: %s", e)
     finally:
-        db_handler.close()
+        if owned:
+            db_handler.close()
     return True
 
 
 # 测试
 if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
     import pandas as pd
     from config import config
     
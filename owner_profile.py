@@ -0,0 +1,177 @@
+import asyncio
+import logging
+import random
+import time
+from collections import OrderedDict
+from typing import Dict, List, Any, Optional
+
+import aiohttp
+from tqdm import tqdm
+
+from bil_comment_crawl import get_header
+from crawl_scheduler import rate_limiter
+from crawl_state import JsonStateStore
+from fast_json import loads as json_loads
+
+logger = logging.getLogger(__name__)
+
+OWNER_CARD_URL = "https://api.bilibili.com/x/web-interface/card"
+
+
+class OwnerProfileCache:
+    """
+    UP主资料缓存：内存LRU + 磁盘TTL
+
+    内存层避免同一次运行中重复读取，磁盘层保证在TTL内跨运行不重复请求。
+    """
+
+    def __init__(self, path, ttl=86400, maxsize=2048):
+        """
+        Args:
+            path: 磁盘缓存文件路径
+            ttl: 资料有效期(秒)
+            maxsize: 内存LRU容量
+        """
+        self.store = JsonStateStore(path, ttl=ttl)
+        self.maxsize = maxsize
+        self.lru = OrderedDict()
+
+    def get(self, mid) -> Optional[Dict[str, Any]]:
+        mid = int(mid)
+        if mid in self.lru:
+            self.lru.move_to_end(mid)
+            return self.lru[mid]
+
+        profile = self.store.get(mid)
+        if profile is not None:
+            self._remember(mid, profile)
+        return profile
+
+    def put(self, mid, profile):
+        mid = int(mid)
+        self.store.set(mid, profile)
+        self._remember(mid, profile)
+
+    def _remember(self, mid, profile):
+        self.lru[mid] = profile
+        self.lru.move_to_end(mid)
+        while len(self.lru) > self.maxsize:
+            self.lru.popitem(last=False)
+
+    def save(self):
+        self.store.save()
+
+
+class OwnerProfileFetcher:
+    """UP主资料获取阶段：粉丝数、投稿数、等级等"""
+
+    def __init__(self, cache, max_concurrent=3, delay_range=(0.3, 0.8)):
+        self.cache = cache
+        self.max_concurrent = max_concurrent
+        self.delay_range = delay_range
+
+    async def fetch_profiles(self, mids, show_progress=True) -> Dict[int, Dict[str, Any]]:
+        """
+        获取一组UP主的资料，每个UP主在TTL内最多请求一次
+
+        Args:
+            mids: UP主ID列表（可重复）
+            show_progress: 是否显示进度条
+
+        Returns:
+            {mid: 资料字典}
+        """
+        profiles = {}
+        pending = []
+        for mid in dict.fromkeys(int(m) for m in mids if m and int(m) > 0):
+            cached = self.cache.get(mid)
+            if cached is not None:
+                profiles[mid] = cached
+            else:
+                pending.append(mid)
+
+        if show_progress:
+            logger.info("UP主资料: %d 个命中缓存，%d 个需要请求", len(profiles), len(pending))
+        if not pending:
+            return profiles
+
+        semaphore = asyncio.Semaphore(self.max_concurrent)
+        pbar = tqdm(total=len(pending), desc="获取UP主资料") if show_progress else None
+
+        async def fetch_one(session, mid):
+            async with semaphore:
+                try:
+                    profile = await self._fetch_profile(session, mid)
+                except Exception as e:
+                    logger.warning("获取UP主 %s 资料失败: %s", mid, e)
+                    profile = None
+                await asyncio.sleep(random.uniform(*self.delay_range))
+            if pbar:
+                pbar.update(1)
+            return mid, profile
+
+        async with aiohttp.ClientSession() as session:
+            results = await asyncio.gather(*(fetch_one(session, mid) for mid in pending))
+
+        if pbar:
+            pbar.close()
+
+        for mid, profile in results:
+            if profile is not None:
+                self.cache.put(mid, profile)
+                profiles[mid] = profile
+        self.cache.save()
+        return profiles
+
+    async def _fetch_profile(self, session, mid) -> Optional[Dict[str, Any]]:
+        """请求UP主名片接口并整理为资料字典"""
+        params = {"mid": mid, "photo": "false"}
+        await rate_limiter.wait()
+        async with session.get(OWNER_CARD_URL, params=params, headers=get_header(None), timeout=10) as response:
+            if response.status != 200:
+                raise Exception(f"HTTP Error: {response.status}")
+            payload = json_loads(await response.read())
+
+        if payload.get("code") != 0 or not payload.get("data"):
+            raise Exception(f"接口返回错误: {payload.get('code')} {payload.get('message', '')}")
+
+        data = payload["data"]
+        card = data.get("card", {})
+        return {
+            "mid": int(card.get("mid", mid) or mid),
+            "name": card.get("name", ""),
+            "face_url": card.get("face", ""),
+            "sign": card.get("sign", ""),
+            "level": card.get("level_info", {}).get("current_level", 0),
+            "follower_count": data.get("follower", card.get("fans", 0)),
+            "following_count": card.get("attention", 0),
+            "video_count": data.get("archive_count", 0),
+            "fetched_at": int(time.time()),
+        }
+
+
+def apply_owner_profiles(videos, profiles) -> List[Dict]:
+    """
+    将UP主资料合并到视频数据的 owner 字段
+
+    Args:
+        videos: 视频数据列表
+        profiles: fetch_profiles 返回的 {mid: 资料}
+
+    Returns:
+        原视频列表（原地更新）
+    """
+    for video in videos:
+        owner = video.get("owner", {})
+        profile = profiles.get(int(owner.get("mid", 0) or 0))
+        if not profile:
+            continue
+        owner["level"] = profile["level"]
+        owner["follower_count"] = profile["follower_count"]
+        owner["following_count"] = profile["following_count"]
+        owner["video_count"] = profile["video_count"]
+        owner["sign"] = profile["sign"]
+        owner["profile_fetched_at"] = profile["fetched_at"]
+        if not owner.get("face_url"):
+            owner["face_url"] = profile["face_url"]
+    return videos
@@ -0,0 +1,349 @@
+import asyncio
+import logging
+import os
+import time
+from datetime import datetime
+from typing import Dict, Optional
+
+from config import config
+from bilibili_api import BilibiliAPI, RECENT_DAYS_MAX_PAGE, build_search_slices, search_min_slice_seconds
+from bil_comment_crawl import start_async as crawl_comments
+from columnar_export import open_comment_writer
+from comment_planner import plan_comment_crawl
+from crawl_metrics import metrics
+from crawl_planner import resolve_time_range
+from crawl_scheduler import rate_limiter
+from mysql_export import save_videos_to_mysql, save_comments_to_mysql
+from crawl_utils import (
+    iter_keywords, filter_search_results, save_video_output, setup_logging,
+    prepare_full_video_frame, prepare_simple_video_frame
+)
+from work_queue import open_queue
+
+logger = logging.getLogger(__name__)
+
+SEARCH_TASK = "search"
+DETAIL_TASK = "detail"
+COMMENT_TASK = "comments"
+# 领取顺序：优先处理下游任务，已搜索到的视频尽快产出结果
+TASK_KINDS = (COMMENT_TASK, DETAIL_TASK, SEARCH_TASK)
+
+
+def seed_search_tasks(queue, max_page, recent_days=None) -> int:
+    """
+    将关键词 × 时间段写入队列作为搜索任务（重复写入会被忽略）
+
+    时间范围与 main 相同（见 crawl_planner.resolve_time_range）：配置了 recent_hot_days
+    等最近天数时每天一个任务，每个任务最多 RECENT_DAYS_MAX_PAGE 页。
+
+    Args:
+        queue: work_queue.WorkQueue
+        max_page: 每个时间段的最大页数
+        recent_days: 最近N天，覆盖配置中的时间范围
+
+    Returns:
+        新增的任务数
+    """
+    time_begin, time_end, days = resolve_time_range(config, recent_days)
+    partition = config.get("search_partition", "daily")
+    slices = build_search_slices(time_begin, time_end, days, partition)
+    pages = min(config.get("page", 1), max_page)
+    if days:
+        # 与 search_videos 相同：按天搜索时B站只返回前几页
+        pages = min(pages, RECENT_DAYS_MAX_PAGE)
+
+    added = 0
+    for keyword in iter_keywords(config["keywords"], config["is_union"]):
+        for begin_ts, end_ts, label in slices:
+            payload = {
+                "keyword": keyword,
+                "begin_ts": begin_ts,
+                "end_ts": end_ts,
+                "label": label,
+                "pages": pages,
+                "adaptive": partition == "adaptive" and begin_ts is not None,
+                "order": config.get("search_order", "click"),
+            }
+            if queue.put(SEARCH_TASK, f"{keyword}|{begin_ts}|{end_ts}", payload):
+                added += 1
+    logger.info("已写入 %d 个搜索任务", added)
+    return added
+
+
+class _RowCollector:
+    """在内存中收集评论行，提供与 csv.writer 相同的 writerow/writerows 接口"""
+
+    def __init__(self):
+        self.rows = []
+
+    def writerow(self, row):
+        self.rows.append(list(row))
+
+    def writerows(self, rows):
+        self.rows.extend(list(row) for row in rows)
+
+
+class QueueWorker:
+    """
+    从共享队列领取任务的爬取进程，可在多台机器上同时运行
+
+    任务类型:
+    - search: 一个关键词的一个时间段；自适应划分时饱和的时间段拆为两个子任务，
+      搜索到的每个视频写入一个 detail 任务（按BV号去重）
+    - detail: 获取视频详情，结果即导出的视频数据；需要评论时写入 comments 任务
+    - comments: 爬取一个视频的评论，结果为评论行本身（不依赖处理该任务的机器上的文件），
+      由 export_queue_results 写出评论文件
+
+    进程本身不保存进度：任务在租约期内处理，处理期间定期续约；
+    进程退出或超时后任务由其他进程重新领取，只有持有当前租约的进程能提交结果。
+    """
+
+    def __init__(self, queue, api, fetch_details=True, fetch_comments=False, comments_max_page=5,
+                 lease_seconds=300):
+        """
+        Args:
+            queue: work_queue.WorkQueue
+            api: BilibiliAPI 实例
+            fetch_details: 是否获取视频详情（否则使用搜索结果）
+            fetch_comments: 是否爬取评论
+            comments_max_page: 每个视频的评论最大页数
+            lease_seconds: 任务租约时长(秒)
+        """
+        self.queue = queue
+        self.api = api
+        self.fetch_details = fetch_details
+        self.fetch_comments = fetch_comments
+        self.comments_max_page = comments_max_page
+        self.lease_seconds = lease_seconds
+        # 配置错误时启动即失败，而不是每个搜索任务各自失败重试
+        self.min_slice_seconds = search_min_slice_seconds(config.get("search_min_slice_hours", 1))
+        self.handled = {SEARCH_TASK: 0, DETAIL_TASK: 0, COMMENT_TASK: 0}
+        self._handlers = {
+            SEARCH_TASK: self._handle_search,
+            DETAIL_TASK: self._handle_detail,
+            COMMENT_TASK: self._handle_comments,
+        }
+
+    async def run(self, idle_exit_seconds=60, poll_seconds=2.0, max_tasks=None) -> Dict[str, int]:
+        """
+        循环领取并处理任务
+
+        Args:
+            idle_exit_seconds: 连续这么久没有可领取的任务时退出，None表示一直运行
+            poll_seconds: 没有任务时的轮询间隔(秒)
+            max_tasks: 最多处理的任务数，None表示不限制
+
+        Returns:
+            各类任务的处理数量
+        """
+        idle_since = None
+        processed = 0
+        while max_tasks is None or processed < max_tasks:
+            task = self.queue.lease(TASK_KINDS, self.lease_seconds)
+            if task is None:
+                idle_since = idle_since or time.monotonic()
+                if idle_exit_seconds is not None and time.monotonic() - idle_since >= idle_exit_seconds:
+                    break
+                await asyncio.sleep(poll_seconds)
+                continue
+            idle_since = None
+            await self._process(task)
+            processed += 1
+
+        if self.api.search_state is not None:
+            self.api.search_state.save()
+        self.api.negative_cache.save()
+        return dict(self.handled)
+
+    async def _process(self, task):
+        """处理一个任务：期间后台续约，成功则提交结果，异常则交回队列重试"""
+        heartbeat = asyncio.ensure_future(self._keep_lease(task))
+        try:
+            result = await self._handlers[task["kind"]](task)
+        except Exception as e:
+            logger.warning("任务 %s 失败(第 %d 次): %s", task["id"], task["attempts"] + 1, e)
+            metrics.inc("queue_tasks_total", kind=task["kind"], status="failed")
+            self.queue.fail(task, str(e))
+            return
+        finally:
+            heartbeat.cancel()
+
+        if self.queue.complete(task, result):
+            self.handled[task["kind"]] += 1
+            metrics.inc("queue_tasks_total", kind=task["kind"], status="done")
+        else:
+            # 租约已过期并被其他进程领取，本次结果丢弃
+            logger.warning("任务 %s 的租约已失效，结果未提交", task["id"])
+            metrics.inc("queue_tasks_total", kind=task["kind"], status="stale")
+
+    async def _keep_lease(self, task):
+        interval = max(self.lease_seconds / 3, 1)
+        while True:
+            await asyncio.sleep(interval)
+            if not self.queue.extend(task, self.lease_seconds):
+                logger.warning("任务 %s 续约失败", task["id"])
+                return
+
+    async def _handle_search(self, task) -> Dict:
+        payload = task["payload"]
+        keyword, begin_ts, end_ts = payload["keyword"], payload["begin_ts"], payload["end_ts"]
+        label = payload.get("label")
+        if payload.get("adaptive") and not label:
+            label = f"{datetime.fromtimestamp(begin_ts):%m-%d %H:%M}~{datetime.fromtimestamp(end_ts):%m-%d %H:%M}"
+        can_split = payload.get("adaptive") and end_ts - begin_ts >= 2 * self.min_slice_seconds
+
+        # 任何一页失败都会抛出异常，整个时间段交回队列重试
+        videos, saturated = await self.api.search_slice(
+            keyword, begin_ts, end_ts, list(range(1, payload["pages"] + 1)), label,
+            order=payload.get("order", "click"), stop_if_saturated=can_split
+        )
+        split = bool(saturated and can_split)
+        if split:
+            middle = begin_ts + (end_ts - begin_ts) // 2
+            for child_begin, child_end in ((begin_ts, middle), (middle + 1, end_ts)):
+                child = dict(payload, begin_ts=child_begin, end_ts=child_end, label=None)
+                self.queue.put(SEARCH_TASK, f"{keyword}|{child_begin}|{child_end}", child)
+
+        added = 0
+        for video in filter_search_results(videos, config["keywords_blacklist"]):
+            if self.queue.put(DETAIL_TASK, video["video"]["bvid"], video):
+                added += 1
+        return {"videos": len(videos), "new_videos": added, "split": split}
+
+    async def _handle_detail(self, task) -> Dict:
+        video = task["payload"]
+        bv_id = video["video"]["bvid"]
+        if not self.fetch_details:
+            self.api.complete_search_results([video])
+            result = video
+        else:
+            result = await self.api.fetch_video_detail(bv_id)
+            if not result:
+                if bv_id not in self.api.negative_cache and task["attempts"] + 1 < self.queue.max_attempts:
+                    raise RuntimeError("解析失败")
+                # 已知失效或重试次数用完：与 get_videos_detail 相同，保留基本信息
+                result = video
+
+        if self.fetch_comments:
+            for comment_task in plan_comment_crawl(
+                [result],
+                max_page=self.comments_max_page,
+                skip_empty=config.get("comments_skip_empty", True)
+            ):
+                self.queue.put(COMMENT_TASK, bv_id, comment_task)
+        return result
+
+    async def _handle_comments(self, task) -> Dict:
+        comment_task = task["payload"]
+        bvid, aid = comment_task["bvid"], comment_task["aid"]
+        collector = _RowCollector()
+        await crawl_comments(bvid, aid, '', 0, collector,
+                             config.get("is_second_comments", False), None, None, None,
+                             max_page=comment_task["pages"],
+                             page_counter=0,
+                             raise_errors=True)
+        return {"bvid": bvid, "aid": aid, "rows": collector.rows}
+
+
+def export_queue_results(queue, use_database=False) -> Dict:
+    """
+    将队列中已完成的详情和评论任务导出为输出文件（可选写入数据库）
+
+    Args:
+        queue: work_queue.WorkQueue
+        use_database: 是否同时保存到MySQL
+
+    Returns:
+        与 main 相同结构的汇总结果
+    """
+    videos = list(queue.results(DETAIL_TASK))
+
+    output_path = None
+    if videos:
+        if config["output_mode"] == "full":
+            df = prepare_full_video_frame(videos)
+        else:
+            df = prepare_simple_video_frame(videos)
+        output_path = save_video_output(df, config["file_path"], config["output_format"])
+
+    # 评论行保存在任务结果中，在导出的机器上写出评论文件
+    comment_files = []
+    comments_dir = config.get("comments_dir") or os.path.join(os.path.dirname(config["file_path"]), "comments")
+    for item in queue.results(COMMENT_TASK):
+        os.makedirs(comments_dir, exist_ok=True)
+        comment_path_base = os.path.join(comments_dir, f"{item['bvid']}_comments")
+        with open_comment_writer(comment_path_base, config["output_format"]) as (csv_path, csv_writer):
+            csv_writer.writerows(item["rows"])
+        comment_files.append((item["bvid"], item["aid"], csv_path))
+
+    if use_database and (videos or comment_files):
+        if videos:
+            save_videos_to_mysql(videos, config)
+        if comment_files:
+            save_comments_to_mysql(comment_files, config)
+
+    return {
+        "video_count": len(videos),
+        "output_file": output_path,
+        "comment_files": len(comment_files),
+        "budget_exhausted": False,
+    }
+
+
+def format_queue_counts(counts) -> str:
+    return "队列状态: " + ", ".join(f"{state} {count}" for state, count in sorted(counts.items()))
+
+
+async def run_queue(queue_url, role="all", max_page=20, fetch_details=True, fetch_comments=False,
+                    comments_max_page=5, recent_days=None, use_database=False) -> Optional[Dict]:
+    """
+    分布式队列模式（--queue）
+
+    role:
+    - seed: 只写入搜索任务
+    - work: 只领取并处理任务，队列空闲 queue_idle_exit_seconds 秒后退出
+    - export: 只导出已完成的结果
+    - all: 依次执行以上三步（单机使用）
+
+    Returns:
+        导出结果（role 为 seed/work 时为None）
+    """
+    setup_logging(config)
+    rate_limiter.configure(config.get("request_interval"))
+    queue = open_queue(
+        queue_url,
+        max_attempts=config.get("queue_max_attempts", 3),
+        retry_delay=config.get("queue_retry_delay", 30)
+    )
+    try:
+        if role in ("seed", "all"):
+            seed_search_tasks(queue, max_page, recent_days)
+
+        if role in ("work", "all"):
+            api = BilibiliAPI(
+                detail_backend=config.get("detail_backend", "html"),
+                stream_pages=config.get("stream_video_pages", True),
+                search_state_path=config.get("search_state_path"),
+                search_state_ttl=config.get("search_state_ttl"),
+                negative_cache_path=config.get("negative_cache_path"),
+                negative_cache_ttl=config.get("negative_cache_ttl", 3 * 86400)
+            )
+            worker = QueueWorker(
+                queue, api,
+                fetch_details=fetch_details,
+                fetch_comments=fetch_comments,
+                comments_max_page=comments_max_page,
+                lease_seconds=config.get("queue_lease_seconds", 300)
+            )
+            try:
+                handled = await worker.run(idle_exit_seconds=config.get("queue_idle_exit_seconds", 60))
+            finally:
+                await api.close()
+            print("本进程处理任务: " + ", ".join(f"{kind} {count}" for kind, count in handled.items()))
+
+        print(format_queue_counts(queue.counts()))
+        if role in ("export", "all"):
+            return export_queue_results(queue, use_database)
+        return None
+    finally:
+        queue.close()
@@ -0,0 +1,144 @@
+import asyncio
+import json
+import os
+import threading
+import time
+from contextlib import asynccontextmanager, contextmanager, nullcontext
+from typing import Any, Dict, List, Optional
+
+# 未启用时复用同一个空上下文，避免每次调用创建对象
+_NULL_SPAN = nullcontext()
+
+
+class TaskTracer:
+    """
+    异步任务时间线记录器，导出为Chrome trace-event JSON（可在 Perfetto / chrome://tracing 中查看）
+
+    每个asyncio任务显示为一条轨道，记录请求、信号量等待、sleep、解析等区间。
+    默认关闭；关闭时 span() 直接返回空上下文，开销可忽略。
+    事件只在内存中追加元组，导出时再转换为JSON。
+    """
+
+    def __init__(self):
+        self.enabled = False
+        self.events: List[tuple] = []
+        self.max_events = 1_000_000
+        self._origin = time.perf_counter()
+        self._tracks: Dict[int, int] = {}
+        self._track_names: Dict[int, str] = {}
+        self._lock = threading.Lock()
+
+    def enable(self, max_events=1_000_000):
+        """开始记录（清空之前的事件）"""
+        self.events = []
+        self.max_events = max_events
+        self._origin = time.perf_counter()
+        self._tracks = {}
+        self._track_names = {}
+        self.enabled = True
+
+    def disable(self):
+        self.enabled = False
+
+    def _track(self) -> int:
+        """当前asyncio任务对应的轨道编号，任务外为0"""
+        try:
+            task = asyncio.current_task()
+        except RuntimeError:
+            task = None
+        if task is None:
+            return 0
+        key = id(task)
+        track = self._tracks.get(key)
+        if track is None:
+            with self._lock:
+                track = self._tracks.setdefault(key, len(self._tracks) + 1)
+                self._track_names[track] = task.get_name()
+        return track
+
+    def _record(self, name, category, start, end, args):
+        if len(self.events) < self.max_events:
+            self.events.append((name, category, start, end, self._track(), args))
+
+    def span(self, name, category="task", **args):
+        """记录一个区间（with 语句，可包裹 await）"""
+        if not self.enabled:
+            return _NULL_SPAN
+        return self._span(name, category, args)
+
+    @contextmanager
+    def _span(self, name, category, args):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self._record(name, category, start, time.perf_counter(), args)
+
+    @asynccontextmanager
+    async def acquire(self, semaphore, name="semaphore"):
+        """
+        获取信号量并记录等待时间，用法同 async with semaphore
+
+        Args:
+            semaphore: asyncio.Semaphore
+            name: 信号量名称（显示为 "<name> wait"）
+        """
+        if not self.enabled:
+            async with semaphore:
+                yield
+            return
+        start = time.perf_counter()
+        await semaphore.acquire()
+        self._record(f"{name} wait", "semaphore", start, time.perf_counter(), {})
+        try:
+            yield
+        finally:
+            semaphore.release()
+
+    async def sleep(self, seconds, name="sleep"):
+        """asyncio.sleep 并记录休眠区间"""
+        if not self.enabled:
+            await asyncio.sleep(seconds)
+            return
+        with self._span(name, "sleep", {}):
+            await asyncio.sleep(seconds)
+
+    def to_trace_events(self) -> Dict[str, Any]:
+        """转换为Chrome trace-event格式"""
+        pid = os.getpid()
+        trace_events = [
+            {"name": "process_name", "ph": "M", "pid": pid, "tid": 0, "args": {"name": "bili_crawler"}},
+            {"name": "thread_name", "ph": "M", "pid": pid, "tid": 0, "args": {"name": "main"}},
+        ]
+        for track, task_name in sorted(self._track_names.items()):
+            trace_events.append({"name": "thread_name", "ph": "M", "pid": pid, "tid": track, "args": {"name": task_name}})
+
+        for name, category, start, end, track, args in self.events:
+            event = {
+                "name": name,
+                "cat": category,
+                "ph": "X",
+                "ts": round((start - self._origin) * 1_000_000, 1),
+                "dur": round((end - start) * 1_000_000, 1),
+                "pid": pid,
+                "tid": track,
+            }
+            if args:
+                event["args"] = args
+            trace_events.append(event)
+        return {"traceEvents": trace_events, "displayTimeUnit": "ms"}
+
+    def export(self, path) -> Optional[str]:
+        """写出trace JSON文件，未启用或无事件时不写入"""
+        if not self.events:
+            return None
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with open(path, "w", encoding="utf-8") as file:
+            json.dump(self.to_trace_events(), file, ensure_ascii=False)
+        return path
+
+
+# 全局记录器，各模块直接导入使用
+tracer = TaskTracer()
@@ -0,0 +1,191 @@
+import logging
+import os
+import time
+from datetime import datetime, timedelta
+from typing import List, Dict, Any, Optional
+
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+# 快照中记录的统计字段（均为非负整数）
+STAT_FIELDS = [
+    "view_count", "danmaku_count", "reply_count", "favorite_count",
+    "coin_count", "share_count", "like_count",
+]
+
+# 本地Parquet数据集的紧凑列类型
+SNAPSHOT_DTYPES = {
+    "bvid": "string",
+    "aid": "int64",
+    "owner_mid": "int64",
+    **{field: "uint32" for field in STAT_FIELDS},
+}
+
+
+def build_stat_snapshots(videos, fetched_at=None) -> List[Dict[str, Any]]:
+    """
+    从详情阶段的视频数据中提取统计快照
+
+    Args:
+        videos: get_videos_detail 返回的视频列表
+        fetched_at: 快照时间（datetime），默认取各视频的抓取时间或当前时间
+
+    Returns:
+        快照字典列表，每项以 (bvid, fetched_at) 唯一标识
+    """
+    snapshots = []
+    default_time = fetched_at or datetime.now()
+
+    for video in videos:
+        video_info = video.get("video", {})
+        # 仅搜索结果或详情获取失败的视频没有可信的统计数据
+        if video_info.get("_from_search") or video_info.get("_error"):
+            continue
+        bvid = video_info.get("bvid")
+        if not bvid:
+            continue
+
+        fetched_ts = video_info.get("_fetched_at")
+        snapshot_time = datetime.fromtimestamp(fetched_ts) if fetched_ts else default_time
+
+        snapshot = {
+            "bvid": bvid,
+            "fetched_at": snapshot_time.replace(microsecond=0),
+            "aid": int(video_info.get("aid", 0) or 0),
+            "owner_mid": int(video_info.get("owner_mid", 0) or 0),
+        }
+        for field in STAT_FIELDS:
+            snapshot[field] = max(int(video_info.get(field, 0) or 0), 0)
+        snapshots.append(snapshot)
+
+    return snapshots
+
+
+def snapshots_to_frame(snapshots) -> pd.DataFrame:
+    """将快照列表转换为紧凑类型的DataFrame"""
+    columns = ["bvid", "fetched_at", "aid", "owner_mid"] + STAT_FIELDS
+    df = pd.DataFrame(snapshots, columns=columns)
+    df = df.astype(SNAPSHOT_DTYPES)
+    df["fetched_at"] = pd.to_datetime(df["fetched_at"]).astype("datetime64[s]")
+    return df
+
+
+def save_stats_parquet(snapshots, stats_dir) -> Optional[str]:
+    """
+    以追加方式将快照写入本地Parquet数据集
+
+    数据集按抓取日期分区：{stats_dir}/date=YYYY-MM-DD/part-<时间戳>.parquet，
+    每次写入生成新文件，已有文件不会被修改。
+
+    Args:
+        snapshots: build_stat_snapshots 返回的快照列表
+        stats_dir: 数据集根目录
+
+    Returns:
+        写入的文件路径，没有数据时返回None
+    """
+    if not snapshots:
+        return None
+
+    df = snapshots_to_frame(snapshots)
+    written = None
+    for day, day_df in df.groupby(df["fetched_at"].dt.strftime("%Y-%m-%d")):
+        partition_dir = os.path.join(stats_dir, f"date={day}")
+        os.makedirs(partition_dir, exist_ok=True)
+        written = os.path.join(partition_dir, f"part-{time.time_ns()}.parquet")
+        day_df.to_parquet(written, index=False, engine="pyarrow")
+
+    logger.info("已追加 %d 条视频统计快照到: %s", len(df), stats_dir)
+    return written
+
+
+def load_stats_parquet(stats_dir, since=None) -> pd.DataFrame:
+    """
+    读取本地快照数据集
+
+    Args:
+        stats_dir: 数据集根目录
+        since: 仅读取该时间(datetime)之后的快照，按日期分区裁剪
+
+    Returns:
+        快照DataFrame，数据集不存在时返回空DataFrame
+    """
+    if not os.path.isdir(stats_dir):
+        return snapshots_to_frame([])
+
+    frames = []
+    since_day = since.strftime("%Y-%m-%d") if since else None
+    for partition in sorted(os.listdir(stats_dir)):
+        if not partition.startswith("date="):
+            continue
+        if since_day and partition[5:] < since_day:
+            continue
+        partition_dir = os.path.join(stats_dir, partition)
+        for name in sorted(os.listdir(partition_dir)):
+            if name.endswith(".parquet"):
+                frames.append(pd.read_parquet(os.path.join(partition_dir, name)))
+
+    if not frames:
+        return snapshots_to_frame([])
+
+    df = pd.concat(frames, ignore_index=True)
+    if since is not None:
+        df = df[df["fetched_at"] >= pd.Timestamp(since)]
+    return df.reset_index(drop=True)
+
+
+def compute_growth(df, window_days=7, by="bvid", end=None) -> pd.DataFrame:
+    """
+    计算时间窗口内各视频/UP主的统计增长
+
+    取窗口内每个视频最早与最晚的快照，计算各统计字段的增量与每日增长速率；
+    按UP主聚合时先按视频计算增量再求和。
+
+    Args:
+        df: 快照DataFrame（load_stats_parquet 或数据库查询结果）
+        window_days: 时间窗口(天)
+        by: 聚合维度，"bvid" 或 "owner_mid"
+        end: 窗口结束时间，默认取数据中最新的快照时间
+
+    Returns:
+        每行一个视频/UP主，包含 {字段}_delta 与 {字段}_per_day 列
+    """
+    if by not in ("bvid", "owner_mid"):
+        raise ValueError(f"不支持的聚合维度: {by}")
+
+    delta_columns = [f"{field}_delta" for field in STAT_FIELDS]
+    rate_columns = [f"{field}_per_day" for field in STAT_FIELDS]
+    if df.empty:
+        return pd.DataFrame(columns=[by, "snapshots", "span_days"] + delta_columns + rate_columns)
+
+    df = df.copy()
+    df["fetched_at"] = pd.to_datetime(df["fetched_at"])
+    end = pd.Timestamp(end) if end is not None else df["fetched_at"].max()
+    begin = end - timedelta(days=window_days)
+    df = df[(df["fetched_at"] >= begin) & (df["fetched_at"] <= end)]
+    df = df.sort_values(["bvid", "fetched_at"])
+
+    grouped = df.groupby("bvid", sort=False)
+    first = grouped.first()
+    last = grouped.last()
+
+    per_video = pd.DataFrame(index=first.index)
+    per_video["owner_mid"] = last["owner_mid"]
+    per_video["snapshots"] = grouped.size()
+    per_video["span_days"] = (last["fetched_at"] - first["fetched_at"]).dt.total_seconds() / 86400
+    for field, delta_column in zip(STAT_FIELDS, delta_columns):
+        per_video[delta_column] = last[field].astype("int64") - first[field].astype("int64")
+
+    if by == "owner_mid":
+        result = per_video.groupby("owner_mid").agg(
+            {"snapshots": "sum", "span_days": "max", **{c: "sum" for c in delta_columns}}
+        )
+    else:
+        result = per_video.drop(columns=["owner_mid"])
+
+    span = result["span_days"].where(result["span_days"] > 0)
+    for delta_column, rate_column in zip(delta_columns, rate_columns):
+        result[rate_column] = result[delta_column] / span
+
+    return result.reset_index()
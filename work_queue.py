@@ -0,0 +1,449 @@
+import json
+from abc import ABC, abstractmethod
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from typing import Any, Dict, Iterator, Optional, Sequence
+
+try:
+    import redis
+except ImportError:
+    redis = None
+
+# 任务状态
+PENDING = "pending"
+LEASED = "leased"
+DONE = "done"
+FAILED = "failed"
+TASK_STATES = (PENDING, LEASED, DONE, FAILED)
+
+
+class WorkQueue(ABC):
+    """
+    带租约的任务队列（多台机器共享搜索时间段、视频详情和评论任务）
+
+    - put(): 按 (kind, key) 去重入队，同一任务只会入队一次
+    - lease(): 领取任务并获得租约令牌；租约到期未完成的任务会重新排队（计为一次尝试）
+    - complete(): 只有持有当前租约的领取者才能完成任务，保证每个任务只完成一次
+    - fail(): 失败后延迟重试，超过最大尝试次数标记为失败
+    任务以字典表示: {"id", "kind", "key", "payload", "attempts", "token"}
+    """
+
+    def __init__(self, max_attempts=3, retry_delay=30):
+        """
+        Args:
+            max_attempts: 最大尝试次数（含租约过期）
+            retry_delay: 失败后重新排队的延迟(秒)
+        """
+        self.max_attempts = max_attempts
+        self.retry_delay = retry_delay
+
+    @staticmethod
+    def task_id(kind, key) -> str:
+        return f"{kind}:{key}"
+
+    @abstractmethod
+    def put(self, kind, key, payload) -> bool:
+        """入队，任务已存在（无论状态）时返回False"""
+
+    @abstractmethod
+    def lease(self, kinds: Sequence[str], lease_seconds=300) -> Optional[Dict[str, Any]]:
+        """按 kinds 的顺序领取第一个可用任务，没有任务时返回None"""
+
+    @abstractmethod
+    def extend(self, task, lease_seconds=300) -> bool:
+        """延长租约，租约已失效时返回False"""
+
+    @abstractmethod
+    def complete(self, task, result=None) -> bool:
+        """完成任务并保存结果，租约已失效（任务被他人领取或已完成）时返回False"""
+
+    @abstractmethod
+    def fail(self, task, error="") -> bool:
+        """记录失败：未超过最大尝试次数时延迟重试，否则标记为失败"""
+
+    @abstractmethod
+    def counts(self) -> Dict[str, int]:
+        """各状态的任务数"""
+
+    @abstractmethod
+    def results(self, kind) -> Iterator[Any]:
+        """已完成任务的结果"""
+
+    def close(self):
+        pass
+
+
+class MemoryWorkQueue(WorkQueue):
+    """进程内队列，用于单机测试和不需要持久化的场景"""
+
+    def __init__(self, max_attempts=3, retry_delay=30):
+        super().__init__(max_attempts, retry_delay)
+        self.tasks: Dict[str, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+
+    def put(self, kind, key, payload) -> bool:
+        task_id = self.task_id(kind, key)
+        with self._lock:
+            if task_id in self.tasks:
+                return False
+            self.tasks[task_id] = {
+                "id": task_id, "kind": kind, "key": str(key), "payload": payload, "state": PENDING,
+                "attempts": 0, "token": None, "lease_until": 0.0, "available_at": time.time(),
+                "result": None, "error": "",
+            }
+            return True
+
+    def _expire_leases(self, now):
+        for task in self.tasks.values():
+            if task["state"] == LEASED and task["lease_until"] < now:
+                task["attempts"] += 1
+                task["state"] = FAILED if task["attempts"] >= self.max_attempts else PENDING
+                task["available_at"] = now
+                task["error"] = "租约过期"
+
+    def lease(self, kinds, lease_seconds=300):
+        now = time.time()
+        with self._lock:
+            self._expire_leases(now)
+            for kind in kinds:
+                for task in self.tasks.values():
+                    if task["kind"] == kind and task["state"] == PENDING and task["available_at"] <= now:
+                        task.update(state=LEASED, token=uuid.uuid4().hex, lease_until=now + lease_seconds)
+                        return {key: task[key] for key in ("id", "kind", "key", "payload", "attempts", "token")}
+        return None
+
+    def _owned(self, task):
+        current = self.tasks.get(task["id"])
+        if current is None or current["state"] != LEASED or current["token"] != task["token"]:
+            return None
+        return current
+
+    def extend(self, task, lease_seconds=300):
+        with self._lock:
+            current = self._owned(task)
+            if current is None:
+                return False
+            current["lease_until"] = time.time() + lease_seconds
+            return True
+
+    def complete(self, task, result=None):
+        with self._lock:
+            current = self._owned(task)
+            if current is None:
+                return False
+            current.update(state=DONE, result=result, token=None)
+            return True
+
+    def fail(self, task, error=""):
+        with self._lock:
+            current = self._owned(task)
+            if current is None:
+                return False
+            current["attempts"] += 1
+            current["error"] = str(error)
+            current["token"] = None
+            if current["attempts"] >= self.max_attempts:
+                current["state"] = FAILED
+            else:
+                current.update(state=PENDING, available_at=time.time() + self.retry_delay)
+            return True
+
+    def counts(self):
+        with self._lock:
+            counts = dict.fromkeys(TASK_STATES, 0)
+            for task in self.tasks.values():
+                counts[task["state"]] += 1
+            return counts
+
+    def results(self, kind):
+        with self._lock:
+            done = [task["result"] for task in self.tasks.values() if task["kind"] == kind and task["state"] == DONE]
+        yield from done
+
+
+class SQLiteWorkQueue(WorkQueue):
+    """
+    基于SQLite的队列，适合单台机器上的多个进程共享
+
+    领取和状态变更都在 BEGIN IMMEDIATE 事务中完成，多个进程同时领取时不会拿到同一个任务。
+    """
+
+    def __init__(self, path, max_attempts=3, retry_delay=30):
+        super().__init__(max_attempts, retry_delay)
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.path = path
+        self._conn = sqlite3.connect(path, timeout=30, isolation_level=None, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS tasks (
+                id TEXT PRIMARY KEY,
+                kind TEXT NOT NULL,
+                key TEXT NOT NULL,
+                payload TEXT,
+                state TEXT NOT NULL,
+                attempts INTEGER NOT NULL DEFAULT 0,
+                token TEXT,
+                lease_until REAL NOT NULL DEFAULT 0,
+                available_at REAL NOT NULL DEFAULT 0,
+                result TEXT,
+                error TEXT
+            )
+        """)
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_tasks_ready ON tasks (kind, state, available_at)")
+        self._lock = threading.Lock()
+
+    def _transaction(self, callback):
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                value = callback(self._conn)
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+            self._conn.execute("COMMIT")
+            return value
+
+    def put(self, kind, key, payload):
+        cursor = self._transaction(lambda conn: conn.execute(
+            "INSERT OR IGNORE INTO tasks (id, kind, key, payload, state, available_at) VALUES (?, ?, ?, ?, ?, ?)",
+            (self.task_id(kind, key), kind, str(key), json.dumps(payload, ensure_ascii=False, default=str), PENDING, time.time())
+        ))
+        return cursor.rowcount == 1
+
+    def lease(self, kinds, lease_seconds=300):
+        def take(conn):
+            now = time.time()
+            conn.execute(
+                "UPDATE tasks SET attempts = attempts + 1, available_at = ?, error = '租约过期', token = NULL, "
+                "state = CASE WHEN attempts + 1 >= ? THEN ? ELSE ? END "
+                "WHERE state = ? AND lease_until < ?",
+                (now, self.max_attempts, FAILED, PENDING, LEASED, now)
+            )
+            for kind in kinds:
+                row = conn.execute(
+                    "SELECT id, kind, key, payload, attempts FROM tasks "
+                    "WHERE kind = ? AND state = ? AND available_at <= ? ORDER BY available_at LIMIT 1",
+                    (kind, PENDING, now)
+                ).fetchone()
+                if row is None:
+                    continue
+                token = uuid.uuid4().hex
+                conn.execute("UPDATE tasks SET state = ?, token = ?, lease_until = ? WHERE id = ?",
+                             (LEASED, token, now + lease_seconds, row[0]))
+                return {"id": row[0], "kind": row[1], "key": row[2], "payload": json.loads(row[3]),
+                        "attempts": row[4], "token": token}
+            return None
+
+        return self._transaction(take)
+
+    def extend(self, task, lease_seconds=300):
+        cursor = self._transaction(lambda conn: conn.execute(
+            "UPDATE tasks SET lease_until = ? WHERE id = ? AND state = ? AND token = ?",
+            (time.time() + lease_seconds, task["id"], LEASED, task["token"])
+        ))
+        return cursor.rowcount == 1
+
+    def complete(self, task, result=None):
+        cursor = self._transaction(lambda conn: conn.execute(
+            "UPDATE tasks SET state = ?, result = ?, token = NULL WHERE id = ? AND state = ? AND token = ?",
+            (DONE, json.dumps(result, ensure_ascii=False, default=str), task["id"], LEASED, task["token"])
+        ))
+        return cursor.rowcount == 1
+
+    def fail(self, task, error=""):
+        cursor = self._transaction(lambda conn: conn.execute(
+            "UPDATE tasks SET attempts = attempts + 1, error = ?, token = NULL, available_at = ?, "
+            "state = CASE WHEN attempts + 1 >= ? THEN ? ELSE ? END "
+            "WHERE id = ? AND state = ? AND token = ?",
+            (str(error), time.time() + self.retry_delay, self.max_attempts, FAILED, PENDING,
+             task["id"], LEASED, task["token"])
+        ))
+        return cursor.rowcount == 1
+
+    def counts(self):
+        with self._lock:
+            rows = self._conn.execute("SELECT state, COUNT(*) FROM tasks GROUP BY state").fetchall()
+        counts = dict.fromkeys(TASK_STATES, 0)
+        counts.update(dict(rows))
+        return counts
+
+    def results(self, kind):
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT result FROM tasks WHERE kind = ? AND state = ? ORDER BY rowid", (kind, DONE)
+            ).fetchall()
+        for (result,) in rows:
+            yield json.loads(result)
+
+    def close(self):
+        self._conn.close()
+
+
+# Redis 脚本：领取、完成、失败和延长租约都在服务端原子执行
+_REDIS_LEASE = """
+local prefix, now, lease_seconds, max_attempts, token = KEYS[1], tonumber(ARGV[1]), tonumber(ARGV[2]), tonumber(ARGV[3]), ARGV[4]
+for _, id in ipairs(redis.call('ZRANGEBYSCORE', prefix .. 'leased', '-inf', now)) do
+    local key = prefix .. 'task:' .. id
+    local attempts = redis.call('HINCRBY', key, 'attempts', 1)
+    redis.call('ZREM', prefix .. 'leased', id)
+    redis.call('HSET', key, 'token', '', 'error', '租约过期')
+    if attempts >= max_attempts then
+        redis.call('HSET', key, 'state', 'failed')
+    else
+        redis.call('HSET', key, 'state', 'pending')
+        redis.call('RPUSH', prefix .. 'pending:' .. redis.call('HGET', key, 'kind'), id)
+    end
+end
+for _, id in ipairs(redis.call('ZRANGEBYSCORE', prefix .. 'delayed', '-inf', now)) do
+    redis.call('ZREM', prefix .. 'delayed', id)
+    redis.call('RPUSH', prefix .. 'pending:' .. redis.call('HGET', prefix .. 'task:' .. id, 'kind'), id)
+end
+for i = 5, #ARGV do
+    local id = redis.call('LPOP', prefix .. 'pending:' .. ARGV[i])
+    if id then
+        local key = prefix .. 'task:' .. id
+        redis.call('HSET', key, 'state', 'leased', 'token', token)
+        redis.call('ZADD', prefix .. 'leased', now + lease_seconds, id)
+        return {id, ARGV[i], redis.call('HGET', key, 'key'), redis.call('HGET', key, 'payload'), redis.call('HGET', key, 'attempts')}
+    end
+end
+return false
+"""
+
+_REDIS_FINISH = """
+local prefix, id, token, action = KEYS[1], ARGV[1], ARGV[2], ARGV[3]
+local key = prefix .. 'task:' .. id
+if redis.call('HGET', key, 'state') ~= 'leased' or redis.call('HGET', key, 'token') ~= token then
+    return 0
+end
+if action == 'extend' then
+    redis.call('ZADD', prefix .. 'leased', tonumber(ARGV[4]), id)
+    return 1
+end
+redis.call('ZREM', prefix .. 'leased', id)
+redis.call('HSET', key, 'token', '')
+if action == 'complete' then
+    redis.call('HSET', key, 'state', 'done', 'result', ARGV[4])
+    redis.call('RPUSH', prefix .. 'done:' .. redis.call('HGET', key, 'kind'), id)
+    return 1
+end
+local attempts = redis.call('HINCRBY', key, 'attempts', 1)
+redis.call('HSET', key, 'error', ARGV[4])
+if attempts >= tonumber(ARGV[5]) then
+    redis.call('HSET', key, 'state', 'failed')
+else
+    redis.call('HSET', key, 'state', 'pending')
+    redis.call('ZADD', prefix .. 'delayed', tonumber(ARGV[6]), id)
+end
+return 1
+"""
+
+_REDIS_PUT = """
+local prefix, id = KEYS[1], ARGV[1]
+local key = prefix .. 'task:' .. id
+if redis.call('EXISTS', key) == 1 then
+    return 0
+end
+redis.call('HSET', key, 'kind', ARGV[2], 'key', ARGV[3], 'payload', ARGV[4], 'state', 'pending', 'attempts', 0, 'token', '')
+redis.call('RPUSH', prefix .. 'pending:' .. ARGV[2], id)
+return 1
+"""
+
+
+class RedisWorkQueue(WorkQueue):
+    """
+    基于Redis的队列，供多台机器共享（兼容Redis协议的单实例服务均可使用，脚本访问的键不限于单个slot，不支持集群模式）
+
+    每个任务保存为一个哈希，待处理任务按类型放在列表中，租约和延迟重试使用有序集合；
+    状态变更由Lua脚本在服务端原子执行。
+    """
+
+    def __init__(self, url, name="bili_crawler", max_attempts=3, retry_delay=30):
+        super().__init__(max_attempts, retry_delay)
+        if redis is None:
+            raise ImportError("Redis队列需要安装redis库: pip install redis")
+        self.client = redis.Redis.from_url(url, decode_responses=True)
+        self.prefix = f"{name}:"
+        self._lease = self.client.register_script(_REDIS_LEASE)
+        self._finish = self.client.register_script(_REDIS_FINISH)
+        self._put = self.client.register_script(_REDIS_PUT)
+
+    def put(self, kind, key, payload):
+        return bool(self._put(keys=[self.prefix], args=[
+            self.task_id(kind, key), kind, str(key), json.dumps(payload, ensure_ascii=False, default=str)
+        ]))
+
+    def lease(self, kinds, lease_seconds=300):
+        token = uuid.uuid4().hex
+        row = self._lease(keys=[self.prefix], args=[time.time(), lease_seconds, self.max_attempts, token, *kinds])
+        if not row:
+            return None
+        task_id, kind, key, payload, attempts = row
+        return {"id": task_id, "kind": kind, "key": key, "payload": json.loads(payload),
+                "attempts": int(attempts), "token": token}
+
+    def extend(self, task, lease_seconds=300):
+        return bool(self._finish(keys=[self.prefix], args=[
+            task["id"], task["token"], "extend", time.time() + lease_seconds
+        ]))
+
+    def complete(self, task, result=None):
+        return bool(self._finish(keys=[self.prefix], args=[
+            task["id"], task["token"], "complete", json.dumps(result, ensure_ascii=False, default=str)
+        ]))
+
+    def fail(self, task, error=""):
+        return bool(self._finish(keys=[self.prefix], args=[
+            task["id"], task["token"], "fail", str(error), self.max_attempts, time.time() + self.retry_delay
+        ]))
+
+    def counts(self):
+        counts = dict.fromkeys(TASK_STATES, 0)
+        keys = list(self.client.scan_iter(match=f"{self.prefix}task:*", count=1000))
+        pipeline = self.client.pipeline()
+        for key in keys:
+            pipeline.hget(key, "state")
+        for state in pipeline.execute():
+            if state in counts:
+                counts[state] += 1
+        return counts
+
+    def results(self, kind):
+        task_ids = self.client.lrange(f"{self.prefix}done:{kind}", 0, -1)
+        for start in range(0, len(task_ids), 500):
+            pipeline = self.client.pipeline()
+            for task_id in task_ids[start:start + 500]:
+                pipeline.hget(f"{self.prefix}task:{task_id}", "result")
+            for result in pipeline.execute():
+                if result is not None:
+                    yield json.loads(result)
+
+    def close(self):
+        self.client.close()
+
+
+def open_queue(url, max_attempts=3, retry_delay=30) -> WorkQueue:
+    """
+    按URL创建队列
+
+    Args:
+        url: "memory://"、"sqlite:///path/to/queue.db" 或 "redis://host:port/db"
+        max_attempts: 最大尝试次数
+        retry_delay: 失败后重试的延迟(秒)
+
+    Returns:
+        WorkQueue 实例
+    """
+    if url.startswith("memory://"):
+        return MemoryWorkQueue(max_attempts, retry_delay)
+    if url.startswith("sqlite:///"):
+        # 与SQLAlchemy相同: sqlite:///相对路径，sqlite:////绝对路径
+        return SQLiteWorkQueue(url[len("sqlite:///"):], max_attempts, retry_delay)
+    if url.startswith(("redis://", "rediss://", "unix://")):
+        return RedisWorkQueue(url, max_attempts=max_attempts, retry_delay=retry_delay)
+    raise ValueError(f"不支持的队列地址: {url}，可选 memory://、sqlite:///路径、redis://主机:端口/库")